@@ -1,21 +1,64 @@
 from flask import Flask
 from .config import Config
-from .excel_loader import load_users, load_ipress, load_siga_min
+from .datasets import init_datasets, register_cli
+from .result_cache import init_result_caches
+from .metrics import init_metrics
+from .json_body import init_json_responses
+from .request_log import init_request_log
+from .siga_upload import init_siga_uploads
 
-def create_app():
+def _for_app_command() -> bool:
+    """
+    ¿La está creando `flask` para buscar un comando de la app (build-store,
+    profile-loaders; ver datasets.register_cli)? Esos no atienden requests: cada uno
+    carga lo que necesita. `flask run` / `flask shell` la crean dentro de su propio
+    comando y cargan normal.
+    """
+    import click
+    from flask.cli import FlaskGroup
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.command, FlaskGroup)
+
+def create_app(overrides: dict | None = None):
     app = Flask(__name__, static_folder="static", template_folder="templates")
     app.config.from_object(Config)
-    
-    # Carga usuarios en memoria al iniciar
-    app.config["USERS"] = load_users(app.config["USERS_FILE"], sheet_name=app.config["USERS_SHEET"])
+    if _for_app_command():
+        # sin cargar los Excel al crearla ni hilo que vigile cambios
+        app.config.update(DATASETS_LAZY=True, DATASETS_WARMUP=False, DATASET_RELOAD_SECONDS=0)
+    if overrides:
+        # p.ej. otras rutas de Excel (bench/) sin tocar variables de entorno
+        app.config.update(overrides)
+
+    # Maestros en memoria: usuarios, IPRESS por UE e índice SIGA mínimo (ver datasets.py).
+    # Quedan también en app.config["USERS"], ["IPRESS_BY_UE"], ["IPRESS_SEARCH"] y ["SIGA_MIN_INDEX"].
+    datasets = init_datasets(app)
+    register_cli(app)
+    if app.config["DATASETS_LAZY"]:
+        # login y estáticos responden de inmediato; los índices se cargan al primer uso
+        if app.config["DATASETS_WARMUP"]:
+            datasets.start_warmup()
+    else:
+        datasets.load_all()
+        print("[SIGA] registros indexados:", len(app.config["SIGA_MIN_INDEX"]))
+
+    # Log estructurado por request (cola + hilo escritor, muestreo por endpoint; ver request_log.py)
+    init_request_log(app)
+
+    # jsonify con el encoder rápido y gzip para respuestas JSON grandes (ver json_body.py)
+    init_json_responses(app)
+
+    # Caché de respuestas de búsqueda (ver result_cache.py)
+    init_result_caches(app)
+
+    # Métricas por request (blueprints views y auth) servidas en /metrics
+    init_metrics(app)
+
+    # Subidas del SIGA de cada UE (lectura en procesos aparte, ver siga_upload.py)
+    init_siga_uploads(app)
 
-    # IPRESS por UE (nuevo)
-    app.config["IPRESS_BY_UE"] = load_ipress(app.config["IPRESS_FILE"])
+    # Recarga en caliente cuando el ministerio manda un Excel nuevo (sin reiniciar)
+    datasets.start_watcher(app.config["DATASET_RELOAD_SECONDS"])
 
-    # ⬇⬇ NUEVO: índice SIGA mínimo (solo 5 campos)
-    app.config["SIGA_MIN_INDEX"] = load_siga_min(app.config["SIGA_FILE"])
-    print("[SIGA] registros indexados:", len(app.config["SIGA_MIN_INDEX"]))  
-    
     # Blueprints
     from .auth import auth_bp
     from .views import views_bp
@@ -23,5 +66,11 @@ def create_app():
     app.register_blueprint(views_bp)
     return app
 
-# Para `flask run`
-app = create_app()
+# Para `flask run` / gunicorn "app:app": la app se crea al primer acceso a `app`,
+# así importar un submódulo (p.ej. app.bench) no carga los Excel.
+def __getattr__(name):
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
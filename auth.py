@@ -1,4 +1,6 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from .datasets import get_index
+from .ipress_search import ue_pool_key
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -7,7 +9,7 @@ def login():
     if request.method == "POST":
         username = (request.form.get("username") or "").strip()
         password = (request.form.get("password") or "").strip()
-        users = current_app.config.get("USERS", {})
+        users = get_index("USERS", {})
         user = users.get(username)
 
         if not user or password != user["password_temp"]:
@@ -20,6 +22,9 @@ def login():
         session["ue_nombre"] = user["ue_nombre"]
         session["pliego_codigo"] = user["pliego_codigo"]
         session["pliego_nombre"] = user["pliego_nombre"]
+        # pool IPRESS de la UE, resuelto al cargar los maestros (ver ipress_search.UePools)
+        session["ipress_pool"] = ue_pool_key(get_index("UE_IPRESS_POOLS"), get_index("IPRESS_SEARCH", {}),
+                                             user["ue_codigo"])
         return redirect(url_for("views.formato8"))
     return render_template("login.html")
 
@@ -0,0 +1,19 @@
+# app/bench/__init__.py
+
+# =========================
+# BENCHMARKS CON DATOS SINTÉTICOS
+# =========================
+#
+# Los Excel reales del ministerio no están en el repo. synth.py genera libros
+# parecidos (usuarios, IPRESS y un SIGA de varias hojas) del tamaño que se pida, y
+# run.py mide los loaders y los endpoints sobre ellos y escribe un JSON para
+# comparar entre versiones:
+#
+#   python -m app.bench --size medium --out bench-medium.json
+#   python -m app.bench --siga-rows 200000 --repeat 5 --out bench.json
+#
+# load.py es la prueba de carga (muchas sesiones de UE a la vez contra un servidor
+# HTTP, con los Excel configurados o sintéticos):
+#
+#   python -m app.bench.load --sessions 300 --concurrency 64 --duration 60
+#   python -m app.bench.load --url http://127.0.0.1:8000 --mix search=0.7,lookup=0.3
@@ -0,0 +1,5 @@
+# app/bench/__main__.py
+
+from .run import main
+
+main()
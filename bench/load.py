@@ -0,0 +1,360 @@
+# app/bench/load.py
+
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.client import HTTPConnection
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import tempfile
+import threading
+import time
+
+from .run import _git_commit, _latency_summary, _search_queries
+from .synth import SIZES, generate
+
+# =========================
+# PRUEBA DE CARGA: MUCHAS UEs A LA VEZ
+# =========================
+#
+# Antes del cierre de una declaración cientos de UEs entran juntas y buscan IPRESS y
+# códigos SIGA sin parar. Esto lo reproduce contra un servidor HTTP de verdad:
+#   - sin --url levanta la app en OTRO proceso (create_app + servidor con hilos de
+#     werkzeug en un puerto libre), así el cliente no le quita GIL al servidor; con
+#     --url apunta a lo que ya esté corriendo (p.ej. gunicorn con N workers)
+#   - sesiones: UEs del maestro de usuarios (load_users), cada una con su cookie de
+#     /login (el login en ráfaga también se mide)
+#   - consultas armadas desde los mismos Excel: búsquedas IPRESS con lo que escribe
+#     la gente en el pool de la UE, lookups SIGA de sus establecimientos (y algunos
+#     fallos) y lotes, mezclados según --mix
+#   - --concurrency hilos cliente, cada uno con su conexión keep-alive, hasta
+#     --duration segundos o --requests en total
+# Reporta por operación y en total: req/s, p50/p95/p99, tasa de error y códigos
+# HTTP, más req/s por segundo (para ver si el servidor se degrada con el tiempo).
+
+DEFAULT_MIX = "search=0.6,lookup=0.35,batch=0.05"
+BATCH_SIZE = 50
+
+
+# ----- servidor local (en su propio proceso) -----
+
+def _serve(overrides: dict, port_q) -> None:
+    from werkzeug.serving import make_server
+    from .. import create_app
+
+    with open(os.devnull, "w") as f, redirect_stdout(f):
+        app = create_app(overrides)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)   # sin una línea por request
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port_q.put(server.server_port)
+    server.serve_forever()
+
+
+def start_local_server(overrides: dict, timeout: float = 600) -> tuple[str, multiprocessing.Process]:
+    """Levanta la app en un proceso aparte (spawn) y devuelve (url, proceso) cuando ya escucha."""
+    ctx = multiprocessing.get_context("spawn")
+    port_q = ctx.Queue()
+    # no daemon: la app crea sus propios procesos al cargar (PARALLEL_LOAD)
+    proc = ctx.Process(target=_serve, args=(overrides, port_q), name="load-server")
+    proc.start()
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            port = port_q.get(timeout=0.5)
+            return f"http://127.0.0.1:{port}", proc
+        except queue.Empty:
+            if not proc.is_alive() or time.perf_counter() > deadline:
+                proc.terminate()
+                raise SystemExit("El servidor local no arrancó (ver el error arriba).")
+
+
+# ----- datos de la prueba -----
+
+class Plan:
+    """Sesiones (UE, contraseña) y, por UE, consultas IPRESS y lookups SIGA."""
+
+    def __init__(self, paths: dict, sessions: int, rng: random.Random):
+        from ..excel_loader import _norm_text_basic, load_ipress, load_siga_min, load_users
+        from ..ipress_search import resolve_ue_pool
+
+        with open(os.devnull, "w") as f, redirect_stdout(f):
+            users = load_users(paths["users"])
+            by_ue = load_ipress(paths["ipress"])
+            siga = load_siga_min(paths["siga"])
+
+        codes_by_sede = defaultdict(list)
+        for sede, cod in siga:
+            codes_by_sede[sede].append(cod)
+        all_keys = list(siga)
+
+        names = sorted(users)
+        self.users = [users[u] for u in rng.sample(names, min(sessions, len(names)))]
+        self.searches, self.lookups = {}, {}
+        for u in self.users:
+            ue = u["ue_codigo"]
+            key, _ = resolve_ue_pool(by_ue, ue)
+            records = by_ue.get(key, []) if key else []
+            self.searches[ue] = _search_queries(rng, records, 50)
+
+            # lookups de sus establecimientos (nombre como lo manda el formulario); 10% fallos
+            own = [(r, cod) for r in records for cod in codes_by_sede.get(_norm_text_basic(r["eess_nombre"]), ())]
+            bodies = []
+            for _ in range(50):
+                if own and rng.random() < 0.9:
+                    r, cod = rng.choice(own)
+                    bodies.append({"codigo": cod, "establecimiento": r["eess_nombre"],
+                                   "ipress_codigo": r["ipress_codigo"]})
+                elif all_keys and rng.random() < 0.5:
+                    sede, cod = rng.choice(all_keys)
+                    bodies.append({"codigo": cod, "establecimiento": sede})
+                else:
+                    bodies.append({"codigo": f"{rng.randint(0, 10**12 - 1):012d}", "establecimiento": "X"})
+            self.lookups[ue] = bodies
+
+
+def _parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        if name.strip() not in ("search", "lookup", "batch"):
+            raise SystemExit(f"--mix: operación desconocida {name!r} (search, lookup, batch)")
+        mix[name.strip()] = float(w or 1)
+    return mix
+
+
+# ----- cliente -----
+
+class _Client:
+    """Una conexión keep-alive (http.client); se reabre si el servidor la corta."""
+
+    def __init__(self, url: str, timeout: float):
+        u = urlsplit(url)
+        self.host, self.port, self.timeout = u.hostname, u.port or 80, timeout
+        self.conn = None
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None):
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                resp = self.conn.getresponse()
+                data = resp.read()
+                return resp.status, resp.getheader("Set-Cookie") or "", data
+            except (ConnectionError, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+class Recorder:
+    def __init__(self):
+        self.lat = defaultdict(list)       # operación -> [segundos]
+        self.errors = Counter()
+        self.status = defaultdict(Counter)
+        self.per_second = Counter()        # segundo desde el inicio -> requests
+        self._lock = threading.Lock()
+        self.t0 = time.perf_counter()
+
+    def add(self, op: str, elapsed: float, status) -> None:
+        with self._lock:
+            self.lat[op].append(elapsed)
+            self.status[op][str(status)] += 1
+            if status != 200 and not (op == "login" and status == 302):
+                self.errors[op] += 1
+            self.per_second[int(time.perf_counter() - self.t0)] += 1
+
+
+def _timed(rec: Recorder, op: str, fn):
+    t0 = time.perf_counter()
+    try:
+        status, cookie, data = fn()
+    except Exception as e:
+        rec.add(op, time.perf_counter() - t0, type(e).__name__)
+        return None, None
+    rec.add(op, time.perf_counter() - t0, status)
+    return status, cookie
+
+
+def login_all(url: str, users: list[dict], concurrency: int, rec: Recorder, timeout: float) -> dict[str, str]:
+    """Ráfaga de /login (concurrency a la vez) -> {ue_codigo: cookie de sesión}."""
+    cookies, todo, lock = {}, list(users), threading.Lock()
+
+    def worker():
+        client = _Client(url, timeout)
+        while True:
+            with lock:
+                if not todo:
+                    return
+                u = todo.pop()
+            body = urlencode({"username": u["ue_codigo"], "password": u["password_temp"]}).encode()
+            status, cookie = _timed(rec, "login", lambda: client.request(
+                "POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"}))
+            if status == 302 and cookie:
+                cookies[u["ue_codigo"]] = cookie.split(";", 1)[0]
+
+    threads = [threading.Thread(target=worker) for _ in range(min(concurrency, len(users)) or 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return cookies
+
+
+def run_load(url: str, plan: Plan, cookies: dict[str, str], mix: dict[str, float], concurrency: int,
+             duration: float, total_requests: int | None, think_s: float, seed: int, rec: Recorder,
+             timeout: float) -> float:
+    """Lanza los hilos cliente; devuelve la duración real de la fase."""
+    ues = [ue for ue in cookies]
+    if not ues:
+        raise SystemExit("Ningún login fue exitoso: revisa el maestro de usuarios y la URL.")
+    ops, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+    budget = [total_requests]
+    lock = threading.Lock()
+
+    def take() -> bool:
+        if budget[0] is None:
+            return time.perf_counter() < deadline
+        with lock:
+            budget[0] -= 1
+            return budget[0] >= 0
+
+    def worker(i):
+        rng = random.Random(seed * 1000 + i)
+        client = _Client(url, timeout)
+        while take():
+            ue = rng.choice(ues)
+            headers = {"Cookie": cookies[ue], "Accept-Encoding": "gzip"}
+            op = rng.choices(ops, weights)[0]
+            if op == "search":
+                path = "/api/ipress/search?" + urlencode({"q": rng.choice(plan.searches[ue])})
+                _timed(rec, op, lambda: client.request("GET", path, headers=headers))
+            elif op == "lookup":
+                path = "/api/siga/lookup?" + urlencode(rng.choice(plan.lookups[ue]))
+                _timed(rec, op, lambda: client.request("GET", path, headers=headers))
+            else:
+                items = [[b["establecimiento"], b["codigo"]] for b in rng.sample(plan.lookups[ue], BATCH_SIZE)]
+                body = json.dumps({"items": items}).encode()
+                _timed(rec, op, lambda: client.request(
+                    "POST", "/api/siga/lookup/batch", body, {**headers, "Content-Type": "application/json"}))
+            if think_s:
+                time.sleep(rng.expovariate(1 / think_s))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def report(rec: Recorder, phase_s: dict[str, float]) -> dict:
+    out = {}
+    for op, lat in sorted(rec.lat.items()):
+        s = _latency_summary(lat, rec.errors[op], phase_s["login" if op == "login" else "load"])
+        s["status"] = dict(rec.status[op])
+        out[op] = s
+    load_ops = [op for op in rec.lat if op != "login"]
+    out["total"] = _latency_summary([x for op in load_ops for x in rec.lat[op]],
+                                    sum(rec.errors[op] for op in load_ops), phase_s["load"])
+    seconds = range(max(rec.per_second) + 1) if rec.per_second else ()
+    out["rps_timeline"] = [rec.per_second[s] for s in seconds]
+    return out
+
+
+def main(argv=None) -> dict:
+    ap = argparse.ArgumentParser(prog="python -m app.bench.load",
+                                 description="Prueba de carga: muchas UEs buscando a la vez.")
+    ap.add_argument("--url", help="servidor ya levantado (sin esto se levanta uno local en otro proceso)")
+    ap.add_argument("--users", help="maestro de usuarios (por defecto el de Config)")
+    ap.add_argument("--ipress", help="maestro IPRESS (por defecto el de Config)")
+    ap.add_argument("--siga", help="Excel SIGA (por defecto el de Config)")
+    ap.add_argument("--size", choices=sorted(SIZES), help="usar Excel sintéticos de este tamaño (ver synth.py)")
+    ap.add_argument("--workdir", help="carpeta para los Excel sintéticos")
+    ap.add_argument("--sessions", type=int, default=200, help="UEs con sesión abierta")
+    ap.add_argument("--concurrency", type=int, default=50, help="hilos cliente (requests en vuelo)")
+    ap.add_argument("--duration", type=float, default=30, help="segundos de carga")
+    ap.add_argument("--requests", type=int, help="en vez de --duration: requests en total")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"pesos por operación (por defecto {DEFAULT_MIX})")
+    ap.add_argument("--think-ms", type=float, default=0, help="pausa media entre requests de un hilo")
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--cache", action="store_true", help="servidor local con la caché de respuestas activa")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="load-results.json")
+    args = ap.parse_args(argv)
+
+    mix = _parse_mix(args.mix)
+    if args.size:
+        workdir = Path(args.workdir or tempfile.mkdtemp(prefix="load-xlsx-"))
+        paths = generate(workdir, args.size)
+        print(f"[LOAD] Excel sintéticos en {workdir}: {paths['params']}")
+    else:
+        from ..config import Config
+        paths = {"users": args.users or Config.USERS_FILE, "ipress": args.ipress or Config.IPRESS_FILE,
+                 "siga": args.siga or Config.SIGA_FILE}
+
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    plan = Plan(paths, args.sessions, rng)
+    print(f"[LOAD] plan: {len(plan.users)} sesiones ({time.perf_counter() - t0:.1f}s)")
+
+    proc, url = None, args.url
+    if url is None:
+        overrides = {"USERS_FILE": str(paths["users"]), "IPRESS_FILE": str(paths["ipress"]),
+                     "SIGA_FILE": str(paths["siga"]), "DATASETS_LAZY": False, "DATASET_RELOAD_SECONDS": 0,
+                     "RESULT_CACHE_SIZE": 4096 if args.cache else 0, "LOG_SAMPLE": "0"}
+        t0 = time.perf_counter()
+        url, proc = start_local_server(overrides)
+        print(f"[LOAD] servidor local en {url} ({time.perf_counter() - t0:.1f}s)")
+
+    try:
+        rec = Recorder()
+        t0 = time.perf_counter()
+        cookies = login_all(url, plan.users, args.concurrency, rec, args.timeout)
+        login_s = time.perf_counter() - t0
+        print(f"[LOAD] login: {len(cookies)}/{len(plan.users)} sesiones en {login_s:.2f}s")
+
+        rec.per_second.clear()
+        rec.t0 = time.perf_counter()
+        load_s = run_load(url, plan, cookies, mix, args.concurrency, args.duration, args.requests,
+                          args.think_ms / 1000, args.seed, rec, args.timeout)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.join()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "url": args.url or "local (werkzeug, threaded)",
+        },
+        "params": {"sessions": len(plan.users), "concurrency": args.concurrency, "duration": args.duration,
+                   "requests": args.requests, "mix": mix, "think_ms": args.think_ms, "cache": args.cache},
+        "results": report(rec, {"login": login_s, "load": load_s}),
+    }
+    for op, s in results["results"].items():
+        if op != "rps_timeline":
+            print(f"[LOAD] {op}: {s['requests']} req, {s['rps']} req/s, p50 {s['p50_ms']} ms, "
+                  f"p95 {s['p95_ms']} ms, p99 {s['p99_ms']} ms, errores {s['error_rate']:.2%}")
+    Path(args.out).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"[LOAD] resultados en {args.out}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# app/bench/run.py
+
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from .synth import PASSWORD, SIZES, generate
+
+# =========================
+# BENCHMARKS: LOADERS Y ENDPOINTS
+# =========================
+#
+# Loaders: cada uno se corre `repeat` veces midiendo tiempo de pared, y una vez
+# más con tracemalloc para el pico de memoria (tracemalloc lo hace más lento, por
+# eso va aparte). Endpoints: una app real (create_app) apuntando a los Excel
+# sintéticos, sesiones por UE con /login y consultas de /api/ipress/search y
+# /api/siga/lookup armadas desde los mismos datos (aciertos y fallos), medidas
+# una por una con el test client de Flask.
+#
+# Todo se escribe en un JSON con metadatos (versión de Python, commit, tamaños)
+# para comparar entre versiones.
+
+
+@contextmanager
+def _quiet():
+    """Sin los print() de los loaders/handlers en la salida (no afectan la medición)."""
+    with open(os.devnull, "w") as f, redirect_stdout(f):
+        yield
+
+
+def _timed(fn, repeat: int) -> tuple[list[float], object]:
+    walls, result = [], None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        walls.append(time.perf_counter() - t0)
+    return walls, result
+
+
+def _peak_mb(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def _summary(walls: list[float]) -> dict:
+    return {
+        "wall_s": [round(w, 4) for w in walls],
+        "wall_min_s": round(min(walls), 4),
+        "wall_median_s": round(statistics.median(walls), 4),
+    }
+
+
+def bench_loaders(paths: dict, repeat: int = 3, memory: bool = True) -> dict:
+    from ..excel_loader import load_users, load_ipress, load_siga_min
+    from ..ipress_search import build_ipress_pools
+    from ..sede_alias import build_sede_aliases
+    from ..snapshot import load_snapshot, save_snapshot
+
+    with _quiet():
+        by_ue = load_ipress(paths["ipress"])
+        siga = load_siga_min(paths["siga"])
+        pools = build_ipress_pools(by_ue)
+        snap_dir = Path(tempfile.mkdtemp(prefix="bench-snap-"))
+        snap_xlsx = snap_dir / Path(paths["siga"]).name
+        os.symlink(Path(paths["siga"]).resolve(), snap_xlsx)
+        save_snapshot(snap_xlsx, "siga", siga)
+
+    cases = {
+        "users": lambda: load_users(paths["users"]),
+        "ipress": lambda: load_ipress(paths["ipress"]),
+        "ipress_pools": lambda: build_ipress_pools(by_ue),
+        "siga": lambda: load_siga_min(paths["siga"]),
+        "siga_streaming": lambda: load_siga_min(paths["siga"], streaming=True),
+        "siga_snapshot": lambda: load_snapshot(snap_xlsx, "siga"),
+        "sede_aliases": lambda: build_sede_aliases(siga, pools),
+    }
+    out = {}
+    try:
+        for name, fn in cases.items():
+            with _quiet():
+                walls, result = _timed(fn, repeat)
+                res = _summary(walls)
+                if memory:
+                    res["peak_mb"] = _peak_mb(fn)
+            res["records"] = len(result) if result is not None else 0
+            out[name] = res
+            print(f"[BENCH] loader {name}: {res['wall_median_s']}s" + (f", pico {res['peak_mb']} MB" if memory else ""))
+    finally:
+        shutil.rmtree(snap_dir, ignore_errors=True)
+    return out
+
+
+def _latency_summary(lat: list[float], errors: int, total_s: float) -> dict:
+    lat_ms = sorted(x * 1000 for x in lat)
+
+    def pct(p):
+        if not lat_ms:
+            return 0.0
+        return round(lat_ms[min(len(lat_ms) - 1, int(round(p / 100 * (len(lat_ms) - 1))))], 3)
+
+    return {
+        "requests": len(lat), "errors": errors,
+        "error_rate": round(errors / len(lat), 4) if lat else 0.0,
+        "total_s": round(total_s, 4),
+        "rps": round(len(lat) / total_s, 1) if total_s else 0.0,
+        "mean_ms": round(statistics.fmean(lat_ms), 3) if lat_ms else 0.0,
+        "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": round(lat_ms[-1], 3) if lat_ms else 0.0,
+    }
+
+
+def _search_queries(rng: random.Random, records: list[dict], n: int) -> list[str]:
+    """Lo que escribe la gente: prefijos del nombre, una palabra, parte del código, y algún fallo."""
+    qs = []
+    for _ in range(n):
+        r = rng.random()
+        rec = rng.choice(records) if records else {"eess_nombre": "san", "ipress_codigo": "1"}
+        name, code = rec["eess_nombre"], rec["ipress_codigo"]
+        if r < 0.4:
+            qs.append(name[: rng.randint(3, max(3, len(name)))])
+        elif r < 0.7:
+            qs.append(rng.choice(name.split()))
+        elif r < 0.85:
+            qs.append(code[-rng.randint(3, 6):])
+        elif r < 0.95:
+            qs.append(name.lower())
+        else:
+            qs.append("zzqx")
+    return qs
+
+
+def bench_endpoints(paths: dict, requests: int = 2000, seed: int = 7, cache: bool = False) -> dict:
+    from .. import create_app
+    from ..excel_loader import load_users, _norm_text_basic
+
+    overrides = {
+        "USERS_FILE": paths["users"], "IPRESS_FILE": paths["ipress"], "SIGA_FILE": paths["siga"],
+        "EXCEL_SNAPSHOTS": False, "PARALLEL_LOAD": False, "DATASETS_LAZY": False,
+        "DATASET_RELOAD_SECONDS": 0, "SHARED_STORE": False,
+        "RESULT_CACHE_SIZE": 4096 if cache else 0,
+    }
+    rng = random.Random(seed)
+    with _quiet():
+        t0 = time.perf_counter()
+        app = create_app(overrides)
+        startup = time.perf_counter() - t0
+        users = sorted(load_users(paths["users"]))
+    pools = app.config["IPRESS_SEARCH"]
+    siga = app.config["SIGA_MIN_INDEX"]
+    siga_keys = list(siga)
+
+    # nombre IPRESS original de cada sede (así lo manda el formulario)
+    ipress_name = {}
+    for recs in app.config["IPRESS_BY_UE"].values():
+        for r in recs:
+            ipress_name.setdefault(_norm_text_basic(r["eess_nombre"]), r)
+
+    out = {"startup_s": round(startup, 4), "cache": cache}
+    clients = {}
+    for ue in rng.sample(users, min(20, len(users))):
+        c = app.test_client()
+        c.post("/login", data={"username": ue, "password": PASSWORD})
+        clients[ue] = c
+
+    # /api/ipress/search
+    lat, errors = [], 0
+    plan = []
+    for ue, c in clients.items():
+        ue_digits = "".join(ch for ch in ue if ch.isdigit())[-4:]
+        records = pools[ue_digits].records if ue_digits in pools else []
+        plan += [(c, q) for q in _search_queries(rng, records, requests // len(clients))]
+    rng.shuffle(plan)
+    with _quiet():
+        t_all = time.perf_counter()
+        for c, q in plan:
+            t0 = time.perf_counter()
+            r = c.get("/api/ipress/search", query_string={"q": q})
+            lat.append(time.perf_counter() - t0)
+            errors += r.status_code != 200
+        total = time.perf_counter() - t_all
+    out["ipress_search"] = _latency_summary(lat, errors, total)
+
+    # /api/siga/lookup (90% códigos existentes con el nombre IPRESS de la sede, 10% inexistentes)
+    c = next(iter(clients.values()))
+    lat, errors, found = [], 0, 0
+    plan = []
+    for _ in range(requests):
+        if siga_keys and rng.random() < 0.9:
+            sede, cod = rng.choice(siga_keys)
+            rec = ipress_name.get(sede)
+            plan.append({"codigo": cod, "establecimiento": rec["eess_nombre"] if rec else sede,
+                         "ipress_codigo": rec["ipress_codigo"] if rec else ""})
+        else:
+            plan.append({"codigo": f"{rng.randint(0, 10**12 - 1):012d}", "establecimiento": "X"})
+    with _quiet():
+        t_all = time.perf_counter()
+        for body in plan:
+            t0 = time.perf_counter()
+            r = c.get("/api/siga/lookup", query_string=body)
+            lat.append(time.perf_counter() - t0)
+            errors += r.status_code != 200
+            found += bool(r.status_code == 200 and r.get_json().get("ok"))
+        total = time.perf_counter() - t_all
+    out["siga_lookup"] = _latency_summary(lat, errors, total)
+    out["siga_lookup"]["found_ratio"] = round(found / len(plan), 4) if plan else 0.0
+
+    for name in ("ipress_search", "siga_lookup"):
+        s = out[name]
+        print(f"[BENCH] {name}: {s['rps']} req/s, p50 {s['p50_ms']} ms, p95 {s['p95_ms']} ms")
+
+    datasets = app.extensions.get("datasets")
+    if datasets is not None:
+        datasets.stop_watcher()
+    return out
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def main(argv=None) -> dict:
+    ap = argparse.ArgumentParser(prog="python -m app.bench", description="Benchmarks con Excel sintéticos.")
+    ap.add_argument("--size", choices=sorted(SIZES), default="small")
+    ap.add_argument("--ues", type=int)
+    ap.add_argument("--eess-per-ue", type=int)
+    ap.add_argument("--siga-rows", type=int)
+    ap.add_argument("--seed", type=int, default=2025)
+    ap.add_argument("--workdir", help="carpeta para los Excel (se reutilizan si ya existen con los mismos parámetros)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--requests", type=int, default=2000, help="requests por endpoint")
+    ap.add_argument("--cache", action="store_true", help="medir endpoints con la caché de respuestas activa")
+    ap.add_argument("--no-memory", action="store_true", help="no medir pico de memoria (más rápido)")
+    ap.add_argument("--skip", action="append", default=[], choices=["loaders", "endpoints"])
+    ap.add_argument("--out", default="bench-results.json")
+    args = ap.parse_args(argv)
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-xlsx-"))
+    wanted = {"size": args.size, "ues": args.ues, "eess_per_ue": args.eess_per_ue,
+              "siga_rows": args.siga_rows, "seed": args.seed}
+    meta_file = workdir / "bench-params.json"
+    paths = None
+    if meta_file.exists():
+        saved = json.loads(meta_file.read_text())
+        if saved.get("wanted") == wanted:
+            paths = saved["paths"]
+            print(f"[BENCH] reutilizando Excel de {workdir}")
+    if paths is None:
+        t0 = time.perf_counter()
+        paths = generate(workdir, args.size, args.ues, args.eess_per_ue, args.siga_rows, args.seed)
+        print(f"[BENCH] Excel generados en {workdir} ({time.perf_counter() - t0:.1f}s): {paths['params']}")
+        meta_file.write_text(json.dumps({"wanted": wanted, "paths": paths}, indent=2))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "dataset": {**paths["params"], **{k: os.path.getsize(paths[k]) for k in ("users", "ipress", "siga")}},
+        "params": {"repeat": args.repeat, "requests": args.requests, "cache": args.cache},
+    }
+    if "loaders" not in args.skip:
+        results["loaders"] = bench_loaders(paths, args.repeat, memory=not args.no_memory)
+    if "endpoints" not in args.skip:
+        results["endpoints"] = bench_endpoints(paths, args.requests, cache=args.cache)
+
+    Path(args.out).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"[BENCH] resultados en {args.out}")
+    return results
@@ -0,0 +1,185 @@
+# app/bench/synth.py
+
+from datetime import datetime
+from pathlib import Path
+import random
+
+from openpyxl import Workbook
+
+# =========================
+# GENERADOR DE EXCEL SINTÉTICOS
+# =========================
+#
+# Escribe (con openpyxl en modo write_only, memoria constante) tres libros con la
+# misma forma que los del ministerio:
+#   - usuarios:  hoja "usuarios" con ue_codigo, ue_nombre, pliego_*, password_temp
+#   - IPRESS:    Código UE / Código Único / Nombre del establecimiento / Categoría
+#   - SIGA:      varias hojas ("RESUMEN" sin datos útiles primero, luego la de bienes
+#                con NOMBRE_SEDE, CODIGO_PATRIMONIAL, ..., FECHA_ADQUISICION, y una
+#                "LEYENDA" al final), que es lo que load_siga_min tiene que detectar
+# Los nombres de sede del SIGA repiten los de IPRESS con las variaciones reales
+# (C.S. / CS / CENTRO DE SALUD, sin tildes, minúsculas) y las fechas vienen en los
+# formatos que aparecen en la práctica (celda fecha, dd/mm/aaaa, ISO, vacía, texto).
+# Con la misma semilla se generan exactamente los mismos archivos.
+
+SIZES = {
+    #          UEs  EESS por UE (prom.)  filas SIGA
+    "small":  (40, 15, 20_000),
+    "medium": (150, 30, 100_000),
+    "large":  (260, 35, 500_000),
+}
+
+USERS_FILE = "UE PLIEGOS Y UE LIMA Y REGIONES.xlsx"
+IPRESS_FILE = "IPRESS.xlsx"
+SIGA_FILE = "siga DLS 4.25.xlsx"
+PASSWORD = "Bench2025"
+
+_PREFIXES = ["C.S.", "CS", "P.S.", "PS", "CMI", "C.M.I.", "CENTRO DE SALUD", "PUESTO DE SALUD",
+             "HOSPITAL", "POLICLINICO"]
+_PLACES = ["SAN JOSÉ", "MANUEL BARRETO", "VILLA MARÍA", "JOSÉ GÁLVEZ", "LOS ÁNGELES", "SANTA ROSA",
+           "NUEVA ESPERANZA", "PACHACÁMAC", "TÚPAC AMARU", "SAN JUAN", "MIRAFLORES", "SEÑOR DE LOS MILAGROS",
+           "HUAYCÁN", "CHOSICA", "LAS PALMERAS", "PUENTE PIEDRA", "CARABAYLLO", "JICAMARCA", "ÑAÑA", "CIENEGUILLA"]
+_CATEGORIES = ["I-1", "I-2", "I-3", "I-4", "II-1", "II-2", "III-1"]
+_BIENES = ["CENTRIFUGA", "MICROSCOPIO BINOCULAR", "ESTERILIZADOR A VAPOR", "ELECTROCARDIOGRAFO",
+           "MONITOR DE FUNCIONES VITALES", "COMPUTADORA PERSONAL PORTATIL", "IMPRESORA LASER",
+           "BALANZA DE PIE CON TALLIMETRO", "CAMILLA DE EXAMEN", "DESFIBRILADOR", "AUTOCLAVE",
+           "REFRIGERADORA PARA VACUNAS", "ECOGRAFO", "NEBULIZADOR", "ASPIRADOR DE SECRECIONES"]
+_MARCAS = ["SIEMENS", "OLYMPUS", "PHILIPS", "MINDRAY", "GE", "HP", "EPSON", "DETECTO", "NIHON KOHDEN", "S/M"]
+
+# variantes de escritura del mismo prefijo (como llegan al SIGA)
+_PREFIX_VARIANTS = {
+    "C.S.": ["CS", "CENTRO DE SALUD", "C.S"], "CS": ["C.S.", "CENTRO DE SALUD"],
+    "P.S.": ["PS", "PUESTO DE SALUD"], "PS": ["P.S.", "PUESTO DE SALUD"],
+    "CMI": ["C.M.I.", "CENTRO MATERNO INFANTIL"], "C.M.I.": ["CMI", "CENTRO MATERNO INFANTIL"],
+    "CENTRO DE SALUD": ["C.S.", "CS"], "PUESTO DE SALUD": ["P.S.", "PS"],
+}
+
+
+def _strip_accents(s: str) -> str:
+    return s.translate(str.maketrans("ÁÉÍÓÚáéíóú", "AEIOUaeiou"))
+
+
+def _ues(rng: random.Random, n_ues: int) -> list[dict]:
+    out = []
+    for i in range(n_ues):
+        pliego = rng.choice([1, 11, 136, 440, 441, 450, 457, 463])
+        ue = 1000 + i
+        out.append({
+            "ue_codigo": f"{pliego:03d}-{ue}",
+            "ue_nombre": f"UE {ue} {rng.choice(_PLACES)}",
+            "pliego_codigo": f"{pliego:03d}",
+            "pliego_nombre": f"PLIEGO {pliego:03d}",
+            "password_temp": PASSWORD,
+        })
+    return out
+
+
+def write_users(path: Path, ues: list[dict]) -> None:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("usuarios")
+    cols = ["ue_codigo", "ue_nombre", "pliego_codigo", "pliego_nombre", "password_temp"]
+    ws.append(cols)
+    for u in ues:
+        ws.append([u[c] for c in cols])
+    wb.save(path)
+
+
+def write_ipress(path: Path, rng: random.Random, ues: list[dict], eess_per_ue: int) -> list[dict]:
+    """Escribe el maestro IPRESS y devuelve los establecimientos generados."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("IPRESS")
+    ws.append(["Código UE", "Código Único", "Nombre del establecimiento", "Categoría",
+               "Departamento", "Provincia", "Distrito"])
+    eess, n = [], 0
+    for u in ues:
+        for i in range(max(1, int(rng.gauss(eess_per_ue, eess_per_ue / 3)))):
+            n += 1
+            prefix = rng.choice(_PREFIXES)
+            name = f"{prefix} {rng.choice(_PLACES)}" + (f" {i}" if rng.random() < 0.7 else f" {rng.choice(['I', 'II', 'ALTO', 'BAJO'])}")
+            rec = {"ue": u["ue_codigo"].replace("-", ""), "codigo": f"{n:08d}", "nombre": name, "prefix": prefix}
+            ws.append([rec["ue"], rec["codigo"], name, rng.choice(_CATEGORIES), "LIMA", "LIMA", rng.choice(_PLACES)])
+            eess.append(rec)
+    wb.save(path)
+    return eess
+
+
+def _siga_sede(rng: random.Random, e: dict) -> str:
+    """Nombre de sede tal como suele venir en el SIGA para el establecimiento e."""
+    r = rng.random()
+    name = e["nombre"]
+    if r < 0.70:
+        return name
+    if r < 0.85 and e["prefix"] in _PREFIX_VARIANTS:
+        return rng.choice(_PREFIX_VARIANTS[e["prefix"]]) + name[len(e["prefix"]):]
+    if r < 0.95:
+        return _strip_accents(name).lower() if rng.random() < 0.5 else _strip_accents(name)
+    return f"ALMACEN {rng.choice(_PLACES)}"  # sede que no es un EESS del maestro
+
+
+def _fecha(rng: random.Random):
+    r = rng.random()
+    y, m, d = rng.randint(1995, 2024), rng.randint(1, 12), rng.randint(1, 28)
+    if r < 0.50:
+        return datetime(y, m, d)
+    if r < 0.75:
+        return f"{d:02d}/{m:02d}/{y}"
+    if r < 0.85:
+        return f"{y}-{m:02d}-{d:02d} 00:00:00"
+    if r < 0.95:
+        return None
+    return rng.choice(["SIN FECHA", "-", "00/00/0000"])
+
+
+def write_siga(path: Path, rng: random.Random, eess: list[dict], rows: int) -> None:
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("RESUMEN")
+    ws.append(["REPORTE DE BIENES PATRIMONIALES", None])
+    ws.append(["Total de registros", rows])
+
+    ws = wb.create_sheet("BIENES")
+    ws.append(["NOMBRE_SEDE", "CODIGO_PATRIMONIAL", "DENOMINACION DEL BIEN", "MARCA", "MODELO",
+               "SERIE", "FECHA_ADQUISICION", "ANTIGUEDAD", "ESTADO"])
+    sedes = {}
+    for i in range(rows):
+        e = rng.choice(eess)
+        sede = sedes.get(e["codigo"])
+        if sede is None or rng.random() < 0.02:
+            sede = sedes[e["codigo"]] = _siga_sede(rng, e)
+        cod = f"{rng.randint(0, 10**12 - 1):012d}"
+        if rng.random() < 0.01:
+            cod = f"{cod[:6]} {cod[6:]}"  # códigos con espacio en medio
+        fecha = _fecha(rng)
+        ws.append([
+            sede, cod, rng.choice(_BIENES), rng.choice(_MARCAS), f"M-{rng.randint(1, 300)}",
+            f"S{rng.randint(1, 10**7)}" if rng.random() < 0.9 else "", fecha,
+            rng.randint(0, 25) if fecha is None and rng.random() < 0.5 else None,
+            rng.choice(["BUENO", "REGULAR", "MALO"]),
+        ])
+
+    ws = wb.create_sheet("LEYENDA")
+    ws.append(["ESTADO", "DESCRIPCION"])
+    ws.append(["BUENO", "Operativo"])
+    wb.save(path)
+
+
+def generate(outdir, size: str = "small", ues: int | None = None, eess_per_ue: int | None = None,
+             siga_rows: int | None = None, seed: int = 2025) -> dict:
+    """
+    Genera los tres Excel en `outdir` (con los nombres que espera Config) y devuelve
+    {"users": ruta, "ipress": ruta, "siga": ruta, "params": {...}}.
+    """
+    d_ues, d_eess, d_rows = SIZES[size]
+    params = {"size": size, "ues": ues or d_ues, "eess_per_ue": eess_per_ue or d_eess,
+              "siga_rows": siga_rows or d_rows, "seed": seed}
+    out = Path(outdir)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    paths = {"users": out / USERS_FILE, "ipress": out / IPRESS_FILE, "siga": out / SIGA_FILE}
+    ue_rows = _ues(rng, params["ues"])
+    write_users(paths["users"], ue_rows)
+    eess = write_ipress(paths["ipress"], rng, ue_rows, params["eess_per_ue"])
+    write_siga(paths["siga"], rng, eess, params["siga_rows"])
+    params["eess"] = len(eess)
+    return {**{k: str(v) for k, v in paths.items()}, "params": params}
@@ -10,24 +10,104 @@ def find_first(*candidates):
             return str(p)
     return str(candidates[0])
 
+# Rutas candidatas de cada maestro (en orden de prioridad). Config guarda la
+# primera que exista; el recargador (datasets.py) las vuelve a revisar.
+USERS_CANDIDATES = (
+    APP_DIR / "data" / "UE PLIEGOS Y UE LIMA Y REGIONES.xlsx",
+    PROJECT_DIR / "data" / "UE PLIEGOS Y UE LIMA Y REGIONES.xlsx",
+)
+IPRESS_CANDIDATES = (
+    APP_DIR / "data" / "IPRESS.xlsx",
+    APP_DIR / "data" / "IPRESS.xls",
+    PROJECT_DIR / "data" / "IPRESS.xlsx",
+    PROJECT_DIR / "data" / "IPRESS.xls",
+)
+SIGA_CANDIDATES = (
+    APP_DIR / "data" / "siga DLS 4.25.xlsx",
+    PROJECT_DIR / "data" / "siga DLS 4.25.xlsx",
+)
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "cambia-esto-en-produccion")
 
+    # Snapshots binarios de los índices junto a cada Excel (ver snapshot.py).
+    # EXCEL_SNAPSHOTS=0 para forzar siempre el parseo completo.
+    EXCEL_SNAPSHOTS = os.environ.get("EXCEL_SNAPSHOTS", "1") not in ("0", "false", "no")
+
     # Usuarios por UE (ya lo tenías)
     USERS_SHEET = os.environ.get("USERS_SHEET", "usuarios")
-    USERS_FILE = find_first(
-        APP_DIR / "data" / "UE PLIEGOS Y UE LIMA Y REGIONES.xlsx",
-        PROJECT_DIR / "data" / "UE PLIEGOS Y UE LIMA Y REGIONES.xlsx",
-    )
+    USERS_FILE_CANDIDATES = USERS_CANDIDATES
+    USERS_FILE = find_first(*USERS_CANDIDATES)
 
     # Maestro de IPRESS (nuevo)
-    IPRESS_FILE = find_first(
-        APP_DIR / "data" / "IPRESS.xlsx",
-        APP_DIR / "data" / "IPRESS.xls",
-        PROJECT_DIR / "data" / "IPRESS.xlsx",
-        PROJECT_DIR / "data" / "IPRESS.xls",
-    )
+    IPRESS_FILE_CANDIDATES = IPRESS_CANDIDATES
+    IPRESS_FILE = find_first(*IPRESS_CANDIDATES)
 
     # ⬇⬇ NUEVO: archivo SIGA
-    SIGA_FILE = find_first(APP_DIR / "data" / "siga DLS 4.25.xlsx",
-                           PROJECT_DIR / "data" / "siga DLS 4.25.xlsx")
\ No newline at end of file
+    SIGA_FILE_CANDIDATES = SIGA_CANDIDATES
+    SIGA_FILE = find_first(*SIGA_CANDIDATES)
+
+    # SIGA_STREAMING=1: lee el SIGA con openpyxl read-only fila por fila (menos RAM)
+    SIGA_STREAMING = os.environ.get("SIGA_STREAMING", "0") in ("1", "true", "yes")
+
+    # Recarga en caliente: cada cuántos segundos se revisan los Excel (0 = desactivado)
+    DATASET_RELOAD_SECONDS = float(os.environ.get("DATASET_RELOAD_SECONDS", "60"))
+
+    # Arranque rápido: DATASETS_LAZY=1 no carga los Excel en create_app(); cada maestro se
+    # carga al primer uso o en un hilo de precarga (DATASETS_WARMUP=1). Ver /readyz.
+    DATASETS_LAZY = os.environ.get("DATASETS_LAZY", "0") in ("1", "true", "yes")
+    DATASETS_WARMUP = os.environ.get("DATASETS_WARMUP", "1") not in ("0", "false", "no")
+
+    # Varios workers en el mismo host: SHARED_STORE=1 guarda IPRESS y SIGA en un SQLite de
+    # solo lectura que todos comparten (ver shared_store.py). Por defecto, junto al Excel.
+    # Con SHARED_STORE no hay búsqueda por texto en el SIGA (/api/siga/search responde 503:
+    # su índice invertido vive en memoria de cada worker) ni subida del SIGA por UE.
+    SHARED_STORE = os.environ.get("SHARED_STORE", "0") in ("1", "true", "yes")
+    SHARED_STORE_DIR = os.environ.get("SHARED_STORE_DIR") or None
+
+    # Arranque: parsear los tres Excel en paralelo, cada uno en su proceso (0 = en serie)
+    PARALLEL_LOAD = os.environ.get("PARALLEL_LOAD", "1") not in ("0", "false", "no")
+
+    # /api/siga/lookup/batch: máximo de códigos patrimoniales por request
+    SIGA_BATCH_MAX = int(os.environ.get("SIGA_BATCH_MAX", "2000"))
+
+    # Caché de respuestas de /api/ipress/search y /api/siga/* (LRU por cantidad + vencimiento
+    # en segundos; se vacía al recargar los maestros). RESULT_CACHE_SIZE=0 la desactiva.
+    RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "4096"))
+    RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "300"))
+
+    # /metrics en formato Prometheus (latencias por endpoint y por UE, SIGA, maestros)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") not in ("0", "false", "no")
+
+    # Pools IPRESS de hasta este tamaño se envían al navegador (/api/ipress/pool) y se
+    # buscan ahí mientras el usuario escribe; los más grandes se buscan en el servidor.
+    IPRESS_CLIENT_POOL_MAX = int(os.environ.get("IPRESS_CLIENT_POOL_MAX", "3000"))
+
+    # Al recargar el SIGA, aplicar solo las altas/cambios/bajas respecto del índice vigente
+    # (por sede + código); sin cambios, la versión vigente se conserva. Historial de cargas
+    # por maestro: GET /api/datasets/<nombre>/history
+    SIGA_DELTA = os.environ.get("SIGA_DELTA", "1") not in ("0", "false", "no")
+    DATASET_HISTORY = int(os.environ.get("DATASET_HISTORY", "10"))
+
+    # POST /api/siga/upload: Excel SIGA de una UE, leído en segundo plano por procesos aparte
+    # (SIGA_UPLOAD_WORKERS a la vez) e integrado al índice en memoria de este proceso.
+    # SIGA_UPLOAD_MAX_MB también es el MAX_CONTENT_LENGTH de la app (413 por encima)
+    SIGA_UPLOAD_WORKERS = int(os.environ.get("SIGA_UPLOAD_WORKERS", "2"))
+    SIGA_UPLOAD_MAX_MB = int(os.environ.get("SIGA_UPLOAD_MAX_MB", "50"))
+    SIGA_UPLOAD_DIR = os.environ.get("SIGA_UPLOAD_DIR") or None
+
+    # Respuestas JSON de este tamaño o más (bytes) van en gzip si el navegador lo acepta
+    # (conexiones lentas de regiones); 0 = sin compresión
+    GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", "1024"))
+
+    # Log estructurado de requests (request_log.py): una línea por evento en stderr, escrita
+    # por un hilo aparte. LOG_SAMPLE / LOG_LEVELS por endpoint, p.ej.
+    # LOG_SAMPLE="views.api_ipress_search=0.05,views.siga_lookup=0.1,*=1"
+    # LOG_LEVELS="views.api_siga_find=WARNING". Errores y requests de LOG_SLOW_MS o más
+    # se escriben siempre.
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+    LOG_SAMPLE = os.environ.get("LOG_SAMPLE", "1")
+    LOG_SLOW_MS = float(os.environ.get("LOG_SLOW_MS", "1000"))
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")       # json | text
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
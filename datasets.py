@@ -0,0 +1,646 @@
+# app/datasets.py
+
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import threading
+import time
+
+from flask import current_app
+
+from .config import find_first
+from .excel_loader import load_users, load_ipress, load_siga_min
+from .ipress_search import build_ipress_pools, build_ue_pools
+from .sede_alias import SedeAliases, build_sede_aliases
+from .siga_search import build_siga_text_index
+from .snapshot import cached_load
+from .siga_index import SigaIndex, apply_delta, build_siga_json, diff as siga_diff
+from .shared_store import (IpressStore, SedeAliasStore, SigaStore, fill_aliases, fill_ipress, fill_siga,
+                           open_or_build, store_path, store_ready)
+
+# =========================
+# MAESTROS EN MEMORIA (usuarios, IPRESS, SIGA) CON RECARGA EN CALIENTE
+# =========================
+#
+# Cada maestro es un "dataset": un Excel (resuelto con find_first sobre las rutas
+# candidatas de Config) y una función que arma sus índices. La versión vigente se
+# guarda como un objeto DatasetVersion INMUTABLE; recargar = construir uno nuevo
+# fuera del request y reemplazar la referencia (una sola asignación). Los requests
+# que ya tomaron la versión anterior la siguen usando hasta terminar.
+#
+# Los índices también se reflejan en app.config ("USERS", "IPRESS_BY_UE",
+# "IPRESS_SEARCH", "SIGA_MIN_INDEX") por compatibilidad.
+
+
+# ----- parseo del Excel (lo pesado; puede correr en un proceso hijo) -----
+
+def _parse_users(config, path: str) -> dict:
+    return cached_load("users", load_users, path, enabled=config["EXCEL_SNAPSHOTS"],
+                       sheet_name=config["USERS_SHEET"])
+
+
+def _parse_ipress(config, path: str) -> dict:
+    return cached_load("ipress", load_ipress, path, enabled=config["EXCEL_SNAPSHOTS"])
+
+
+def _parse_siga(config, path: str) -> dict:
+    return cached_load("siga", load_siga_min, path, enabled=config["EXCEL_SNAPSHOTS"],
+                       streaming=config["SIGA_STREAMING"])
+
+
+# ----- índices a partir de lo parseado (`parse` es un callable sin argumentos) -----
+
+def _build_users(config, path: str, parse) -> dict:
+    return {"USERS": parse()}
+
+
+def _build_ipress(config, path: str, parse) -> dict:
+    if config["SHARED_STORE"]:
+        db = open_or_build(path, "ipress", lambda con: fill_ipress(con, parse()),
+                           directory=config["SHARED_STORE_DIR"])
+        store = IpressStore(db)
+        return {"IPRESS_BY_UE": store.by_ue, "IPRESS_SEARCH": store.pools}
+
+    by_ue = parse()
+    # formas normalizadas + índice invertido por UE para /api/ipress/search
+    return {"IPRESS_BY_UE": by_ue, "IPRESS_SEARCH": build_ipress_pools(by_ue)}
+
+
+def _build_siga(config, path: str, parse) -> dict:
+    if config["SHARED_STORE"]:
+        db = open_or_build(path, "siga", lambda con: fill_siga(con, parse()),
+                           directory=config["SHARED_STORE_DIR"])
+        return {"SIGA_MIN_INDEX": SigaStore(db)}
+
+    return {"SIGA_MIN_INDEX": parse()}
+
+
+def _build_sede_aliases(siga, ipress):
+    idx = siga.values["SIGA_MIN_INDEX"]
+    if not isinstance(idx, SigaStore):
+        return build_sede_aliases(idx, ipress.values["IPRESS_SEARCH"])
+
+    # SHARED_STORE: la tabla se arma una vez (el primer worker) y se guarda en un .db junto
+    # al del SIGA; depende también del IPRESS (su versión va en el nombre). Se arma con los
+    # registros de IPRESS_BY_UE, sin materializar el pool global de búsqueda.
+    def fill(con):
+        records = (r for items in ipress.values["IPRESS_BY_UE"].values() for r in items)
+        fill_aliases(con, SedeAliases(idx.active_sedes(), records))
+    db = open_or_build(siga.path, "alias", fill, directory=str(idx.db_path.parent), extra=ipress.version)
+    return SedeAliasStore(db)
+
+
+# nombre -> (clave de Config con la ruta, parseo del Excel, armado de índices, claves que produce;
+#            la primera es el índice "principal" para contar registros)
+DATASETS = {
+    "users":  ("USERS_FILE", _parse_users, _build_users, ("USERS",)),
+    "ipress": ("IPRESS_FILE", _parse_ipress, _build_ipress, ("IPRESS_BY_UE", "IPRESS_SEARCH")),
+    "siga":   ("SIGA_FILE", _parse_siga, _build_siga, ("SIGA_MIN_INDEX",)),
+}
+
+# datasets que con SHARED_STORE se leen de un .db (tipo del .db = nombre del dataset)
+STORE_KINDS = ("ipress", "siga")
+
+# clave de índice -> dataset que la produce
+DATASET_OF_KEY = {key: name for name, (_, _, _, keys) in DATASETS.items() for key in keys}
+
+# índices derivados de VARIOS datasets: clave -> (datasets de los que depende, armado
+# [, si sigue valiendo tras un delta: keep(conteos) -> bool | None
+#  [, actualizarlo con el delta: update(valor, dataset) -> valor nuevo | None = rearmar]]).
+# Se rearman al cargar cualquiera de ellos (y se cachean por versión de cada uno).
+DERIVED = {
+    "SIGA_SEDE_ALIASES": (("siga", "ipress"), lambda siga, ipress: _build_sede_aliases(siga, ipress),
+        lambda counts: not counts["sedes_changed"]),   # solo depende del conjunto de sedes
+    "UE_IPRESS_POOLS": (("users", "ipress"), lambda users, ipress: build_ue_pools(
+        users.values["USERS"], ipress.values["IPRESS_SEARCH"])),
+    "SIGA_TEXT_INDEX": (("siga",), lambda siga: build_siga_text_index(siga.values["SIGA_MIN_INDEX"]),
+        None, lambda text, siga: text.updated(siga.values["SIGA_MIN_INDEX"])),
+    "SIGA_JSON": (("siga",), lambda siga: build_siga_json(siga.values["SIGA_MIN_INDEX"]),
+        None, lambda frags, siga: frags.updated(siga.values["SIGA_MIN_INDEX"])),
+}
+
+
+# ----- ingesta por delta (una exportación nueva se aplica como altas/cambios/bajas) -----
+
+def _delta_siga(config, prev: dict, values: dict):
+    """
+    (índices a publicar, conteos | None). None = no aplica (p.ej. SHARED_STORE: el
+    .db es por versión del archivo) y se publica lo nuevo tal cual.
+    """
+    old, new = prev.get("SIGA_MIN_INDEX"), values.get("SIGA_MIN_INDEX")
+    if not config["SIGA_DELTA"] or not isinstance(old, SigaIndex) or not isinstance(new, SigaIndex):
+        return values, None
+    delta = siga_diff(old, new)
+    counts = delta.counts()
+    if not delta:
+        return prev, counts
+    merged = apply_delta(old, delta)
+    counts["sedes_changed"] = set(merged.active_sedes()) != set(old.active_sedes())
+    return {"SIGA_MIN_INDEX": merged}, counts
+
+
+# nombre -> función de delta (ver _delta_siga)
+DELTAS = {"siga": _delta_siga}
+
+# claves de Config que necesitan los _parse_* (lo único que viaja al proceso hijo)
+_PARSE_CONFIG_KEYS = ("EXCEL_SNAPSHOTS", "USERS_SHEET", "SIGA_STREAMING")
+
+
+def _parse_in_child(conn, name: str, config: dict, path: str) -> None:
+    """
+    Corre en el proceso hijo: parsea el Excel (y escribe su snapshot) y manda
+    ("ok", datos, segundos) o ("error", excepción, segundos) por el pipe.
+    """
+    t0 = time.perf_counter()
+    try:
+        msg = ("ok", DATASETS[name][1](config, path), time.perf_counter() - t0)
+    except Exception as e:
+        msg = ("error", e, time.perf_counter() - t0)
+    try:
+        conn.send(msg)
+    except Exception as e:  # excepción o datos no serializables
+        conn.send(("error", RuntimeError(repr(e)), time.perf_counter() - t0))
+    finally:
+        conn.close()
+
+
+def _can_fork() -> bool:
+    """
+    Los procesos hijos se crean con fork (heredan la app ya importada). Con spawn
+    (Windows) el hijo volvería a importar el paquete y a ejecutar create_app(), así
+    que ahí se carga en serie.
+    """
+    import multiprocessing
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _stat(path: str):
+    """(tamaño, mtime_ns) del archivo o None si no existe."""
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _version_of(path: str, stat) -> str:
+    """Versión estable entre procesos: misma ruta+tamaño+mtime -> misma versión."""
+    raw = f"{Path(path).resolve()}|{stat[0] if stat else 0}|{stat[1] if stat else 0}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+class DatasetVersion:
+    """Una versión cargada de un dataset (no se modifica después de crearse)."""
+
+    __slots__ = ("name", "version", "generation", "path", "stat", "values",
+                 "records", "loaded_at", "load_seconds")
+
+    def __init__(self, name, version, generation, path, stat, values, records, loaded_at, load_seconds):
+        self.name = name
+        self.version = version
+        self.generation = generation
+        self.path = path
+        self.stat = stat
+        self.values = values
+        self.records = records
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "generation": self.generation,
+            "file": Path(self.path).name,   # sin la ruta del servidor (status/readyz son públicos)
+            "records": self.records,
+            "loaded_at": self.loaded_at.isoformat(timespec="seconds"),
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+
+class Datasets:
+    """Registro de los maestros de una app Flask (vive en app.extensions['datasets'])."""
+
+    def __init__(self, app):
+        self.app = app
+        self._current: dict[str, DatasetVersion] = {}
+        self._errors: dict[str, str] = {}
+        self._pending: dict[str, tuple] = {}   # último stat visto (para esperar a que el archivo se estabilice)
+        self._locks = {name: threading.RLock() for name in DATASETS}  # una carga a la vez por dataset
+        self._loading: set[str] = set()
+        self._derived: dict[str, tuple] = {}   # clave -> (versiones de las dependencias, valor)
+        self._derived_lock = threading.Lock()
+        self._history = {name: deque(maxlen=max(1, app.config["DATASET_HISTORY"])) for name in DATASETS}
+        self._watcher = None
+        self._stop = threading.Event()
+
+    # ----- rutas -----
+
+    def resolve_path(self, name: str) -> str:
+        """
+        Ruta vigente del Excel. Si Config apunta a una de las rutas candidatas, se
+        vuelve a aplicar find_first (p.ej. aparece un archivo de mayor prioridad);
+        si alguien la fijó a mano, se respeta tal cual.
+        """
+        file_key = DATASETS[name][0]
+        path = str(self.app.config[file_key])
+        candidates = tuple(self.app.config.get(f"{file_key}_CANDIDATES") or ())
+        if candidates and path in {str(c) for c in candidates}:
+            return find_first(*candidates)
+        return path
+
+    # ----- carga -----
+
+    def load(self, name: str, parsed=None) -> DatasetVersion:
+        """
+        Construye la versión actual del dataset y la publica (swap atómico).
+        `parsed` = (ruta, datos, segundos) ya parseados en otro proceso (ver load_all);
+        los segundos del parseo se suman a load_seconds.
+        """
+        _, parse, build, keys = DATASETS[name]
+        with self._locks[name]:
+            path = self.resolve_path(name)
+            stat = _stat(path)
+            parse_seconds = 0.0
+            if parsed is not None and parsed[0] == path:
+                get_raw = lambda: parsed[1]
+                parse_seconds = parsed[2] if len(parsed) > 2 else 0.0
+            else:
+                get_raw = lambda: parse(self.app.config, path)
+            self._loading.add(name)
+            t0 = time.perf_counter()
+            try:
+                values = build(self.app.config, path, get_raw)
+            finally:
+                self._loading.discard(name)
+            prev = self._current.get(name)
+            counts = None
+            if prev is not None and name in DELTAS:
+                values, counts = DELTAS[name](self.app.config, prev.values, values)
+            elapsed = time.perf_counter() - t0 + parse_seconds
+
+            # sin cambios en el contenido: misma versión y generación (cachés y derivados siguen valiendo)
+            same = counts is not None and values is prev.values
+            ver = DatasetVersion(
+                name=name,
+                version=prev.version if same else _version_of(path, stat),
+                generation=prev.generation if same else (prev.generation + 1) if prev else 1,
+                path=path,
+                stat=stat,
+                values=values,
+                records=len(values.get(keys[0]) or ()),
+                loaded_at=datetime.now(),
+                load_seconds=elapsed,
+            )
+            self._current[name] = ver          # ← el swap
+            self.app.config.update(values)     # espejo en app.config
+            self._errors.pop(name, None)
+            self._pending.pop(name, None)
+            self._history[name].appendleft({**ver.as_dict(), "source": "excel", "changes": counts})
+
+        if counts is None:
+            print(f"[DATA] {name}: v{ver.version} ({ver.records} registros, {elapsed:.2f}s)")
+        else:
+            print(f"[DATA] {name}: v{ver.version} delta +{counts['inserts']} ~{counts['updates']} "
+                  f"-{counts['deletes']} ({ver.records} registros, {elapsed:.2f}s)")
+        if same:
+            return ver
+        if counts is not None:
+            self._keep_derived(name, prev, ver, counts)
+        self._refresh_derived(name)
+        return ver
+
+    def merge(self, name: str, merge, source: str) -> DatasetVersion:
+        """
+        Publica una versión nueva del dataset a partir de la vigente, sin releer su Excel
+        (p.ej. las filas que subió una UE, ver siga_upload.py). `merge(values)` devuelve
+        (índices, conteos); si devuelve los mismos índices, se conserva la versión vigente.
+        Si después cambia el Excel central, la recarga manda (compara contra ese archivo).
+        """
+        keys = DATASETS[name][3]
+        with self._locks[name]:
+            prev = self.ensure(name)
+            t0 = time.perf_counter()
+            values, counts = merge(prev.values)
+            if values is prev.values:
+                self._history[name].appendleft({**prev.as_dict(), "source": source, "changes": counts})
+                return prev
+            ver = DatasetVersion(
+                name=name,
+                version=hashlib.sha1(f"{prev.version}|{source}|{time.time_ns()}".encode()).hexdigest()[:12],
+                generation=prev.generation + 1,
+                path=prev.path,
+                stat=prev.stat,                # el Excel no cambió: el watcher no lo recarga
+                values=values,
+                records=len(values.get(keys[0]) or ()),
+                loaded_at=datetime.now(),
+                load_seconds=time.perf_counter() - t0,
+            )
+            self._current[name] = ver          # ← el swap
+            self.app.config.update(values)
+            self._history[name].appendleft({**ver.as_dict(), "source": source, "changes": counts})
+
+        print(f"[DATA] {name}: v{ver.version} ({source}) +{counts['inserts']} ~{counts['updates']} "
+              f"-{counts['deletes']} ({ver.records} registros)")
+        self._keep_derived(name, prev, ver, counts)
+        self._refresh_derived(name)
+        return ver
+
+    def _keep_derived(self, name: str, prev: DatasetVersion, ver: DatasetVersion, counts: dict) -> None:
+        """
+        Tras un delta, los derivados que siguen valiendo (ver DERIVED) pasan a la versión
+        nueva sin rearmarse, y los que saben aplicarse el delta (update) se actualizan.
+        """
+        with self._derived_lock:
+            for key, (deps, _, *opt) in DERIVED.items():
+                keep, update = (*opt, None, None)[:2]
+                cached = self._derived.get(key)
+                old_sig = (name, prev.generation)
+                if name not in deps or cached is None or old_sig not in cached[0]:
+                    continue
+                sig = tuple((n, ver.generation) if (n, g) == old_sig else (n, g) for n, g in cached[0])
+                if keep is not None and keep(counts):
+                    self._derived[key] = (sig, cached[1])
+                elif update is not None:
+                    t0 = time.perf_counter()
+                    value = update(cached[1], ver)
+                    if value is not None:
+                        self._derived[key] = (sig, value)   # ← el swap
+                        print(f"[DATA] {key}: {len(value)} entradas, delta ({time.perf_counter() - t0:.2f}s)")
+
+    def history(self, name: str) -> list[dict]:
+        """Últimas cargas del dataset (la más reciente primero), con los conteos del delta si lo hubo."""
+        return list(self._history.get(name, ()))
+
+    def _refresh_derived(self, name: str) -> None:
+        """Rearma (ya, no en el primer request) los derivados de `name` cuyas dependencias están cargadas."""
+        for key, (deps, *_) in DERIVED.items():
+            if name in deps and all(d in self._current for d in deps):
+                try:
+                    self.derived(key)
+                except Exception as e:  # se reintenta al pedirlo
+                    print(f"[DATA] {key}: error al armar: {e!r}")
+
+    def derived(self, key: str):
+        """Índice derivado vigente (ver DERIVED); se rearma si cambió alguna de sus dependencias."""
+        deps, build, *_ = DERIVED[key]
+        vers = [self.ensure(d) for d in deps]
+        sig = tuple((v.name, v.generation) for v in vers)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        with self._derived_lock:
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == sig:
+                return cached[1]
+            t0 = time.perf_counter()
+            value = build(*vers)
+            self._derived[key] = (sig, value)   # ← el swap
+            print(f"[DATA] {key}: {len(value)} entradas ({time.perf_counter() - t0:.2f}s)")
+            return value
+
+    def load_all(self, parallel: bool | None = None) -> None:
+        """
+        Carga todos los maestros. En paralelo (PARALLEL_LOAD), cada Excel se parsea en
+        su propio proceso (openpyxl es CPU puro: con hilos no se gana nada por el GIL)
+        y el arranque dura lo que el Excel más lento, no la suma de los tres.
+        Los errores se reportan por dataset; si alguno falla, se relanza el primero.
+        """
+        if parallel is None:
+            parallel = self.app.config.get("PARALLEL_LOAD", False)
+        if not parallel or not _can_fork():
+            for name in DATASETS:
+                self.load(name)
+            return
+
+        import multiprocessing
+        from multiprocessing.connection import wait
+
+        config = {k: self.app.config[k] for k in _PARSE_CONFIG_KEYS}
+        paths = {name: self.resolve_path(name) for name in DATASETS}
+        # SHARED_STORE con el .db ya construido: cargar es abrirlo, no hay Excel que parsear
+        # (ni índice que mandar por el pipe), así que no se crea el hijo
+        stored = [name for name in DATASETS if self._store_ready(name, paths[name])]
+        failures = {}
+        t0 = time.perf_counter()
+
+        # Process + Pipe directos (fork): el hijo ya tiene la función, no hay que importarla de nuevo
+        ctx = multiprocessing.get_context("fork")
+        procs, conns = {}, {}
+        for name in DATASETS:
+            if name in stored:
+                continue
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_parse_in_child, args=(child_conn, name, config, paths[name]),
+                               name=f"load-{name}", daemon=True)
+            proc.start()
+            child_conn.close()
+            procs[name], conns[parent_conn] = proc, name
+
+        for name in stored:   # mientras los hijos parsean
+            try:
+                self.load(name)
+            except Exception as e:
+                failures[name] = e
+                self._errors[name] = repr(e)
+                print(f"[DATA] {name}: error al cargar: {e!r}")
+
+        # se arma cada índice apenas llega su Excel parseado
+        while conns:
+            for conn in wait(list(conns)):
+                name = conns.pop(conn)
+                try:
+                    status, payload, seconds = conn.recv()
+                except EOFError:
+                    status, payload, seconds = "error", RuntimeError("el proceso hijo terminó sin responder"), 0.0
+                finally:
+                    conn.close()
+                try:
+                    if status != "ok":
+                        raise payload
+                    print(f"[DATA] {name}: Excel parseado en {seconds:.2f}s (proceso hijo)")
+                    self.load(name, parsed=(paths[name], payload, seconds))
+                except Exception as e:
+                    failures[name] = e
+                    self._errors[name] = repr(e)
+                    print(f"[DATA] {name}: error al cargar: {e!r}")
+        for proc in procs.values():
+            proc.join()
+        print(f"[DATA] carga paralela: {time.perf_counter() - t0:.2f}s")
+
+        if failures:
+            name, err = next(iter(failures.items()))
+            raise RuntimeError(f"No se pudieron cargar: {', '.join(failures)}") from err
+
+    def _store_ready(self, name: str, path: str) -> bool:
+        config = self.app.config
+        return (bool(config["SHARED_STORE"]) and name in STORE_KINDS
+                and store_ready(path, name, config["SHARED_STORE_DIR"]))
+
+    def ensure(self, name: str) -> DatasetVersion:
+        """Versión vigente; si aún no se cargó (modo lazy), la carga ahora."""
+        ver = self._current.get(name)
+        if ver is not None:
+            return ver
+        with self._locks[name]:
+            ver = self._current.get(name)  # otro hilo pudo cargarlo mientras esperábamos
+            if ver is not None:
+                return ver
+            try:
+                return self.load(name)
+            except Exception as e:
+                self._errors[name] = repr(e)
+                raise
+
+    def get(self, name: str) -> DatasetVersion | None:
+        return self._current.get(name)
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._current
+
+    def value(self, key: str, default=None):
+        """
+        Índice vigente por su clave ('USERS', 'IPRESS_SEARCH', 'SIGA_MIN_INDEX', ...).
+        En modo lazy, el primer acceso carga el dataset que la produce.
+        """
+        if key in DERIVED:
+            return self.derived(key)
+        name = DATASET_OF_KEY.get(key)
+        if name is None:
+            return default
+        return self.ensure(name).values.get(key, default)
+
+    def start_warmup(self, names=None) -> threading.Thread:
+        """Carga en segundo plano los datasets aún no cargados (los requests no esperan)."""
+        names = list(names or DATASETS)
+
+        def run():
+            for name in names:
+                try:
+                    self.ensure(name)
+                except Exception as e:
+                    print(f"[DATA] {name}: error en la precarga: {e!r}")
+
+        t = threading.Thread(target=run, name="datasets-warmup", daemon=True)
+        t.start()
+        return t
+
+    # ----- recarga en caliente -----
+
+    def changed(self, name: str) -> bool:
+        """¿El Excel (o la ruta resuelta) cambió respecto de la versión cargada?"""
+        ver = self._current.get(name)
+        path = self.resolve_path(name)
+        stat = _stat(path)
+        if stat is None:
+            return False  # archivo ausente (p.ej. en plena copia): se mantiene la versión actual
+        return ver is None or path != ver.path or stat != ver.stat
+
+    def check_for_changes(self) -> list[str]:
+        """
+        Recarga los datasets cuyo Excel cambió. Espera a que el stat se repita en dos
+        revisiones seguidas para no leer un archivo a medio copiar. Devuelve los recargados.
+        """
+        reloaded = []
+        for name in DATASETS:
+            # en modo lazy no se carga aquí lo que nadie ha pedido todavía
+            if name not in self._current or not self.changed(name):
+                self._pending.pop(name, None)
+                continue
+            path = self.resolve_path(name)
+            seen = (path, _stat(path))
+            if self._pending.get(name) != seen:
+                self._pending[name] = seen
+                continue
+            try:
+                self.load(name)
+                reloaded.append(name)
+            except Exception as e:  # se mantiene la versión anterior
+                self._errors[name] = repr(e)
+                self._pending.pop(name, None)
+                print(f"[DATA] {name}: error al recargar, se mantiene la versión actual: {e!r}")
+        return reloaded
+
+    def start_watcher(self, interval: float) -> None:
+        """Hilo de fondo que revisa los Excel cada `interval` segundos (0 = no hace nada)."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"[DATA] error en el recargador: {e!r}")
+
+        self._watcher = threading.Thread(target=run, name="datasets-reloader", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+    # ----- estado -----
+
+    def status(self) -> dict:
+        out = {}
+        for name in DATASETS:
+            ver = self._current.get(name)
+            info = ver.as_dict() if ver else {"version": None}
+            info["ready"] = ver is not None
+            info["loading"] = name in self._loading
+            if name in self._errors:
+                info["last_error"] = self._errors[name]
+            out[name] = info
+        return out
+
+
+def init_datasets(app) -> Datasets:
+    datasets = Datasets(app)
+    app.extensions["datasets"] = datasets
+    return datasets
+
+
+def register_cli(app) -> None:
+    import click
+
+    @app.cli.command("build-store")
+    def build_store():
+        """Construye los .db compartidos de IPRESS, SIGA y alias de sedes antes de levantar los workers."""
+        datasets = app.extensions["datasets"]
+        app.config["SHARED_STORE"] = True
+        for name in STORE_KINDS:
+            ver = datasets.load(name)
+            click.echo(f"{name}: {store_path(ver.path, name, app.config['SHARED_STORE_DIR'])}")
+        click.echo(f"alias: {datasets.derived('SIGA_SEDE_ALIASES').db_path}")
+
+    @app.cli.command("profile-loaders")
+    @click.option("--only", multiple=True, type=click.Choice(["ipress", "siga", "siga_streaming"]),
+                  help="Solo estos loaders (se puede repetir).")
+    @click.option("--no-memory", is_flag=True, help="Sin la corrida con tracemalloc (solo tiempos).")
+    @click.option("--cprofile", type=click.Path(dir_okay=False), help="Guarda un .prof por loader (cProfile).")
+    @click.option("--tracemalloc", "tracemalloc_path", type=click.Path(dir_okay=False),
+                  help="Guarda las líneas que más memoria retienen (tracemalloc).")
+    @click.option("--json", "json_path", type=click.Path(dir_okay=False), help="Guarda el reporte en JSON.")
+    def profile_loaders_cmd(only, no_memory, cprofile, tracemalloc_path, json_path):
+        """Tiempo y pico de memoria por fase de los loaders IPRESS y SIGA, y tamaño de los índices."""
+        import json
+        from .loader_profile import format_report, profile_loaders
+
+        report = profile_loaders(app.config["IPRESS_FILE"], app.config["SIGA_FILE"], only=only,
+                                 memory=not no_memory, cprofile_path=cprofile,
+                                 tracemalloc_path=tracemalloc_path)
+        click.echo(format_report(report))
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def get_index(key: str, default=None):
+    """
+    Índice vigente de la app actual. Tomarlo UNA vez por request y trabajar con esa
+    referencia: si hay una recarga a mitad del request, se sigue usando la anterior.
+    """
+    datasets = current_app.extensions.get("datasets")
+    if datasets is None:
+        return current_app.config.get(key, default)
+    return datasets.value(key, default)
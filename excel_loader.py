@@ -1,11 +1,14 @@
 # app/excel_loader.py
 
+from contextlib import nullcontext
 from pathlib import Path
 import re
 import unicodedata
 import pandas as pd
 from datetime import datetime  # <-- esto es para e tiempo del excel del siga 
 
+from .siga_index import BAD_DATE, NO_DATE, SigaIndex
+
 # =========================
 # USUARIOS (login por UE)
 # =========================
@@ -72,11 +75,22 @@ def _ue_key(val) -> str:
     return digits[-4:] if len(digits) >= 4 else digits
 
 
+# =========================
+# FASES (para perfilar los loaders, ver loader_profile.py)
+# =========================
+#
+# load_ipress / load_siga_min aceptan `phase`: un callable nombre -> context manager
+# que envuelve cada fase (lectura, hoja, encabezados, normalización, fechas, índice).
+# Por defecto no hace nada.
+
+def _no_phase(name: str):
+    return nullcontext()
+
 # =========================
 # IPRESS (UE -> lista de EESS)
 # =========================
 
-def load_ipress(xlsx_path: str, sheet_name: str | None = None) -> dict:
+def load_ipress(xlsx_path: str, sheet_name: str | None = None, phase=_no_phase) -> dict:
     """
     Devuelve un dict agrupado por UE normalizada (últimos 4 dígitos):
       {
@@ -100,9 +114,46 @@ def load_ipress(xlsx_path: str, sheet_name: str | None = None) -> dict:
     engine = "openpyxl" if path.suffix.lower() == ".xlsx" else "xlrd"
 
     # Si no se especifica hoja, pandas puede devolver un dict de DataFrames
-    raw = pd.read_excel(path, sheet_name=sheet_name if sheet_name else None, engine=engine)
+    with phase("read"):
+        raw = pd.read_excel(path, sheet_name=sheet_name if sheet_name else None, engine=engine)
+
+    with phase("sheet"):
+        df = _ipress_sheet(raw, sheet_name)
+
+    with phase("headers"):
+        use_cols, new_names = _ipress_columns(df)
+
+    with phase("normalize"):
+        df = df[use_cols].fillna("")
+        df.columns = new_names
+
+        # normaliza strings
+        for c in new_names:
+            df[c] = df[c].astype(str).str.strip()
 
-    # ---------- elegir DataFrame (hoja) ----------
+        # agrega la clave de agrupación por UE (últimos 4 dígitos)
+        df["ue_key"] = df["ue_bruto"].apply(_ue_key)
+
+    # --- agrupar por UE normalizada ---
+    with phase("index"):
+        by_ue: dict[str, list[dict[str, str]]] = {}
+        for row in df.to_dict("records"):
+            k = row.get("ue_key", "")
+            rec = {
+                "ue_key": k,  # guardado por si lo quieres usar/depurar
+                "ipress_codigo": row.get("ipress_codigo", ""),
+                "eess_nombre": row.get("eess_nombre", ""),
+                "eess_categoria": row.get("eess_categoria", ""),
+            }
+            if k:
+                by_ue.setdefault(k, []).append(rec)
+            else:
+                by_ue.setdefault("_sin_ue", []).append(rec)
+
+    return by_ue
+
+def _ipress_sheet(raw, sheet_name: str | None) -> pd.DataFrame:
+    """Elige la hoja IPRESS (la pedida, o la primera con UE, IPRESS y nombre)."""
     if isinstance(raw, dict):
         if sheet_name and sheet_name in raw:
             df = raw[sheet_name]
@@ -131,8 +182,10 @@ def load_ipress(xlsx_path: str, sheet_name: str | None = None) -> dict:
                 df = next(iter(raw.values()))
     else:
         df = raw
+    return df
 
-    # ---------- mapear encabezados reales ----------
+def _ipress_columns(df: pd.DataFrame) -> tuple[list, list[str]]:
+    """(columnas reales a usar, nombres internos) según los encabezados de la hoja."""
     norm_cols = {_norm_header(c): c for c in df.columns}
 
     def pick(*candidates: str) -> str | None:
@@ -164,36 +217,8 @@ def load_ipress(xlsx_path: str, sheet_name: str | None = None) -> dict:
         raise ValueError("No se detectaron columnas obligatorias: (Código UE, Código Único/IPRESS, Nombre).")
 
     use_cols = [ue_col, ipr_col, name_col] + ([categ_col] if categ_col else [])
-    df = df[use_cols].fillna("")
-
     new_names = ["ue_bruto", "ipress_codigo", "eess_nombre"] + (["eess_categoria"] if categ_col else [])
-    df.columns = new_names
-
-    # normaliza strings
-    for c in new_names:
-        df[c] = df[c].astype(str).str.strip()
-
-    # agrega la clave de agrupación por UE (últimos 4 dígitos)
-    df["ue_key"] = df["ue_bruto"].apply(_ue_key)
-
-    # --- agrupar por UE normalizada ---
-    by_ue: dict[str, list[dict[str, str]]] = {}
-    for row in df.to_dict("records"):
-        k = row.get("ue_key", "")
-        rec = {
-            "ue_key": k,  # guardado por si lo quieres usar/depurar
-            "ipress_codigo": row.get("ipress_codigo", ""),
-            "eess_nombre": row.get("eess_nombre", ""),
-            "eess_categoria": row.get("eess_categoria", ""),
-        }
-        if k:
-            by_ue.setdefault(k, []).append(rec)
-        else:
-            by_ue.setdefault("_sin_ue", []).append(rec)
-
-    total = sum(len(v) for v in by_ue.values() if v)
-
-    return by_ue
+    return use_cols, new_names
 
 # --- PEGAR AQUÍ EL HELPER DE FECHAS ---
 def _parse_excel_date(val):
@@ -269,77 +294,181 @@ def _n(s: str) -> str:
     t = ''.join(c for c in t if not unicodedata.combining(c))
     return re.sub(r'[^a-z0-9]', '', t.lower())
 
-# instruccion para fechas de la antiguedad con fecha actual
-def _years_from(date_val) -> str:
-    """Devuelve años completos (floor) desde date_val hasta hoy. '' si no hay fecha."""
-    try:
-        ts = _parse_excel_date(date_val)  # ← USAR EL HELPER AQUÍ
-        if pd.isna(ts):
-            return ""
-        delta_days = (pd.Timestamp.today().normalize() - ts.normalize()).days
-        years = int(delta_days // 365.25)  # aprox
-        return str(max(years, 0))
-    except Exception:
-        return ""
+# ----- versiones por columna (sin iterrows) -----
+
+_RE_ISO_DATE = r"^\d{4}-\d{2}-\d{2}"
+_RE_DMY_DATE = r"^\d{1,2}[/-]\d{1,2}[/-]\d{4}"
+
+def _map_distinct(values: pd.Series, fn) -> pd.Series:
+    """Aplica fn UNA vez por valor distinto de la columna y mapea el resultado."""
+    uniq = pd.unique(values)
+    return values.map(dict(zip(uniq, map(fn, uniq))))
+
+def _parse_date_column(values: pd.Series) -> dict:
+    """
+    Versión por columna de _parse_excel_date. Devuelve {texto_original: Timestamp|NaT}
+    para cada valor DISTINTO de la columna (memo): en el SIGA hay muchas filas con la
+    misma fecha de adquisición.
+
+    Detecta el formato por grupos (ISO Y-m-d / D-M-Y) y parsea cada grupo con un solo
+    pd.to_datetime. Lo que no calza con el formato detectado cae al parser escalar.
+    """
+    uniq = pd.Series(pd.unique(values), dtype=object)
+    txt = uniq.astype(str).str.strip()
+    out = pd.Series(pd.NaT, index=uniq.index, dtype="datetime64[ns]")
+
+    iso = txt.str.match(_RE_ISO_DATE)
+    dmy = ~iso & txt.str.match(_RE_DMY_DATE)
+    groups = [
+        (iso, lambda t: pd.to_datetime(t, format="ISO8601", errors="coerce")),
+        (dmy, lambda t: pd.to_datetime(t.str.replace("-", "/", regex=False), format="%d/%m/%Y", errors="coerce")),
+    ]
+    for mask, parse in groups:
+        if not mask.any():
+            continue
+        try:
+            out[mask] = parse(txt[mask])
+        except (ValueError, TypeError):  # p.ej. zonas horarias mezcladas
+            pass
+
+    # resto (formatos raros o que el formato rápido no resolvió): parser escalar
+    pending = out.isna() & (txt != "")
+    for i in uniq.index[pending]:
+        ts = _parse_excel_date(uniq[i])
+        try:
+            out[i] = ts
+        except (ValueError, TypeError):
+            pass
+    return dict(zip(uniq, out))
+
+def _date_ordinals(texts) -> dict:
+    """
+    {texto: ordinal del día | BAD_DATE | NO_DATE} para textos DISTINTOS de fecha de
+    adquisición (lo que guarda SigaIndex; la antigüedad se calcula al responder).
+    """
+    parsed = _parse_date_column(pd.Series(list(texts), dtype=object))
+    out = {}
+    for txt, ts in parsed.items():
+        if not str(txt).strip():
+            out[txt] = NO_DATE
+        elif pd.isna(ts):
+            out[txt] = BAD_DATE
+        else:
+            out[txt] = ts.date().toordinal()
+    return out
 
 # ===== Índice SIGA mínimo con FECHA_ADQUISICION -> ANTIGÜEDAD =====
-def load_siga_min(xlsx_path: str) -> dict:
+
+# Candidatos por columna (normalizados)
+C_SEDE   = {"nombresede","sede","establecimiento","eess","ipress","nombreipress","nombr e sede"}
+C_CODPAT = {"codigopatrimonial","codpatrimonial","codpat","codigopatrim","patrimonial","cp","codpatrimo"}
+C_DEN    = {
+    "denominaciondelequipamientoexistente","denominaciondelbien","descripciondelbien",
+    "descripcionbien","descripcion","denominacion","bienes","bien"
+}
+C_MARCA  = {"marca"}
+C_MODELO = {"modelo"}
+C_SERIE  = {"serie","nserie","numeroserie","ser ie","serieplacaderodaje","placa","serieplaca"}
+C_ANTI   = {"antiguedad","antiguedad(anios)","antiguedadanos","antiguedadyears"}
+C_FECHA  = {"fechaadquisicion","fecha adquisicion","fechadeadquisicion","fecadq","fechaadq","fec_adq"}
+
+def _siga_pick(map_cols: dict, *cand_sets: set[str]):
+    """Devuelve el valor (nombre REAL / posición) de la primera coincidencia."""
+    keys = set(map_cols.keys())
+    for cset in cand_sets:
+        for c in cset:
+            if c in keys:
+                return map_cols[c]
+    # extra: si no hubo match exacto, intenta por 'contiene'
+    for key_norm, real in map_cols.items():
+        if any(any(c in key_norm for c in cset) for cset in cand_sets):
+            return real
+    return None
+
+def _siga_columns(headers) -> dict | None:
+    """
+    Resuelve las columnas SIGA a partir de la fila de encabezados.
+    Devuelve {'sede': h, 'codpat': h, 'den': h|None, ...} o None si la hoja
+    no tiene, al menos, sede y código patrimonial. Los valores son los mismos
+    objetos de `headers` (nombre real en pandas, posición en modo streaming).
+    """
+    # mapa: encabezado_normalizado -> encabezado_real
+    colmap = {_n(h): h for h in headers}
+    sede_col   = _siga_pick(colmap, C_SEDE)
+    codpat_col = _siga_pick(colmap, C_CODPAT)
+    if sede_col is None or codpat_col is None:
+        return None
+    return {
+        "sede":   sede_col,
+        "codpat": codpat_col,
+        "den":    _siga_pick(colmap, C_DEN),
+        "marca":  _siga_pick(colmap, C_MARCA),
+        "modelo": _siga_pick(colmap, C_MODELO),
+        "serie":  _siga_pick(colmap, C_SERIE),
+        "anti":   _siga_pick(colmap, C_ANTI),     # opcional
+        "fecha":  _siga_pick(colmap, C_FECHA),    # opcional (para calcular antigüedad)
+    }
+
+def _siga_add(idx: SigaIndex, sede, cod, den, marca, modelo, serie, fecha, anti) -> None:
+    """
+    Agrega (o pisa) una fila al índice SIGA. Los valores ya vienen como str ('' si no hay).
+    La fecha queda como texto hasta idx.resolve_dates(_date_ordinals).
+    """
+    sede_key = _norm_text_basic(sede)
+    if not sede_key:
+        return
+    cod = re.sub(r"\s+", "", cod)
+    if not cod:
+        return
+
+    # Antigüedad: preferimos FECHA_ADQUISICION si es válida (se calcula al responder);
+    # si no, se usa la columna ANTIGÜEDAD tal cual.
+    idx.add(sede_key, cod, den[:255], marca[:255], modelo[:255], serie[:255], anti[:255], fecha.strip())
+
+# cada cuántas filas se avisa el avance (modo streaming con progress)
+PROGRESS_EVERY = 2000
+
+def load_siga_min(xlsx_path: str, streaming: bool = False, progress=None, phase=_no_phase) -> SigaIndex:
     """
     Índice SIGA por:
       key = (sede_normalizada, codigo_patrimonial_sin_espacios)
       value = {denominacion, marca, modelo, serie, antiguedad}
+    (SigaIndex: se usa como dict pero guarda sedes y valores sin repetir, ver siga_index.py)
 
     - Detecta múltiples nombres de columnas (flexible).
     - Si existe FECHA_ADQUISICION (o variantes), calcula antigüedad en años.
+    - streaming=True: lee con openpyxl en modo read-only, fila por fila, sin
+      DataFrames (memoria acotada al tamaño del índice final).
+    - progress(filas_leidas, total | None): solo en modo streaming, cada PROGRESS_EVERY filas.
+    - phase(nombre): context manager por fase (ver _no_phase). En modo streaming la
+      lectura, la normalización y el armado van fila por fila en la fase "rows".
     """
     path = Path(xlsx_path)
     if not path.exists():
         raise FileNotFoundError(f"No se encontró el Excel SIGA: {path}")
 
+    if streaming:
+        idx = _load_siga_stream(path, progress, phase)
+        print("[SIGA] registros indexados:", len(idx))
+        return idx
+
     # Lee todas las hojas (dtype=str evita NaN y mantiene codigos como texto)
-    book = pd.read_excel(path, sheet_name=None, dtype=str, engine="openpyxl")
-
-    # Candidatos por columna (normalizados)
-    C_SEDE   = {"nombresede","sede","establecimiento","eess","ipress","nombreipress","nombr e sede"}
-    C_CODPAT = {"codigopatrimonial","codpatrimonial","codpat","codigopatrim","patrimonial","cp","codpatrimo"}
-    C_DEN    = {
-        "denominaciondelequipamientoexistente","denominaciondelbien","descripciondelbien",
-        "descripcionbien","descripcion","denominacion","bienes","bien"
-    }
-    C_MARCA  = {"marca"}
-    C_MODELO = {"modelo"}
-    C_SERIE  = {"serie","nserie","numeroserie","ser ie","serieplacaderodaje","placa","serieplaca"}
-    C_ANTI   = {"antiguedad","antiguedad(anios)","antiguedadanos","antiguedadyears"}
-    C_FECHA  = {"fechaadquisicion","fecha adquisicion","fechadeadquisicion","fecadq","fechaadq","fec_adq"}
-
-    def pick(map_cols: dict[str,str], *cand_sets: set[str]) -> str|None:
-        """Devuelve el nombre REAL de la primera coincidencia."""
-        keys = set(map_cols.keys())
-        for cset in cand_sets:
-            for c in cset:
-                if c in keys:
-                    return map_cols[c]
-        # extra: si no hubo match exacto, intenta por 'contiene'
-        for key_norm, real in map_cols.items():
-            if any(any(c in key_norm for c in cset) for cset in cand_sets):
-                return real
-        return None
+    with phase("read"):
+        book = pd.read_excel(path, sheet_name=None, dtype=str, engine="openpyxl")
 
     chosen_df = None
-    chosen_cols = None
+    cols = None
 
     # Elige la primera hoja que tenga, al menos, sede y código patrimonial
-    for sheet_name, df in book.items():
-        if not isinstance(df, pd.DataFrame) or df.empty:
-            continue
-        # mapa: encabezado_normalizado -> encabezado_real
-        colmap = {_n(c): c for c in df.columns}
-        sede_col   = pick(colmap, C_SEDE)
-        codpat_col = pick(colmap, C_CODPAT)
-        if sede_col and codpat_col:
-            chosen_df = df.fillna("")
-            chosen_cols = colmap
-            break
+    with phase("sheet"):
+        for sheet_name, df in book.items():
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                continue
+            with phase("headers"):
+                cols = _siga_columns(df.columns)
+            if cols:
+                chosen_df = df
+                break
 
     if chosen_df is None:
         # diagnóstico: imprime encabezados por hoja
@@ -349,46 +478,109 @@ def load_siga_min(xlsx_path: str) -> dict:
                 print(f"  - Hoja '{sheet_name}':", list(df.columns))
         raise ValueError("No se encontraron columnas básicas del SIGA. Revisa encabezados.")
 
-    # Resolver todas las columnas
-    sede_col   = pick(chosen_cols, C_SEDE)
-    codpat_col = pick(chosen_cols, C_CODPAT)
-    den_col    = pick(chosen_cols, C_DEN)    or ""
-    marca_col  = pick(chosen_cols, C_MARCA)  or ""
-    modelo_col = pick(chosen_cols, C_MODELO) or ""
-    serie_col  = pick(chosen_cols, C_SERIE)  or ""
-    anti_col   = pick(chosen_cols, C_ANTI)   or ""     # opcional
-    fecha_col  = pick(chosen_cols, C_FECHA)  or ""     # opcional (para calcular antigüedad)
-
-    # Indexado
-    idx: dict[tuple[str,str], dict] = {}
-    for _, r in chosen_df.iterrows():
-        sede_key = _norm_text_basic(r.get(sede_col, ""))
-        if not sede_key:
-            continue
-        cod = re.sub(r"\s+", "", str(r.get(codpat_col, "")))
-        if not cod:
-            continue
-
-        # Datos base
-        den   = str(r.get(den_col, ""))[:255] if den_col else ""
-        marca = str(r.get(marca_col, ""))[:255] if marca_col else ""
-        modelo= str(r.get(modelo_col, ""))[:255] if modelo_col else ""
-        serie = str(r.get(serie_col, ""))[:255] if serie_col else ""
-
-        # Antigüedad: preferimos FECHA_ADQUISICION si está; si no, tomamos la columna ANTIGÜEDAD tal cual.
-        antig = ""
-        if fecha_col:
-            antig = _years_from(r.get(fecha_col, ""))
-        if not antig and anti_col:
-            antig = str(r.get(anti_col, ""))[:255]
-
-        idx[(sede_key, cod)] = {
-            "denominacion": den,
-            "marca":        marca,
-            "modelo":       modelo,
-            "serie":        serie,
-            "antiguedad":   antig,
-        }
+    with phase("normalize"):
+        chosen_df = chosen_df.fillna("")
+    idx = _siga_index_from_frame(chosen_df, cols, phase)
 
     print("[SIGA] registros indexados:", len(idx))
     return idx
+
+def _siga_index_from_frame(df: pd.DataFrame, cols: dict, phase=_no_phase) -> SigaIndex:
+    """
+    Construye el índice columna a columna (sin iterrows): normaliza sede y código
+    como Series completas, parsea FECHA_ADQUISICION una sola vez por columna y
+    luego arma el dict con zip. Mismo resultado que _siga_add fila por fila.
+    """
+    empty = pd.Series("", index=df.index, dtype=object)
+
+    def column(role) -> pd.Series:
+        c = cols[role]
+        return df[c].astype(str) if c is not None else empty
+
+    with phase("normalize"):
+        sede = _map_distinct(column("sede"), _norm_text_basic)
+        cod = column("codpat").str.replace(r"\s+", "", regex=True)
+        den, marca, modelo, serie = (column(r).str.slice(0, 255) for r in ("den", "marca", "modelo", "serie"))
+
+        # Antigüedad: se guarda la FECHA_ADQUISICION parseada (una vez por texto distinto) y la
+        # columna ANTIGÜEDAD tal cual, para cuando no hay fecha válida.
+        anti = column("anti").str.slice(0, 255)
+        fecha = column("fecha").str.strip()
+
+    with phase("index"):
+        idx = SigaIndex.from_columns(sede, cod, den, marca, modelo, serie, anti, fecha)
+    with phase("dates"):
+        idx.resolve_dates(_date_ordinals)
+    return idx
+
+# ----- Modo streaming (openpyxl read-only) -----
+
+def _cell_str(v) -> str:
+    """Celda openpyxl -> str, igual que pandas con dtype=str ('' para vacías)."""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+def _siga_stream_sheets(path: Path, phase=_no_phase):
+    """
+    Recorre las hojas leyendo SOLO la fila de encabezados (y una fila para saber
+    si la hoja tiene datos). Produce (nombre_hoja, encabezados, cols, filas, total) donde
+    `filas` es un iterador perezoso de tuplas con TODAS las filas de datos y `total`
+    la cantidad estimada de filas (None si el archivo no la guarda).
+    """
+    from itertools import chain
+    from openpyxl import load_workbook
+
+    with phase("read"):
+        wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            with phase("sheet"):
+                rows = ws.iter_rows(values_only=True)
+                header = next(rows, None)
+                first = next(rows, None)
+            if header is None or first is None:
+                continue
+            with phase("headers"):
+                # mismos nombres que pandas para columnas sin título
+                headers = [_cell_str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+                positions = {h: i for i, h in enumerate(headers)}
+                cols = _siga_columns(headers)
+                if cols:
+                    cols = {role: (positions[h] if h is not None else None) for role, h in cols.items()}
+            total = ws.max_row - 1 if ws.max_row else None   # según la dimensión guardada (puede faltar)
+            yield ws.title, headers, cols, chain([first], rows), total
+    finally:
+        wb.close()
+
+def _load_siga_stream(path: Path, progress=None, phase=_no_phase) -> SigaIndex:
+    seen = []
+    for sheet_name, headers, cols, rows, total in _siga_stream_sheets(path, phase):
+        seen.append((sheet_name, headers))
+        if not cols:
+            continue
+
+        roles = ("sede", "codpat", "den", "marca", "modelo", "serie", "fecha", "anti")
+        positions = [cols[r] for r in roles]
+
+        idx = SigaIndex()
+        with phase("rows"):
+            for i, row in enumerate(rows, 1):
+                n = len(row)
+                vals = [_cell_str(row[p]) if p is not None and p < n else "" for p in positions]
+                _siga_add(idx, *vals)
+                if progress is not None and i % PROGRESS_EVERY == 0:
+                    progress(i, total)
+        if progress is not None:
+            progress(i, i)
+        # fechas: un solo parseo por columna de los textos distintos
+        with phase("dates"):
+            idx.resolve_dates(_date_ordinals)
+        return idx
+
+    print("[SIGA][debug] No se halló hoja con Sede y Código Patrimonial.")
+    for sheet_name, headers in seen:
+        print(f"  - Hoja '{sheet_name}':", headers)
+    raise ValueError("No se encontraron columnas básicas del SIGA. Revisa encabezados.")
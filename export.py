@@ -0,0 +1,79 @@
+# app/export.py
+
+import csv
+import io
+
+from .sede_alias import resolve_sedes
+
+# =========================
+# EXPORTACIÓN FORMATO 8 (todas las EESS de una UE + su equipamiento SIGA)
+# =========================
+#
+# Las filas se generan de a una recorriendo los índices en memoria: una fila por
+# bien patrimonial del SIGA cuya sede sea una EESS de la UE (reconocida con la misma
+# tabla de alias que el lookup), y una fila vacía de equipamiento para cada EESS sin
+# bienes en el SIGA. Los campos de evaluación
+# (C1–C6, tipo, ambiente, UPSS) quedan en blanco para llenarse a mano.
+
+FORMATO8_HEADERS = [
+    "PLIEGO", "UNIDAD EJECUTORA", "CODIGO IPRESS", "ESTABLECIMIENTO DE SALUD", "CATEGORIA DEL EESS",
+    "CODIGO PATRIMONIAL", "AMBIENTE", "UNIDAD PRESTADORA DE SERVICIO DE SALUD (UPSS)",
+    "DENOMINACION DEL EQUIPAMIENTO EXISTENTE", "MARCA", "MODELO", "SERIE / PLACA DE RODAJE",
+    "ANTIGUEDAD", "VIDA UTIL", "TIPO DE EQUIPAMIENTO", "C1", "C2", "C3", "C4", "C5", "C6",
+]
+
+
+# cómo se reconoció la sede (sede_alias.resolve): si dos EESS reconocen la misma sede,
+# sus bienes van con la del nivel más estricto
+_MATCH_RANK = {"exacta": 0, "alias": 1, "ipress": 2}
+
+
+def formato8_rows(pliego: str, ue: str, establecimientos: list[dict], siga_index, aliases=None):
+    """
+    Genera las filas del Formato 8 (sin encabezado), EESS por EESS. Cada EESS se ubica
+    en el SIGA igual que en /api/siga/lookup (resolve_sedes con la tabla de alias) y
+    solo se recorren esas sedes (sede_items), no el SIGA entero.
+    """
+    resolved = [resolve_sedes(aliases, e.get("eess_nombre", ""), e.get("ipress_codigo", ""))
+                for e in establecimientos]
+    owner: dict[str, int] = {}   # sede -> EESS a la que van sus bienes
+    for i, (sedes, how) in sorted(enumerate(resolved), key=lambda t: _MATCH_RANK.get(t[1][1], len(_MATCH_RANK))):
+        for sede in sedes:
+            owner.setdefault(sede, i)
+
+    for i, e in enumerate(establecimientos):
+        eess = [pliego, ue, e.get("ipress_codigo", ""), e.get("eess_nombre", ""), e.get("eess_categoria", "")]
+        empty = True
+        for sede in resolved[i][0]:
+            if owner[sede] != i:
+                continue
+            for cod, rec in _sede_items(siga_index, sede):
+                empty = False
+                yield eess + [
+                    cod, "", "",
+                    rec.get("denominacion", ""), rec.get("marca", ""), rec.get("modelo", ""), rec.get("serie", ""),
+                    rec.get("antiguedad", ""), "", "", "", "", "", "", "", "",
+                ]
+        if empty:
+            yield eess + [""] * (len(FORMATO8_HEADERS) - 5)
+
+
+def _sede_items(siga_index, sede: str):
+    """(cod, registro) de una sede: SigaIndex / SigaStore la recorren sin tocar las demás."""
+    if hasattr(siga_index, "sede_items"):
+        return siga_index.sede_items(sede)
+    return ((cod, rec) for (key, cod), rec in siga_index.items() if key == sede)
+
+
+def stream_csv(rows):
+    """Generador de bytes CSV (UTF-8 con BOM para que Excel respete las tildes)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    yield "\ufeff".encode("utf-8")
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() > 64 * 1024:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
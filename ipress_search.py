@@ -0,0 +1,279 @@
+# app/ipress_search.py
+
+from bisect import bisect_left, bisect_right
+import heapq
+import re
+import unicodedata
+
+from .json_body import dumps, json_array
+
+# =========================
+# ÍNDICE DE BÚSQUEDA IPRESS (por UE)
+# =========================
+#
+# Antes /api/ipress/search normalizaba TODOS los nombres del pool en cada request
+# (dos veces: para filtrar y para ordenar). Aquí esas formas se calculan una sola
+# vez al cargar el maestro, y se arma un índice invertido por UE para tocar solo
+# los candidatos. El orden de resultados es EXACTAMENTE el de antes:
+#   0) nombre compacto empieza con la consulta compacta
+#   1) todos los tokens de la consulta están en el nombre
+#   2) la consulta está en el código IPRESS
+# (desempate por largo y luego por posición en el maestro).
+
+GLOBAL_POOL = "*"
+
+_SEP = "\n"  # separador de los textos concatenados (no aparece en consultas normalizadas)
+
+
+def remove_accents_lower(s: str) -> str:
+    s = ''.join(c for c in unicodedata.normalize('NFKD', str(s)) if not unicodedata.combining(c))
+    return s.lower()
+
+
+def normalize_for_tokens(s: str) -> str:
+    s = remove_accents_lower(s)
+    s = re.sub(r'[^a-z0-9 ]+', ' ', s)
+    s = re.sub(r'\s+', ' ', s).strip()
+    return s
+
+
+def _joined(values: list[str]) -> tuple[str, list[int]]:
+    """Concatena valores con _SEP y devuelve (texto, posiciones de inicio)."""
+    starts, pos = [], 0
+    for v in values:
+        starts.append(pos)
+        pos += len(v) + 1
+    return _SEP.join(values), starts
+
+
+def _find_all(text: str, starts: list[int], sub: str) -> set[int]:
+    """Ids de los valores de `text` que contienen `sub` (puede incluir falsos positivos que crucen _SEP)."""
+    out = set()
+    pos = text.find(sub)
+    while pos != -1:
+        i = bisect_right(starts, pos) - 1
+        out.add(i)
+        # salta al siguiente valor: ya sabemos que este contiene `sub`
+        nxt = starts[i + 1] if i + 1 < len(starts) else len(text)
+        pos = text.find(sub, max(nxt, pos + 1))
+    return out
+
+
+class IpressPool:
+    """
+    Pool de establecimientos de una UE con sus formas normalizadas precalculadas:
+      toks[i] -> 'centro de salud san jose'   (normalize_for_tokens)
+      cmps[i] -> 'centrodesaludsanjose'       (compacto)
+    más un índice invertido palabra -> ids y los nombres compactos ordenados
+    (búsqueda por prefijo con bisect), y cada registro ya serializado a JSON
+    (fragments[i], ver search_json).
+    """
+
+    def __init__(self, records: list[dict], toks: list[str] | None = None, raw_lower: list[str] | None = None,
+                 fragments: list[bytes] | None = None):
+        self.records = records
+        self.fragments = fragments if fragments is not None else [dumps(r) for r in records]
+        self.codes = [str(r.get("ipress_codigo", "")) for r in records]
+        if toks is None or raw_lower is None:
+            names = [str(r.get("eess_nombre", "")) for r in records]
+            toks = [normalize_for_tokens(n) for n in names]
+            raw_lower = [" ".join(n.lower().split()) for n in names]
+        self.toks = toks
+        self.cmps = [t.replace(" ", "") for t in toks]
+        self.raw_lower = raw_lower
+
+        # palabra -> ids (en orden del maestro)
+        self.postings: dict[str, list[int]] = {}
+        for i, t in enumerate(self.toks):
+            for w in set(t.split()):
+                self.postings.setdefault(w, []).append(i)
+        self.vocab = sorted(self.postings)
+
+        self.by_cmp = sorted((c, i) for i, c in enumerate(self.cmps))
+        self.raw_text, self.raw_starts = _joined(self.raw_lower)
+        self.code_text, self.code_starts = _joined(self.codes)
+
+        # memo: token de consulta -> ids de nombres que lo contienen
+        self._token_memo: dict[str, frozenset[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def client_payload(self) -> dict:
+        """
+        El pool para buscar en el navegador: columnas paralelas (menos JSON que una
+        lista de dicts) con el nombre ya normalizado, para que el script aplique las
+        mismas reglas y el mismo orden que search().
+        """
+        return {
+            "codes": self.codes,
+            "names": [str(r.get("eess_nombre", "")) for r in self.records],
+            "cats": [str(r.get("eess_categoria", "")) for r in self.records],
+            "toks": self.toks,
+        }
+
+    # ----- candidatos -----
+
+    def _ids_for_token(self, t: str) -> frozenset[int]:
+        """
+        Ids cuyo nombre normalizado contiene `t`. Como `t` no tiene espacios, eso
+        equivale a que `t` esté dentro de alguna palabra: se recorre el vocabulario
+        (palabras distintas, mucho menor que el pool), no los registros.
+        """
+        hit = self._token_memo.get(t)
+        if hit is not None:
+            return hit
+        ids = set()
+        # palabras que empiezan con t (caso típico) vía bisect, luego las que lo contienen en medio
+        lo = bisect_left(self.vocab, t)
+        hi = bisect_left(self.vocab, t + "\uffff")
+        for w in self.vocab[lo:hi]:
+            ids.update(self.postings[w])
+        for w in self.vocab[:lo] + self.vocab[hi:]:
+            if t in w:
+                ids.update(self.postings[w])
+        hit = frozenset(ids)
+        if len(self._token_memo) > 4096:
+            self._token_memo.clear()
+        self._token_memo[t] = hit
+        return hit
+
+    def _ids_with_prefix(self, prefix: str) -> list[int]:
+        lo = bisect_left(self.by_cmp, (prefix,))
+        hi = bisect_left(self.by_cmp, (prefix + "\uffff",))
+        return [i for _, i in self.by_cmp[lo:hi]]
+
+    # ----- búsqueda -----
+
+    def search(self, q: str, limit: int = 10) -> list[dict]:
+        return [self.records[i] for i in self.search_ids(q, limit)]
+
+    def search_json(self, q: str, limit: int = 10) -> tuple[bytes, int]:
+        """(lista JSON de los resultados armada con los fragmentos, cantidad)."""
+        ids = self.search_ids(q, limit)
+        return json_array(self.fragments[i] for i in ids), len(ids)
+
+    def search_ids(self, q: str, limit: int = 10) -> list[int]:
+        q = (q or "").strip()
+        if not q:
+            return []
+
+        q_tokens_str = normalize_for_tokens(q)
+        tokens = q_tokens_str.split()
+        q_compact = q_tokens_str.replace(" ", "")
+        raw_q_lower = " ".join(q.lower().split())
+
+        # Candidatos (superconjunto de los que calzan)
+        cand: set[int] = set()
+        if tokens:
+            sets = sorted((self._ids_for_token(t) for t in tokens), key=len)
+            cand.update(sets[0].intersection(*sets[1:]))
+        if q_compact:
+            cand.update(self._ids_with_prefix(q_compact))
+        if raw_q_lower:
+            cand.update(_find_all(self.raw_text, self.raw_starts, raw_q_lower))
+        cand.update(_find_all(self.code_text, self.code_starts, q))
+
+        def matches(i):
+            if tokens and all(t in self.toks[i] for t in tokens):
+                return True
+            if q_compact and self.cmps[i].startswith(q_compact):
+                return True
+            if raw_q_lower and raw_q_lower in self.raw_lower[i]:
+                return True
+            if q in self.codes[i]:
+                return True
+            return False
+
+        def score(i):
+            name_tok, name_cmp, code = self.toks[i], self.cmps[i], self.codes[i]
+            if name_cmp.startswith(q_compact): return (0, len(name_cmp), i)
+            if tokens and all(t in name_tok for t in tokens): return (1, len(name_tok), i)
+            if q in code: return (2, len(code), i)
+            return (9, 9999, i)
+
+        hits = [i for i in cand if matches(i)]
+        return heapq.nsmallest(limit, hits, key=score)
+
+
+def build_ipress_pools(ipress_by_ue: dict) -> dict[str, IpressPool]:
+    """
+    Un IpressPool por cada clave de IPRESS_BY_UE, más GLOBAL_POOL ('*') con todo
+    el país (mismo orden que concatenar las listas), para el último recurso.
+    """
+    everything = [r for items in ipress_by_ue.values() for r in items]
+    world = IpressPool(everything)
+
+    # cada UE es un tramo contiguo del pool global: se reutilizan sus formas normalizadas
+    pools, start = {}, 0
+    for k, items in ipress_by_ue.items():
+        end = start + len(items)
+        pools[k] = IpressPool(items, world.toks[start:end], world.raw_lower[start:end], world.fragments[start:end])
+        start = end
+    pools[GLOBAL_POOL] = world
+    return pools
+
+
+# ----- UE del usuario -> pool (se resuelve al cargar, no en cada búsqueda) -----
+
+def resolve_ue_pool(pools, ue_codigo) -> tuple[str | None, list[str]]:
+    """
+    (clave del pool, claves candidatas) de una UE: sus últimos 4 dígitos ('001-721'
+    -> '1721') y, si no hay pool con esa clave, las claves que terminan igual (se
+    toma la primera, como antes). (None, []) si no hay ninguna.
+    """
+    digits = re.sub(r"\D", "", str(ue_codigo or ""))
+    ue_key = digits[-4:]
+    if not ue_key:
+        return None, []
+    if ue_key in pools:
+        return ue_key, [ue_key]
+    cands = [k for k in pools if k != GLOBAL_POOL and k.endswith(ue_key)]
+    return (cands[0] if cands else None), cands
+
+
+class UePools:
+    """
+    ue_codigo (tal como viene en el maestro de usuarios) -> clave del pool IPRESS,
+    o GLOBAL_POOL si la UE no tiene pool propio. Se arma una vez por versión de
+    usuarios + IPRESS (ver datasets.py); el login guarda la clave en la sesión.
+    """
+
+    def __init__(self, ue_codigos, pools):
+        self.keys: dict[str, str] = {}
+        self.unresolved: list[str] = []             # sin pool: buscan en el global
+        self.ambiguous: dict[str, list[str]] = {}   # varias claves con el mismo sufijo
+        for ue in ue_codigos:
+            key, cands = resolve_ue_pool(pools, ue)
+            if key is None:
+                self.unresolved.append(ue)
+                key = GLOBAL_POOL
+            elif len(cands) > 1:
+                self.ambiguous[ue] = cands
+            self.keys[ue] = key
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def report(self) -> dict:
+        return {"ues": len(self.keys), "unresolved": self.unresolved, "ambiguous": self.ambiguous}
+
+
+def build_ue_pools(users: dict, pools) -> UePools:
+    table = UePools(users, pools)
+    if table.unresolved:
+        print(f"[DATA] UEs sin pool IPRESS (usan el global): {len(table.unresolved)} ->",
+              ", ".join(table.unresolved[:20]) + (" ..." if len(table.unresolved) > 20 else ""))
+    for ue, cands in table.ambiguous.items():
+        print(f"[DATA] UE {ue}: sufijo ambiguo {cands}, se usa {cands[0]}")
+    return table
+
+
+def ue_pool_key(ue_pools: UePools | None, pools, ue_codigo) -> str:
+    """Clave del pool de la UE: de la tabla precalculada, o resuelta al vuelo si no está."""
+    if ue_pools is not None:
+        key = ue_pools.keys.get(ue_codigo)
+        if key is not None and key in pools:
+            return key
+    key, _ = resolve_ue_pool(pools, ue_codigo)
+    return key or GLOBAL_POOL
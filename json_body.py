@@ -0,0 +1,112 @@
+# app/json_body.py
+
+import gzip
+import json
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+# =========================
+# JSON PRESERIALIZADO Y COMPRESIÓN NEGOCIADA
+# =========================
+#
+# Las respuestas de búsqueda (/api/ipress/search, /api/siga/*) repiten siempre los
+# mismos registros. Cada registro (o cada texto del SIGA) se serializa UNA vez al
+# armar el índice (fragmento de bytes) y la respuesta se arma concatenando
+# fragmentos (RawJson). Lo que no se puede precalcular (sede, cómo se ubicó,
+# antigüedad del día) pasa por dumps(): orjson si está instalado, si no json
+# compacto. El mismo encoder lo usa jsonify() (JsonProvider).
+#
+# Compresión: las respuestas JSON de GZIP_MIN_BYTES o más se envían en gzip a los
+# navegadores que lo aceptan (conexiones lentas de regiones); las chicas van tal
+# cual (gzip no ahorra nada en unos cientos de bytes). Las cacheadas se comprimen
+# una vez y se guardan así (ver result_cache.cached_json).
+
+GZIP_LEVEL = 6
+
+
+def _default(o):
+    return DefaultJSONProvider.default(o)
+
+
+if orjson is not None:
+    # fechas por _default, como jsonify (http_date), y claves int como json.dumps
+    _ORJSON_OPTS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, default=_default,
+                            option=_ORJSON_OPTS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTS)
+else:
+    _encoders = {sort: json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default,
+                                        sort_keys=sort) for sort in (False, True)}
+
+    def dumps(obj, sort_keys: bool = False) -> bytes:
+        return _encoders[sort_keys].encode(obj).encode("utf-8")
+
+
+class RawJson:
+    """Cuerpo JSON ya serializado (fragmentos concatenados) y su resumen para métricas."""
+
+    __slots__ = ("body", "outcome")
+
+    def __init__(self, body: bytes, outcome=None):
+        self.body = body
+        self.outcome = outcome
+
+
+def json_array(fragments) -> bytes:
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def raw_response(raw: RawJson | bytes):
+    body = raw.body if isinstance(raw, RawJson) else raw
+    return current_app.response_class(body + b"\n", mimetype="application/json")
+
+
+class JsonProvider(DefaultJSONProvider):
+    """
+    jsonify() con el encoder rápido. Las claves salen ordenadas si sort_keys (como con el
+    proveedor de Flask); los textos no ASCII van en UTF-8 tal cual, no como \\uXXXX
+    (orjson no escapa: ensure_ascii queda en False también para json.dumps).
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.sort_keys).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, self.sort_keys) + b"\n", mimetype=self.mimetype)
+
+
+# ----- compresión -----
+
+def gzip_wanted(size: int) -> bool:
+    """¿Este cuerpo va en gzip? (tamaño mínimo configurado y el navegador lo acepta)."""
+    min_bytes = current_app.config.get("GZIP_MIN_BYTES", 0)
+    return 0 < min_bytes <= size and request.accept_encodings["gzip"] > 0   # "gzip;q=0" = no
+
+
+def _compress(resp):
+    if (resp.status_code != 200 or resp.mimetype != "application/json" or resp.direct_passthrough
+            or resp.is_streamed or "Content-Encoding" in resp.headers):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    body = resp.get_data()
+    if gzip_wanted(len(body)):
+        resp.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
+def init_json_responses(app) -> None:
+    app.json = JsonProvider(app)
+    app.after_request(_compress)
@@ -0,0 +1,260 @@
+# app/loader_profile.py
+
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+import cProfile
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+from .excel_loader import _no_phase, load_ipress, load_siga_min
+from .ipress_search import build_ipress_pools
+from .sede_alias import build_sede_aliases
+from .siga_index import build_siga_json
+from .siga_search import build_siga_text_index
+
+# =========================
+# PERFIL DE LOS LOADERS POR FASE (flask profile-loaders)
+# =========================
+#
+# Corre load_ipress y load_siga_min (pandas y streaming) contra los Excel
+# configurados y reparte el tiempo de pared y el pico de memoria entre sus fases
+# (el parámetro `phase` de los loaders, ver excel_loader.py):
+#   read       pd.read_excel / load_workbook (parseo del XML de openpyxl)
+#   sheet      elegir la hoja
+#   headers    mapear encabezados -> columnas
+#   normalize  fillna, strip, sede y código normalizados
+#   dates      FECHA_ADQUISICION -> ordinal (solo SIGA)
+#   index      armar el índice (dict por UE / SigaIndex)
+#   rows       solo streaming: lectura + normalización + índice, fila por fila
+# Los tiempos son EXCLUSIVOS (una fase anidada no cuenta en la de afuera) y lo que
+# queda fuera de toda fase sale como "(otros)". Igual que en bench/run.py, el tiempo
+# se mide en una corrida sin tracemalloc y la memoria en otra aparte (tracemalloc
+# hace todo varias veces más lento). El pico es la memoria trazada máxima durante
+# la fase, sobre la que había al empezar el loader.
+#
+# Después arma los índices que usa la app (pools de búsqueda, texto SIGA, JSON,
+# alias de sedes) y reporta el tamaño en memoria de cada uno. Opcionalmente guarda
+# un cProfile (.prof, para pstats/snakeviz) y las líneas que más memoria retienen
+# (tracemalloc) en archivos.
+
+PHASES = ("read", "sheet", "headers", "normalize", "dates", "index", "rows")
+OTHER = "(otros)"
+
+
+class PhaseTimer:
+    """`phase` para los loaders: acumula tiempo (y pico de memoria) exclusivo por fase."""
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.wall: dict[str, float] = {}
+        self.peak: dict[str, int] = {}
+        self._stack: list[str] = []
+        self._mark = 0.0
+        self._base = 0
+        self.total = 0.0
+
+    def _charge(self, now: float) -> None:
+        name = self._stack[-1]
+        self.wall[name] = self.wall.get(name, 0.0) + now - self._mark
+        if self.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak[name] = max(self.peak.get(name, 0), peak - self._base)
+            tracemalloc.reset_peak()
+        self._mark = now
+
+    @contextmanager
+    def __call__(self, name: str):
+        self._charge(time.perf_counter())
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self._stack.pop()
+
+    @contextmanager
+    def run(self):
+        """Envuelve la llamada completa al loader (lo que no cae en una fase va a OTHER)."""
+        gc.collect()
+        if self.memory:
+            self._base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._stack, self._mark = [OTHER], time.perf_counter()
+        t0 = self._mark
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self.total = time.perf_counter() - t0
+
+
+# ----- tamaño en memoria -----
+
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, seen: set | None = None) -> int:
+    """
+    Bytes de `obj` y todo lo que alcanza (gc.get_referents), sin contar clases,
+    módulos ni funciones. `seen` se comparte entre llamadas para no contar dos veces
+    lo que ya se midió (p.ej. los textos que un índice derivado toma del SIGA);
+    lo ya medido tiene que seguir vivo (los ids se reutilizan).
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    pending = [obj]
+    while pending:
+        o = pending.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        pending.extend(gc.get_referents(o))
+    return total
+
+
+# ----- corridas -----
+
+@contextmanager
+def _quiet():
+    with open(os.devnull, "w") as f, redirect_stdout(f):
+        yield
+
+
+def _loaders(ipress_path: str, siga_path: str) -> dict:
+    return {
+        "ipress": lambda phase: load_ipress(ipress_path, phase=phase),
+        "siga": lambda phase: load_siga_min(siga_path, phase=phase),
+        "siga_streaming": lambda phase: load_siga_min(siga_path, streaming=True, phase=phase),
+    }
+
+
+def _mb(n: int) -> float:
+    return round(n / 2**20, 2)
+
+
+def profile_loaders(ipress_path: str, siga_path: str, only=None, memory: bool = True,
+                    cprofile_path: str | None = None, tracemalloc_path: str | None = None) -> dict:
+    """
+    {loader: {"file", "records", "wall_s", "peak_mb", "phases": {fase: {"wall_s", "share", "peak_mb"}}},
+     "indexes": {índice: {"build_s", "size_mb", "entries"}}}
+    """
+    loaders = {k: fn for k, fn in _loaders(ipress_path, siga_path).items() if not only or k in only}
+    files = {"ipress": ipress_path, "siga": siga_path, "siga_streaming": siga_path}
+    out: dict = {}
+    results = {}
+    if tracemalloc_path:
+        open(tracemalloc_path, "w").close()
+
+    for name, fn in loaders.items():
+        timer = PhaseTimer()
+        with _quiet(), timer.run():
+            results[name] = fn(timer)
+        out[name] = {"file": str(files[name]), "records": len(results[name]), "wall_s": round(timer.total, 4),
+                     "phases": {p: {"wall_s": round(w, 4), "share": round(w / timer.total, 3) if timer.total else 0.0}
+                                for p, w in _ordered(timer.wall)}}
+
+        if memory:
+            mem = PhaseTimer(memory=True)
+            tracemalloc.start()
+            try:
+                with _quiet(), mem.run():
+                    kept = fn(mem)
+                if tracemalloc_path:
+                    _write_tracemalloc(tracemalloc_path, name, tracemalloc.take_snapshot())
+            finally:
+                tracemalloc.stop()
+            del kept
+            out[name]["peak_mb"] = _mb(max(mem.peak.values(), default=0))
+            for p, peak in mem.peak.items():
+                out[name]["phases"].setdefault(p, {})["peak_mb"] = _mb(peak)
+
+        if cprofile_path:
+            prof = cProfile.Profile()
+            with _quiet():
+                prof.runcall(fn, _no_phase)
+            prof.dump_stats(_suffixed(cprofile_path, name))
+
+    out["indexes"] = _index_sizes(results)
+    return out
+
+
+def _ordered(wall: dict):
+    order = {p: i for i, p in enumerate((OTHER,) + PHASES)}
+    return sorted(wall.items(), key=lambda kv: order.get(kv[0], len(order)))
+
+
+def _suffixed(path: str, name: str) -> str:
+    """'perfil.prof' + 'siga' -> 'perfil.siga.prof' (un archivo por loader)."""
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.{name}{p.suffix or '.prof'}"))
+
+
+def _write_tracemalloc(path: str, name: str, snapshot, top: int = 30) -> None:
+    """Agrega al archivo las líneas que más memoria retienen al terminar el loader."""
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    stats = snapshot.statistics("lineno")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"== {name}: memoria retenida al terminar (top {top} líneas) ==\n")
+        for s in stats[:top]:
+            f.write(f"{_mb(s.size):>10} MB {s.count:>9} bloques  {s.traceback}\n")
+        f.write(f"{'total':>10}: {_mb(sum(s.size for s in stats))} MB\n\n")
+
+
+def _index_sizes(results: dict) -> dict:
+    """
+    Arma los índices de la app a partir de lo cargado y mide cada uno. Cada tamaño es
+    lo PROPIO del índice: lo que comparte con los anteriores (textos del SIGA en el
+    índice de texto, registros IPRESS en los pools) ya se contó arriba.
+    """
+    seen: set = set()
+    alive = []     # `seen` guarda ids: lo medido tiene que seguir vivo hasta el final
+    out = {}
+
+    def measure(name, obj, build_s=None):
+        alive.append(obj)
+        out[name] = {"build_s": round(build_s, 4) if build_s is not None else None,
+                     "size_mb": _mb(deep_sizeof(obj, seen)), "entries": len(obj)}
+
+    def built(name, fn):
+        t0 = time.perf_counter()
+        obj = fn()
+        measure(name, obj, time.perf_counter() - t0)
+        return obj
+
+    pools = None
+    if "ipress" in results:
+        measure("IPRESS_BY_UE", results["ipress"])
+        pools = built("IPRESS_SEARCH", lambda: build_ipress_pools(results["ipress"]))
+    siga = results.get("siga", results.get("siga_streaming"))
+    if siga is not None:
+        measure("SIGA_MIN_INDEX", siga)
+        built("SIGA_TEXT_INDEX", lambda: build_siga_text_index(siga))
+        built("SIGA_JSON", lambda: build_siga_json(siga))
+        if pools is not None:
+            built("SIGA_SEDE_ALIASES", lambda: build_sede_aliases(siga, pools))
+    return out
+
+
+def format_report(report: dict) -> str:
+    lines = []
+    for name, res in report.items():
+        if name == "indexes":
+            continue
+        peak = f", pico {res['peak_mb']} MB" if "peak_mb" in res else ""
+        lines.append(f"{name}: {res['records']} registros, {res['wall_s']} s{peak}  ({res['file']})")
+        for phase, r in res["phases"].items():
+            mem = f"{r['peak_mb']:>9} MB" if "peak_mb" in r else ""
+            wall = f"{r['wall_s']:>9} s {r['share']:>6.1%}" if "wall_s" in r else " " * 19
+            lines.append(f"  {phase:<10} {wall} {mem}")
+        lines.append("")
+    if report.get("indexes"):
+        lines.append("índices en memoria:")
+        for name, r in report["indexes"].items():
+            build = f"armado {r['build_s']} s" if r["build_s"] is not None else "(del loader)"
+            lines.append(f"  {name:<18} {r['size_mb']:>9} MB {r['entries']:>9} entradas  {build}")
+    return "\n".join(lines)
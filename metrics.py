@@ -0,0 +1,239 @@
+# app/metrics.py
+
+from bisect import bisect_left
+import threading
+import time
+
+from flask import Response, current_app, g, request
+
+# =========================
+# MÉTRICAS (formato de texto de Prometheus en /metrics)
+# =========================
+#
+# Sin dependencias: contadores e histogramas en memoria del proceso (con varios
+# workers, Prometheus raspa cada uno y suma). Se mide:
+#   - cada request de los blueprints views y auth: conteo por endpoint/método/estado
+#     y latencia (histograma, para sacar p95 con histogram_quantile)
+#   - /api/ipress/search por UE: latencia, tamaño del pool y resultados devueltos
+#   - /api/siga/*: encontrados / no encontrados y cómo se ubicó la sede
+#   - al raspar: versión, duración de carga y registros de cada maestro, los
+#     contadores de la caché de respuestas y los registros de log descartados
+
+INSTRUMENTED_BLUEPRINTS = ("views", "auth")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _num(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, by: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + by
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for lv, v in sorted(self.values.items()):
+            out.append(f"{self.name}{_labels(self.labels, lv)} {_num(v)}")
+        return out
+
+
+class Gauge(Counter):
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self.values[labels] = value
+
+    def render(self) -> list[str]:
+        out = super().render()
+        out[1] = f"# TYPE {self.name} gauge"
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series: dict[tuple, list] = {}   # labels -> [conteo por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self.series.get(labels)
+            if s is None:
+                s = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for lv, s in sorted(self.series.items()):
+            acc = 0
+            for le, n in zip(self.buckets + (float("inf"),), s):
+                acc += n
+                out.append(f"{self.name}_bucket{_labels(names, lv + (_num(le),))} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labels, lv)} {_num(s[-2])}")
+            out.append(f"{self.name}_count{_labels(self.labels, lv)} {s[-1]}")
+        return out
+
+
+class Metrics:
+    """Métricas de una app (viven en app.extensions['metrics'])."""
+
+    def __init__(self):
+        self.requests = Counter("app_http_requests_total", "Requests atendidos.",
+                                ("endpoint", "method", "status"))
+        self.latency = Histogram("app_http_request_duration_seconds", "Latencia de los requests.",
+                                 ("endpoint", "method"))
+        self.search_latency = Histogram("app_ipress_search_duration_seconds",
+                                        "Latencia de /api/ipress/search por UE.", ("ue",))
+        self.search_results = Counter("app_ipress_search_results_total",
+                                      "Resultados devueltos por /api/ipress/search.", ("ue",))
+        self.search_empty = Counter("app_ipress_search_empty_total",
+                                    "Búsquedas IPRESS sin resultados.", ("ue",))
+        self.pool_size = Gauge("app_ipress_pool_size", "Establecimientos en el pool de la UE.", ("ue",))
+        self.siga = Counter("app_siga_lookups_total", "Búsquedas SIGA por resultado y forma de ubicar la sede.",
+                            ("endpoint", "result", "match"))
+        self.collectors = [self.requests, self.latency, self.search_latency, self.search_results,
+                           self.search_empty, self.pool_size, self.siga]
+
+    def render(self, app) -> str:
+        lines = []
+        for c in self.collectors:
+            lines += c.render()
+        lines += _dataset_lines(app)
+        lines += _cache_lines(app)
+        lines += _log_lines(app)
+        return "\n".join(lines) + "\n"
+
+
+def _dataset_lines(app) -> list[str]:
+    datasets = app.extensions.get("datasets")
+    if datasets is None:
+        return []
+    status = datasets.status()
+    ready = Gauge("app_dataset_ready", "1 si el maestro está cargado.", ("dataset",))
+    records = Gauge("app_dataset_records", "Registros del índice principal del maestro.", ("dataset",))
+    seconds = Gauge("app_dataset_load_seconds", "Duración de la última carga del maestro.", ("dataset",))
+    generation = Gauge("app_dataset_generation", "Cargas del maestro desde el arranque.", ("dataset",))
+    errors = Gauge("app_dataset_error", "1 si la última carga del maestro falló.", ("dataset",))
+    for name, info in status.items():
+        ready.set(name, value=int(bool(info.get("ready"))))
+        errors.set(name, value=int("last_error" in info))
+        if info.get("ready"):
+            records.set(name, value=info["records"])
+            seconds.set(name, value=info["load_seconds"])
+            generation.set(name, value=info["generation"])
+    out = []
+    for m in (ready, records, seconds, generation, errors):
+        out += m.render()
+    return out
+
+
+def _cache_lines(app) -> list[str]:
+    caches = app.extensions.get("result_caches") or {}
+    if not caches:
+        return []
+    out = []
+    for field, kind, help in (("hits", "counter", "Aciertos de la caché de respuestas."),
+                              ("misses", "counter", "Fallos de la caché de respuestas."),
+                              ("evictions", "counter", "Entradas desalojadas (LRU)."),
+                              ("not_modified", "counter", "Respuestas 304 por ETag."),
+                              ("size", "gauge", "Entradas en la caché de respuestas.")):
+        name = f"app_result_cache_{field}" + ("_total" if kind == "counter" else "")
+        out += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for cache_name, cache in sorted(caches.items()):
+            out.append(f'{name}{{cache="{cache_name}"}} {cache.stats()[field]}')
+    return out
+
+
+def _log_lines(app) -> list[str]:
+    cfg = app.extensions.get("request_log")
+    if cfg is None:
+        return []
+    return ["# HELP app_log_dropped_total Registros de log descartados con la cola llena.",
+            "# TYPE app_log_dropped_total counter",
+            f"app_log_dropped_total {cfg.handler.dropped}"]
+
+
+# ----- instrumentación de requests -----
+
+def _before():
+    if request.blueprint in INSTRUMENTED_BLUEPRINTS:
+        g._metrics_t0 = time.perf_counter()
+
+
+def _record(status: int) -> None:
+    t0 = g.pop("_metrics_t0", None)
+    if t0 is None:
+        return
+    elapsed = time.perf_counter() - t0
+    m: Metrics = current_app.extensions["metrics"]
+    endpoint = request.endpoint or "?"
+    m.requests.inc(endpoint, request.method, str(status))
+    m.latency.observe(elapsed, endpoint, request.method)
+
+    # etiquetas que dejan los handlers (ver views.py / result_cache.py):
+    # result_outcome = nº de resultados (búsqueda IPRESS) o (resultado, match) (SIGA)
+    outcome = g.get("result_outcome")
+    ue = g.get("metrics_ue")
+    if ue is not None:
+        m.search_latency.observe(elapsed, ue)
+        if g.get("metrics_pool_size") is not None:
+            m.pool_size.set(ue, value=g.metrics_pool_size)
+        if isinstance(outcome, int):
+            m.search_results.inc(ue, by=outcome)
+            if outcome == 0:
+                m.search_empty.inc(ue)
+    if isinstance(outcome, tuple):
+        m.siga.inc(endpoint, *outcome)
+    for (result, match), n in (g.get("metrics_siga_batch") or {}).items():
+        m.siga.inc(endpoint, result, match, by=n)
+
+
+def _after(resp):
+    _record(resp.status_code)
+    return resp
+
+
+def _teardown(exc):
+    if exc is not None:
+        _record(500)  # excepción no manejada: after_request no corre
+
+
+def metrics_view():
+    return Response(current_app.extensions["metrics"].render(current_app),
+                    mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_metrics(app) -> Metrics | None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return None
+    m = Metrics()
+    app.extensions["metrics"] = m
+    app.before_request(_before)
+    app.after_request(_after)
+    app.teardown_request(_teardown)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    return m
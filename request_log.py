@@ -0,0 +1,182 @@
+# app/request_log.py
+
+from datetime import datetime
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+
+from flask import current_app, g, has_request_context, request, session
+
+# =========================
+# LOG ESTRUCTURADO DE REQUESTS (sin bloquear en la escritura)
+# =========================
+#
+# Los handlers calientes (/api/ipress/search, /api/siga/*) hacían print() en cada
+# request: stdout es un archivo con lock, bajo carga los hilos esperan su turno y
+# el colector recibe miles de líneas sueltas. Ahora:
+#   - log_event("siga.lookup", sede=..., hit=...) arma un registro con el id del
+#     request y el endpoint, y lo deja en una COLA (put_nowait: si la cola está
+#     llena se descarta y se cuenta, nunca se espera)
+#   - un hilo aparte (QueueListener) los escribe en stderr, una línea por registro
+#     (JSON o texto, LOG_FORMAT)
+#   - muestreo por endpoint (LOG_SAMPLE): la decisión se toma UNA vez por request y
+#     vale para todos sus eventos; los errores y los requests lentos (LOG_SLOW_MS)
+#     se escriben siempre
+#   - nivel mínimo global (LOG_LEVEL) y por endpoint (LOG_LEVELS)
+#   - al terminar cada request, una línea "request" con estado y duración; el id va
+#     también en la cabecera X-Request-ID (o se respeta el que mande el balanceador)
+
+LOGGER_NAME = "app"
+log = logging.getLogger(LOGGER_NAME)
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (y cuenta) en vez de bloquear si la cola está llena."""
+
+    dropped = 0
+
+    def enqueue(self, record) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        out = {"ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+               "level": record.levelname, "event": record.getMessage()}
+        out.update(getattr(record, "fields", {}))
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        ts = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        return f"{ts} {record.levelname} {record.getMessage()} {fields}".rstrip()
+
+
+def _parse_map(spec: str, convert) -> dict:
+    """'views.siga_lookup=0.1,*=1' -> {'views.siga_lookup': 0.1, '*': 1.0}; un valor solo = '*'."""
+    out = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, value = part.rpartition("=")
+        out[name.strip() or "*"] = convert(value.strip())
+    return out
+
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Nivel de log desconocido: {name}")
+    return level
+
+
+class RequestLog:
+    """Configuración del log de una app (vive en app.extensions['request_log'])."""
+
+    def __init__(self, config, handler: _QueueHandler):
+        self.handler = handler
+        self.sample = _parse_map(config["LOG_SAMPLE"], float)
+        self.levels = _parse_map(config["LOG_LEVELS"], _level)
+        self.level = _level(config["LOG_LEVEL"])
+        self.slow_s = config["LOG_SLOW_MS"] / 1000
+
+    def sample_rate(self, endpoint: str) -> float:
+        return self.sample.get(endpoint, self.sample.get("*", 1.0))
+
+    def level_of(self, endpoint: str) -> int:
+        return self.levels.get(endpoint, self.levels.get("*", self.level))
+
+
+# ----- registro -----
+
+def log_event(event: str, level: int = logging.INFO, **fields) -> None:
+    """
+    Encola un evento estructurado. Dentro de un request lleva request_id y endpoint,
+    y respeta el muestreo y el nivel del endpoint. No bloquea nunca.
+    """
+    if has_request_context() and "_log_t0" in g:
+        if level < g._log_level or (level < logging.WARNING and not g._log_sampled):
+            return
+        fields = {"request_id": g.request_id, "endpoint": request.endpoint, **fields}
+    elif level < logging.INFO:
+        return
+    log.log(level, event, extra={"fields": fields})
+
+
+def _before():
+    if request.endpoint == "static":
+        return
+    cfg: RequestLog = current_app.extensions["request_log"]
+    rid = request.headers.get("X-Request-ID", "")
+    g.request_id = rid if _REQUEST_ID.match(rid) else uuid.uuid4().hex[:16]
+    endpoint = request.endpoint or "?"
+    g._log_level = cfg.level_of(endpoint)
+    g._log_sampled = random.random() < cfg.sample_rate(endpoint)
+    g._log_t0 = time.perf_counter()
+
+
+def _after(resp):
+    t0 = g.get("_log_t0")
+    if t0 is None or g.get("_log_done"):
+        return resp
+    g._log_done = True
+    elapsed = time.perf_counter() - t0
+    resp.headers["X-Request-ID"] = g.request_id
+    cfg: RequestLog = current_app.extensions["request_log"]
+    level = logging.ERROR if resp.status_code >= 500 else logging.INFO
+    if elapsed >= cfg.slow_s:
+        level, g._log_sampled = max(level, logging.WARNING), True
+    log_event("request", level, method=request.method, path=request.path, status=resp.status_code,
+              duration_ms=round(elapsed * 1000, 2), ue=session.get("ue_codigo", ""))
+    return resp
+
+
+def _teardown(exc):
+    if exc is not None and "_log_t0" in g and not g.get("_log_done"):  # after_request no corrió
+        log_event("request", logging.ERROR, method=request.method, path=request.path, status=500,
+                  duration_ms=round((time.perf_counter() - g._log_t0) * 1000, 2), error=repr(exc))
+
+
+# ----- instalación -----
+
+_handler = None   # uno por proceso (varias apps en el mismo proceso comparten la cola)
+
+
+def _install(config) -> _QueueHandler:
+    global _handler
+    if _handler is None:
+        q = queue.Queue(maxsize=config["LOG_QUEUE_SIZE"])
+        out = logging.StreamHandler(sys.stderr)
+        out.setFormatter(JsonFormatter() if config["LOG_FORMAT"] == "json" else TextFormatter())
+        listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+        listener.start()
+        atexit.register(listener.stop)   # vacía la cola al salir
+        _handler = _QueueHandler(q)
+        log.addHandler(_handler)
+        log.setLevel(logging.DEBUG)      # el filtro real es log_event (nivel por endpoint)
+        log.propagate = False
+    return _handler
+
+
+def init_request_log(app) -> RequestLog:
+    cfg = RequestLog(app.config, _install(app.config))
+    app.extensions["request_log"] = cfg
+    app.before_request(_before)
+    app.after_request(_after)
+    app.teardown_request(_teardown)
+    return cfg
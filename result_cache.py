@@ -0,0 +1,169 @@
+# app/result_cache.py
+
+from collections import OrderedDict
+import gzip
+import hashlib
+import threading
+import time
+
+from flask import current_app, g, request, Response
+
+from .json_body import GZIP_LEVEL, RawJson, dumps, gzip_wanted
+
+# =========================
+# CACHÉ DE RESPUESTAS (LRU + TTL)
+# =========================
+#
+# Los usuarios presionan Enter varias veces con el mismo texto y todos los de una
+# UE buscan en el mismo pool. Aquí se guarda el cuerpo JSON FINAL de cada
+# respuesta por clave (p.ej. (ue_key, consulta normalizada) o (sede, código)):
+#   - acotada: como máximo RESULT_CACHE_SIZE entradas por caché (sale la menos usada)
+#   - con vencimiento: cada entrada vive RESULT_CACHE_TTL segundos
+#   - atada a la versión de los maestros: si cambia la versión (recarga del Excel),
+#     la caché se vacía entera en el siguiente acceso
+# Además cada respuesta lleva ETag (derivado de versión + clave) y
+# Cache-Control: private, no-cache, así el navegador revalida con If-None-Match
+# y recibe un 304 sin cuerpo. Las grandes se guardan también en gzip (json_body.py).
+
+
+class ResultCache:
+    """LRU con TTL y contadores. Thread-safe (un lock; las operaciones son O(1))."""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.tag = None                      # versión de los maestros de las entradas actuales
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = self.invalidations = 0
+        self.not_modified = 0                # 304: el navegador ya tenía la respuesta
+
+    def _check_tag(self, tag) -> None:
+        if tag != self.tag:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.tag = tag
+
+    def get(self, tag, key):
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            self._check_tag(tag)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, tag, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._check_tag(tag)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+            "hits": self.hits, "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions, "expired": self.expired, "invalidations": self.invalidations,
+            "not_modified": self.not_modified,
+        }
+
+
+# cachés de la app: una por familia de endpoints
+CACHE_NAMES = ("ipress_search", "siga_lookup", "ipress_pool", "siga_search")
+
+
+def init_result_caches(app) -> dict[str, ResultCache]:
+    size = app.config["RESULT_CACHE_SIZE"]
+    ttl = app.config["RESULT_CACHE_TTL"]
+    caches = {name: ResultCache(size, ttl) for name in CACHE_NAMES}
+    app.extensions["result_caches"] = caches
+    return caches
+
+
+def get_cache(name: str) -> ResultCache:
+    caches = current_app.extensions.setdefault("result_caches", {})
+    cache = caches.get(name)
+    if cache is None:
+        cache = caches[name] = ResultCache(0)  # app sin init_result_caches: sin caché
+    return cache
+
+
+def dataset_tag(*names: str) -> str:
+    """Versión combinada de los maestros indicados (cambia cuando se recarga alguno)."""
+    datasets = current_app.extensions.get("datasets")
+    if datasets is None:
+        return "0"
+    return "-".join(datasets.ensure(n).version for n in names)
+
+
+def cached_json(cache_name: str, tag: str, key: tuple, build, outcome=None) -> Response:
+    """
+    Respuesta JSON de `build()` cacheada por (tag, key), con ETag + Cache-Control. Si
+    el navegador ya tiene esa versión, responde 304 sin llamar a build() ni tocar la caché.
+    `build()` devuelve un objeto serializable o un RawJson (fragmentos ya serializados,
+    con su resumen para métricas).
+    `outcome(obj)` resume el resultado para las métricas; se guarda junto al cuerpo
+    (así también cuenta en los aciertos de caché) y queda en g.result_outcome.
+    Cuerpos de GZIP_MIN_BYTES o más van en gzip si el navegador lo acepta (comprimido
+    la primera vez y guardado en la entrada); el ETag lleva "-gz" en ese caso.
+    """
+    etag = hashlib.sha1(repr((cache_name, tag, key)).encode()).hexdigest()[:24]
+    cache = get_cache(cache_name)
+    # cualquiera de las dos codificaciones sirve: el contenido es el mismo
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(etag + "-gz"):
+        cache.count_not_modified()
+        resp = Response(status=304)
+        resp.set_etag(etag + ("-gz" if request.if_none_match.contains(etag + "-gz") else ""))
+    else:
+        entry = cache.get(tag, key)
+        if entry is None:
+            obj = build()
+            if isinstance(obj, RawJson):
+                body, result = obj.body + b"\n", obj.outcome
+            else:
+                body, result = dumps(obj) + b"\n", outcome(obj) if outcome else None
+            entry = [body, result, None]
+            cache.put(tag, key, entry)
+        body, g.result_outcome, gz_body = entry
+        if gzip_wanted(len(body)):
+            if gz_body is None:
+                gz_body = entry[2] = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            resp = Response(gz_body, mimetype="application/json")
+            resp.headers["Content-Encoding"] = "gzip"
+            resp.set_etag(etag + "-gz")
+        else:
+            resp = Response(body, mimetype="application/json")
+            resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Cookie")  # el resultado depende de la UE en sesión
+    resp.vary.add("Accept-Encoding")
+    return resp
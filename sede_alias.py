@@ -0,0 +1,231 @@
+# app/sede_alias.py
+
+import re
+
+from .excel_loader import _norm_text_basic, _site_key
+from .ipress_search import GLOBAL_POOL
+
+# =========================
+# ALIAS DE SEDE PARA EL SIGA
+# =========================
+#
+# El índice SIGA guarda la sede con _norm_text_basic ("c.s. san jose"), pero el
+# formulario manda el nombre de IPRESS tal cual ("C.S. SAN JOSÉ — 00001234") y cada
+# endpoint lo normalizaba distinto (_site_key expande CMI/CS/PS, _norm_sede no).
+# Resultado: muchos códigos válidos no se encontraban.
+#
+# Aquí se arma, al cargar, una tabla  forma_normalizada -> sede(s) del SIGA con
+# TODAS las formas de cada nombre de sede y de cada nombre IPRESS que coincide con
+# una sede (más el código IPRESS). Buscar = probar las formas del nombre recibido
+# en la tabla (unas pocas búsquedas en dict) y luego el código en SigaIndex.by_cod.
+#
+# Cómo se resolvió la sede (campo "sede_match" de las respuestas):
+#   exacta        el nombre normalizado es el de la sede del SIGA
+#   alias         coincide otra forma del nombre (abreviaturas, puntos, tildes, prefijo)
+#   ipress        por el nombre o código IPRESS enlazado a la sede
+#   codigo_unico  la sede no se reconoce, pero el código está en una sola sede
+#   sede_distinta el código existe, pero en otra(s) sede(s)   -> no encontrado
+#   ambigua       el código está en varias sedes y el nombre no decide -> no encontrado
+#   sin_codigo    el código no está en el SIGA                -> no encontrado
+#
+# La sede se resuelve por NIVELES y se usa el primero que reconoce alguna sede:
+#   1. formas que conservan el tipo (exacta / alias): el mismo establecimiento escrito distinto
+#   2. nombre o código IPRESS enlazado a una sede (ipress)
+#   3. el nombre sin el prefijo de tipo (alias / ipress), solo si 1 y 2 no reconocieron nada
+# Si el código no está en las sedes de ese nivel es "sede_distinta": no se baja al
+# siguiente (un P.S. SAN JOSE no toma los bienes del C.S. SAN JOSE).
+
+# prefijos de tipo de establecimiento (ya expandidos por _site_key)
+_TYPE_PREFIX = re.compile(
+    r"^(centro materno infantil|centro de salud|puesto de salud|hospital|policlinico|clinica)\s+"
+)
+# letras sueltas con punto: "c.s." -> "cs", "c.m.i." -> "cmi"
+_DOTTED = re.compile(r"(?<=\b[a-z])\.(?=[a-z]\b)")
+
+
+def only_name(establecimiento) -> str:
+    """'CMI MANUEL BARRETO — 6104' -> 'CMI MANUEL BARRETO'."""
+    return str(establecimiento or "").split(" — ", 1)[0].strip()
+
+
+def _split_forms(name) -> tuple[list[str], str | None]:
+    """(formas que conservan el tipo, nombre sin el prefijo de tipo | None si no tiene)."""
+    strict = sede_forms(name, strip_type=False)
+    loose = sede_forms(name)[-1] if strict else None
+    return strict, (loose if loose not in strict else None)
+
+
+def _union(groups) -> tuple[str, ...]:
+    out = ()
+    for sedes in groups:
+        for s in sedes or ():
+            if s not in out:
+                out += (s,)
+    return out
+
+
+def sede_forms(name, strip_type: bool = True) -> list[str]:
+    """
+    Formas normalizadas de un nombre de sede, de la más estricta a la más laxa:
+    la del índice SIGA, la canónica (_site_key), la canónica tras juntar siglas
+    con punto, la misma sin espacios y (strip_type) el nombre sin el prefijo de tipo.
+    """
+    basic = _norm_text_basic(only_name(name))
+    if not basic:
+        return []
+    canon = _site_key(_DOTTED.sub("", basic))
+    forms = [basic, _site_key(basic), canon, canon.replace(" ", "")]
+    if strip_type:
+        forms.append(_TYPE_PREFIX.sub("", canon))
+    out = []
+    for f in forms:
+        if f and f not in out:
+            out.append(f)
+    return out
+
+
+class SedeAliases:
+    """
+    Tabla forma -> sedes del SIGA. Se arma una vez por versión de SIGA + IPRESS
+    (ver datasets.py) y no se modifica después.
+    """
+
+    def __init__(self, siga_sedes, ipress_records=()):
+        self.sedes = set()
+        self.forms: dict[str, tuple[str, ...]] = {}      # forma -> sedes
+        self.ipress_forms: dict[str, tuple[str, ...]] = {}
+        self.ipress_codes: dict[str, tuple[str, ...]] = {}
+        self.loose: dict[str, tuple[str, ...]] = {}      # nombre sin tipo -> sedes (nivel 3)
+        self.ipress_loose: dict[str, tuple[str, ...]] = {}
+
+        for sede in siga_sedes:
+            self.sedes.add(sede)
+            strict, loose = _split_forms(sede)
+            for f in strict:
+                _add(self.forms, f, sede)
+            if loose:
+                _add(self.loose, loose, sede)
+
+        # IPRESS: se enlaza cada nombre con la(s) sede(s) que comparten su forma más estricta
+        # posible; sin quitar el prefijo de tipo (un P.S. no se enlaza con el C.S. del mismo nombre)
+        for r in ipress_records:
+            name = r.get("eess_nombre", "")
+            strict, loose = _split_forms(name)
+            sedes = None
+            for f in strict:
+                sedes = self.forms.get(f)
+                if sedes:
+                    break
+            if not sedes:
+                continue
+            for s in sedes:
+                for f in strict:
+                    if f not in self.forms:
+                        _add(self.ipress_forms, f, s)
+                if loose and loose not in self.loose:
+                    _add(self.ipress_loose, loose, s)
+            code = str(r.get("ipress_codigo", "")).strip()
+            if code:
+                for s in sedes:
+                    _add(self.ipress_codes, code, s)
+
+    def __len__(self) -> int:
+        return len(self.forms) + len(self.ipress_forms)
+
+    def resolve(self, establecimiento, ipress_codigo: str = "") -> tuple[tuple[str, ...], str]:
+        """
+        (sedes, cómo) del PRIMER nivel que reconoce alguna sede para el nombre (y
+        opcionalmente el código IPRESS) recibido; ((), "sin_sede") si ninguno. Cada
+        paso es una búsqueda en un dict.
+        """
+        strict, loose = _split_forms(establecimiento)
+        sedes = _union(self.forms.get(f) for f in strict)
+        if sedes:
+            if strict[0] in self.sedes:   # exacta: esa sede va primero
+                return (strict[0], *(x for x in sedes if x != strict[0])), "exacta"
+            return sedes, "alias"
+        sedes = _union([*(self.ipress_forms.get(f) for f in strict),
+                        self.ipress_codes.get(str(ipress_codigo or "").strip())])
+        if sedes:
+            return sedes, "ipress"
+        # sin tipo: el nombre recibido sin prefijo (o tal cual, si no lo traía)
+        keys = [*strict, loose] if loose else strict
+        for table, how in ((self.loose, "alias"), (self.ipress_loose, "ipress")):
+            sedes = _union(table.get(f) for f in keys)
+            if sedes:
+                return sedes, how
+        return (), "sin_sede"
+
+
+def _add(table: dict, key: str, sede: str) -> None:
+    cur = table.get(key)
+    if cur is None:
+        table[key] = (sede,)
+    elif sede not in cur:
+        table[key] = cur + (sede,)
+
+
+def build_sede_aliases(siga_index, ipress_pools=None) -> SedeAliases:
+    """Tabla de alias desde las sedes del SIGA y los nombres del pool global de IPRESS."""
+    if hasattr(siga_index, "active_sedes"):
+        sedes = siga_index.active_sedes()
+    else:
+        sedes = {sede for sede, _ in siga_index}
+    world = (ipress_pools or {}).get(GLOBAL_POOL)
+    return SedeAliases(sedes, world.records if world is not None else ())
+
+
+def code_items(siga_index, codigo: str) -> list[tuple[str, dict]]:
+    """[(sede, registro)] del código en cualquier sede (SigaIndex/SigaStore lo hacen en O(1))."""
+    if hasattr(siga_index, "code_items"):
+        return siga_index.code_items(codigo)
+    return [(sede, rec) for (sede, cod), rec in siga_index.items() if cod == codigo]
+
+
+def code_rows(siga_index, codigo: str) -> list[tuple[str, object]]:
+    """[(sede, fila)] del código (SigaIndex); sin filas (SigaStore), [(sede, registro)]."""
+    if hasattr(siga_index, "code_rows"):
+        return siga_index.code_rows(codigo)
+    return code_items(siga_index, codigo)
+
+
+def resolve_sedes(aliases: SedeAliases | None, establecimiento, ipress_codigo: str = "") -> tuple[tuple, str]:
+    """(sedes, cómo) del nombre recibido: el nivel más estricto que reconoce alguna sede."""
+    if aliases is None:
+        sedes = tuple(sede_forms(establecimiento)[:1])
+        return sedes, ("exacta" if sedes else "sin_sede")
+    return aliases.resolve(establecimiento, ipress_codigo)
+
+
+def lookup(siga_index, aliases: SedeAliases | None, establecimiento, codigo: str,
+           ipress_codigo: str = "", rows: bool = False, resolved=None) -> tuple[str, dict | None, str, list[str]]:
+    """
+    Busca un bien por código patrimonial y nombre de sede.
+    Devuelve (sede, registro | None, cómo, sedes donde está el código).
+    `rows`: en vez del registro, la fila del índice (ver code_rows / SigaJson.fields).
+    `resolved`: resolve_sedes(...) ya calculado (lotes con el mismo establecimiento).
+    """
+    items = (code_rows if rows else code_items)(siga_index, codigo) if codigo else []
+    where = [sede for sede, _ in items]
+    if not items:
+        return "", None, "sin_codigo", where
+
+    sedes, how = resolved or resolve_sedes(aliases, establecimiento, ipress_codigo)
+    if sedes:
+        # el nivel que reconoció la sede decide: si el código no está ahí, es de otra sede
+        hits = [(sede, rec) for sede, rec in items if sede in sedes]
+        if how == "exacta":
+            # la sede escrita tal cual manda sobre las demás del mismo nivel
+            exact = next((hit for hit in hits if hit[0] == sedes[0]), None)
+            if exact is not None:
+                return exact[0], exact[1], how, where
+        if len(hits) == 1:
+            if how == "exacta" and hits[0][0] != sedes[0]:
+                how = "alias"
+            return hits[0][0], hits[0][1], how, where
+        if hits:
+            return "", None, "ambigua", where
+        return "", None, "sede_distinta", where
+    if len(items) == 1:
+        return items[0][0], items[0][1], "codigo_unico", where
+    return "", None, "ambigua", where
@@ -0,0 +1,398 @@
+# app/shared_store.py
+
+from collections.abc import Mapping
+from datetime import date
+from pathlib import Path
+import os
+import sqlite3
+import threading
+import time
+
+from .ipress_search import GLOBAL_POOL, IpressPool, normalize_for_tokens
+from .sede_alias import SedeAliases
+from .siga_index import siga_record
+from .snapshot import fingerprint
+
+# =========================
+# ALMACÉN COMPARTIDO ENTRE WORKERS (SQLite de solo lectura)
+# =========================
+#
+# Con varios procesos (gunicorn -w N) cada worker tenía su propia copia de
+# SIGA_MIN_INDEX e IPRESS_BY_UE. Con SHARED_STORE=1 los índices se escriben UNA
+# vez en un archivo SQLite junto al Excel:
+#
+#   data/siga DLS 4.25.xlsx  ->  data/siga DLS 4.25.xlsx.siga.<versión>.db
+#
+# y todos los workers lo abren en modo solo lectura (immutable + mmap), así las
+# páginas se comparten vía la caché del sistema operativo. El primer proceso que
+# no encuentra el archivo lo construye (los demás esperan); también se puede
+# construir antes de levantar los workers con `flask build-store`.
+#
+# SigaStore e IpressStore se comportan como los dicts originales (.get, len, in,
+# items), así los handlers no cambian. La tabla de alias de sedes (depende del SIGA
+# y del IPRESS) va en su propio .db junto al del SIGA: SedeAliasStore.
+
+STORE_FORMAT = 3
+
+_LOCK_STALE_SECONDS = 15 * 60
+
+
+def store_path(xlsx_path, kind: str, directory: str | None = None, extra: str = "") -> Path:
+    """
+    Ruta del .db para la versión ACTUAL del Excel (tamaño + mtime en el nombre).
+    `extra`: otra versión de la que depende el contenido (sin puntos), p.ej. la del IPRESS.
+    """
+    src = Path(xlsx_path)
+    st = src.stat()
+    folder = Path(directory) if directory else src.parent
+    version = f"{st.st_size:x}-{st.st_mtime_ns:x}" + (f"-{extra}" if extra else "")
+    return folder / f"{src.name}.{kind}.{version}.db"
+
+
+def _connect_ro(db_path: Path) -> sqlite3.Connection:
+    uri = f"{db_path.resolve().as_uri()}?mode=ro&immutable=1"
+    con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    con.execute("PRAGMA mmap_size = 268435456")  # 256 MB: lecturas vía mmap, páginas compartidas
+    return con
+
+
+def _is_valid(db_path: Path, kind: str) -> bool:
+    if not db_path.exists():
+        return False
+    try:
+        con = _connect_ro(db_path)
+        try:
+            meta = dict(con.execute("SELECT key, value FROM meta"))
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return False
+    return meta.get("format") == str(STORE_FORMAT) and meta.get("kind") == kind
+
+
+def _write_db(db_path: Path, kind: str, xlsx_path, fill) -> None:
+    """Crea el .db en un temporal y lo publica con os.replace (nadie ve uno a medias)."""
+    tmp = db_path.with_name(db_path.name + f".tmp{os.getpid()}")
+    if tmp.exists():
+        tmp.unlink()
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        fill(con)
+        src = fingerprint(xlsx_path, with_hash=False)
+        con.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("format", str(STORE_FORMAT)), ("kind", kind),
+            ("source", src["path"]), ("size", str(src["size"])), ("mtime_ns", str(src["mtime_ns"])),
+        ])
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+
+
+def _cleanup_old(db_path: Path, kind: str) -> None:
+    """Borra versiones anteriores del mismo Excel (los workers que aún las tengan abiertas no se ven afectados en POSIX)."""
+    prefix = db_path.name.rsplit(".", 2)[0]  # '<excel>.<kind>'
+    for old in db_path.parent.glob(f"{prefix}.*.db"):
+        if old != db_path:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def store_ready(xlsx_path, kind: str, directory: str | None = None, extra: str = "") -> bool:
+    """¿Ya hay un .db válido para la versión actual del Excel? (abrirlo no necesita parsear)."""
+    try:
+        return _is_valid(store_path(xlsx_path, kind, directory, extra), kind)
+    except OSError:
+        return False
+
+
+def open_or_build(xlsx_path, kind: str, fill, directory: str | None = None, timeout: float = 600,
+                  extra: str = "") -> Path:
+    """
+    Devuelve la ruta de un .db válido para la versión actual del Excel. Si no existe,
+    lo construye este proceso llamando fill(con) (con un archivo .lock para que los
+    otros workers esperen en vez de construirlo todos a la vez).
+    """
+    db_path = store_path(xlsx_path, kind, directory, extra)
+    if _is_valid(db_path, kind):
+        return db_path
+
+    lock = db_path.with_name(db_path.name + ".lock")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # otro proceso lo está construyendo
+            try:
+                if time.time() - lock.stat().st_mtime > _LOCK_STALE_SECONDS:
+                    lock.unlink()  # lock huérfano (proceso muerto)
+                    continue
+            except OSError:
+                continue
+            if _is_valid(db_path, kind):
+                return db_path
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Esperando a que otro proceso construya {db_path.name}")
+            time.sleep(0.5)
+            continue
+
+        try:
+            os.close(fd)
+            if not _is_valid(db_path, kind):
+                t0 = time.perf_counter()
+                _write_db(db_path, kind, xlsx_path, fill)
+                print(f"[STORE] {db_path.name} construido en {time.perf_counter() - t0:.2f}s")
+                _cleanup_old(db_path, kind)
+            return db_path
+        finally:
+            try:
+                lock.unlink()
+            except OSError:
+                pass
+
+
+class _ReadOnlyDb:
+    """Conexión de solo lectura por hilo (sqlite3 no comparte conexiones entre hilos)."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    @property
+    def con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = _connect_ro(self.db_path)
+        return con
+
+
+# ----- SIGA -----
+
+_SIGA_COLUMNS = "denominacion, marca, modelo, serie, antiguedad, fecha, fecha_texto"
+
+
+def fill_siga(con: sqlite3.Connection, idx) -> None:
+    # fecha: ordinal del día (0 = sin fecha, -1 = inválida, ver siga_index); la antigüedad
+    # se calcula al leer, así el .db no envejece
+    con.execute(
+        "CREATE TABLE siga (sede TEXT, cod TEXT, denominacion TEXT, marca TEXT, modelo TEXT,"
+        " serie TEXT, antiguedad TEXT, fecha INTEGER, fecha_texto TEXT,"
+        " PRIMARY KEY (sede, cod)) WITHOUT ROWID"
+    )
+    con.executemany("INSERT OR REPLACE INTO siga VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", idx.stored_items())
+    con.execute("CREATE INDEX siga_cod ON siga (cod)")  # búsqueda por código sin importar la sede
+
+
+class SigaStore(Mapping):
+    """Vista de solo lectura de SIGA_MIN_INDEX sobre el .db: store[(sede, cod)] -> dict."""
+
+    def __init__(self, db_path: Path):
+        self._db = _ReadOnlyDb(db_path)
+        self.db_path = self._db.db_path
+        self._len = self._db.con.execute("SELECT count(*) FROM siga").fetchone()[0]
+        self.sedes = [s for (s,) in self._db.con.execute("SELECT DISTINCT sede FROM siga")]
+
+    def __getitem__(self, key):
+        try:
+            sede, cod = key
+        except (TypeError, ValueError):
+            raise KeyError(key)
+        row = self._db.con.execute(
+            f"SELECT {_SIGA_COLUMNS} FROM siga WHERE sede = ? AND cod = ?", (sede, cod),
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return siga_record(*row)
+
+    def active_sedes(self) -> list[str]:
+        return self.sedes
+
+    def __iter__(self):
+        for sede, cod in self._db.con.execute("SELECT sede, cod FROM siga"):
+            yield (sede, cod)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def items(self):
+        """Recorre el .db con un solo cursor (sin una consulta por registro)."""
+        today = date.today().toordinal()
+        for sede, cod, *vals in self._db.con.execute(f"SELECT sede, cod, {_SIGA_COLUMNS} FROM siga"):
+            yield (sede, cod), siga_record(*vals, today=today)
+
+    def sede_items(self, sede: str):
+        """(codigo, registro) de una sede (tramo de la clave primaria, sin recorrer el resto)."""
+        today = date.today().toordinal()
+        for cod, *vals in self._db.con.execute(f"SELECT cod, {_SIGA_COLUMNS} FROM siga WHERE sede = ?", (sede,)):
+            yield cod, siga_record(*vals, today=today)
+
+    def code_items(self, cod: str) -> list[tuple[str, dict]]:
+        """[(sede, registro), ...] de todas las sedes que tienen ese código (usa el índice siga_cod)."""
+        return [
+            (sede, siga_record(*vals))
+            for sede, *vals in self._db.con.execute(f"SELECT sede, {_SIGA_COLUMNS} FROM siga WHERE cod = ?", (cod,))
+        ]
+
+
+# ----- IPRESS -----
+
+_IPRESS_FIELDS = ("ue_key", "ipress_codigo", "eess_nombre", "eess_categoria")
+
+
+def fill_ipress(con: sqlite3.Connection, by_ue: dict) -> None:
+    con.execute(
+        "CREATE TABLE ipress (ue TEXT, pos INTEGER, ue_key TEXT, ipress_codigo TEXT, eess_nombre TEXT,"
+        " eess_categoria TEXT, tok TEXT, raw_lower TEXT, PRIMARY KEY (ue, pos)) WITHOUT ROWID"
+    )
+    con.execute("CREATE TABLE ue_order (ue TEXT PRIMARY KEY, ord INTEGER, n INTEGER)")
+    for o, (ue, items) in enumerate(by_ue.items()):
+        con.execute("INSERT INTO ue_order VALUES (?, ?, ?)", (ue, o, len(items)))
+        con.executemany(
+            "INSERT INTO ipress VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (ue, i, *(str(r.get(f, "")) for f in _IPRESS_FIELDS),
+                 normalize_for_tokens(r.get("eess_nombre", "")),
+                 " ".join(str(r.get("eess_nombre", "")).lower().split()))
+                for i, r in enumerate(items)
+            ),
+        )
+
+
+class IpressStore:
+    """
+    IPRESS sobre el .db. Expone dos vistas tipo dict:
+      .by_ue  -> ue_key -> [registros]   (como IPRESS_BY_UE)
+      .pools  -> ue_key -> IpressPool    (como IPRESS_SEARCH; se arma al primer uso de cada UE)
+    Las formas normalizadas ya vienen calculadas en el .db.
+    """
+
+    def __init__(self, db_path: Path, max_pools: int = 512):
+        self._db = _ReadOnlyDb(db_path)
+        self.db_path = self._db.db_path
+        rows = self._db.con.execute("SELECT ue, n FROM ue_order ORDER BY ord").fetchall()
+        self.keys = [ue for ue, _ in rows]
+        self.sizes = dict(rows)
+        self._pools: dict[str, IpressPool] = {}
+        self._max_pools = max_pools
+        self._lock = threading.Lock()
+        self.by_ue = _IpressByUE(self)
+        self.pools = _IpressPools(self)
+
+    def _rows(self, ue: str | None):
+        sql = ("SELECT ue_key, ipress_codigo, eess_nombre, eess_categoria, tok, raw_lower FROM ipress"
+               " JOIN ue_order USING (ue)")
+        if ue is None:
+            return self._db.con.execute(sql + " ORDER BY ord, pos").fetchall()
+        return self._db.con.execute(sql + " WHERE ue = ? ORDER BY pos", (ue,)).fetchall()
+
+    def records(self, ue: str | None) -> list[dict]:
+        return [dict(zip(_IPRESS_FIELDS, r[:4])) for r in self._rows(ue)]
+
+    def pool(self, ue: str) -> IpressPool:
+        p = self._pools.get(ue)
+        if p is not None:
+            return p
+        rows = self._rows(None if ue == GLOBAL_POOL else ue)
+        p = IpressPool([dict(zip(_IPRESS_FIELDS, r[:4])) for r in rows],
+                       [r[4] for r in rows], [r[5] for r in rows])
+        with self._lock:
+            if len(self._pools) >= self._max_pools:
+                self._pools.pop(next(iter(self._pools)))
+            self._pools[ue] = p
+        return p
+
+
+class _IpressByUE(Mapping):
+    def __init__(self, store: IpressStore):
+        self._s = store
+
+    def __getitem__(self, ue):
+        if ue not in self._s.sizes:
+            raise KeyError(ue)
+        return self._s.records(ue)
+
+    def __iter__(self):
+        return iter(self._s.keys)
+
+    def __len__(self) -> int:
+        return len(self._s.keys)
+
+    def __contains__(self, ue) -> bool:
+        return ue in self._s.sizes
+
+
+class _IpressPools(Mapping):
+    def __init__(self, store: IpressStore):
+        self._s = store
+
+    def __getitem__(self, ue):
+        if ue != GLOBAL_POOL and ue not in self._s.sizes:
+            raise KeyError(ue)
+        return self._s.pool(ue)
+
+    def __iter__(self):
+        yield from self._s.keys
+        yield GLOBAL_POOL
+
+    def __len__(self) -> int:
+        return len(self._s.keys) + 1
+
+    def __contains__(self, ue) -> bool:
+        return ue == GLOBAL_POOL or ue in self._s.sizes
+
+
+# ----- alias de sedes -----
+
+_ALIAS_TABLES = ("forms", "ipress_forms", "ipress_codes", "loose", "ipress_loose")
+_ALIAS_SEP = "\x1f"
+
+
+def fill_aliases(con: sqlite3.Connection, aliases: SedeAliases) -> None:
+    con.execute("CREATE TABLE alias (tbl TEXT, key TEXT, sedes TEXT, PRIMARY KEY (tbl, key)) WITHOUT ROWID")
+    con.executemany("INSERT INTO alias VALUES ('sede', ?, '')", ((s,) for s in aliases.sedes))
+    for tbl in _ALIAS_TABLES:
+        con.executemany("INSERT INTO alias VALUES (?, ?, ?)",
+                        ((tbl, key, _ALIAS_SEP.join(sedes)) for key, sedes in getattr(aliases, tbl).items()))
+
+
+class _AliasTable:
+    """Una tabla de SedeAliases (forma -> sedes) leída del .db, una consulta por búsqueda."""
+
+    def __init__(self, db: _ReadOnlyDb, tbl: str):
+        self._db = db
+        self._tbl = tbl
+
+    def get(self, key, default=None):
+        row = self._db.con.execute("SELECT sedes FROM alias WHERE tbl = ? AND key = ?", (self._tbl, key)).fetchone()
+        return tuple(row[0].split(_ALIAS_SEP)) if row is not None else default
+
+    def __getitem__(self, key):
+        sedes = self.get(key)
+        if sedes is None:
+            raise KeyError(key)
+        return sedes
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+
+class SedeAliasStore(SedeAliases):
+    """SedeAliases sobre el .db: mismo resolve(), sin la tabla en la memoria de cada worker."""
+
+    def __init__(self, db_path: Path):
+        self._db = _ReadOnlyDb(db_path)
+        self.db_path = self._db.db_path
+        self.sedes = _AliasTable(self._db, "sede")
+        for tbl in _ALIAS_TABLES:
+            setattr(self, tbl, _AliasTable(self._db, tbl))
+        self._len = self._db.con.execute(
+            "SELECT count(*) FROM alias WHERE tbl IN ('forms', 'ipress_forms')").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._len
@@ -0,0 +1,449 @@
+# app/siga_index.py
+
+from array import array
+from collections.abc import Mapping
+from datetime import date
+import sys
+import weakref
+
+from .json_body import dumps
+
+# =========================
+# ÍNDICE SIGA COMPACTO (por código patrimonial)
+# =========================
+#
+# Antes: dict {(sede_normalizada, codigo): {5 campos str}} -> un dict por bien y el
+# nombre de la sede repetido en cada clave. Ahora:
+#   - la clave PRINCIPAL es el código patrimonial: by_cod[codigo] -> fila (o tupla
+#     de filas si el mismo código aparece en varias sedes). El código de 12 dígitos
+#     se guarda como int cuando se puede reconstruir igual (sin ceros a la izquierda)
+#   - cada sede se guarda UNA vez y se identifica por un entero (sede_id); cada fila
+#     sabe su sede (row_sede) y cada sede sus filas (sede_rows)
+#   - los campos de texto son columnas array('I') con ids a una tabla de valores
+#     compartida (marca/modelo/denominación se repiten muchísimo)
+#   - la FECHA de adquisición se guarda ya parseada (ordinal del día, array('i'));
+#     la antigüedad se calcula al responder, así no queda congelada el día en que
+#     se armó el índice (un worker que pasa Año Nuevo sigue respondiendo bien)
+#
+# Se comporta como el dict original (Mapping): idx.get((sede, cod)) devuelve
+# {denominacion, marca, modelo, serie, antiguedad, fecha_adquisicion, fecha_estado}.
+# La búsqueda tolerante al nombre de la sede (alias) está en sede_alias.py y usa
+# code_items(cod).
+
+# campos guardados como texto ("antiguedad" = columna ANTIGÜEDAD del Excel, solo se
+# usa si no hay fecha de adquisición válida)
+SIGA_FIELDS = ("denominacion", "marca", "modelo", "serie", "antiguedad")
+
+# fecha: ordinal del día (date.toordinal) o uno de estos valores
+NO_DATE = 0      # celda vacía
+BAD_DATE = -1    # había texto pero no es una fecha (queda marcado en fecha_estado)
+
+
+def siga_record(denominacion: str, marca: str, modelo: str, serie: str, antiguedad: str,
+                fecha: int, fecha_texto: str = "", today: int | None = None) -> dict:
+    """
+    Registro de respuesta: años completos desde la fecha de adquisición hasta HOY
+    (mismo cálculo que antes: días // 365.25, mínimo 0). Sin fecha válida se usa la
+    columna ANTIGÜEDAD del Excel. fecha_estado: 'ok' | 'sin_fecha' | 'invalida'.
+    """
+    if fecha > NO_DATE:
+        antig, iso, estado = str(_years(fecha, today)), date.fromordinal(fecha).isoformat(), "ok"
+    elif fecha == BAD_DATE:
+        antig, iso, estado = antiguedad, fecha_texto, "invalida"
+    else:
+        antig, iso, estado = antiguedad, "", "sin_fecha"
+    return {"denominacion": denominacion, "marca": marca, "modelo": modelo, "serie": serie,
+            "antiguedad": antig, "fecha_adquisicion": iso, "fecha_estado": estado}
+
+
+def _years(fecha: int, today: int | None = None) -> int:
+    return max(int(((today or date.today().toordinal()) - fecha) // 365.25), 0)
+
+
+def _cod_key(cod: str):
+    """'112233445566' -> 112233445566 (int ocupa menos que str); si no es reversible, queda str."""
+    if cod.isascii() and cod.isdigit() and len(cod) < 19 and (cod[0] != "0" or cod == "0"):
+        return int(cod)
+    return cod
+
+
+def _cod_str(key) -> str:
+    return key if isinstance(key, str) else str(key)
+
+
+class SigaIndex(Mapping):
+    """Mapping (sede_normalizada, codigo) -> registro (ver siga_record)."""
+
+    deleted = 0                                    # filas quitadas con remove() (sin compactar)
+    patch = None                                   # si salió de apply_delta sin compactar:
+                                                   # (weakref al índice de origen, filas que salen, filas que entran)
+
+    def __init__(self):
+        self.sedes: list[str] = []                 # sede_id -> nombre normalizado
+        self.sede_ids: dict[str, int] = {}         # nombre normalizado -> sede_id
+        self.sede_rows: list[array] = []           # sede_id -> filas (en orden de llegada)
+        self.by_cod: dict = {}                     # codigo (int|str) -> fila | tupla de filas
+        self.row_cod: list = []                    # fila -> codigo (int|str)
+        self.row_sede = array("I")                 # fila -> sede_id
+        self.values: list[str] = [""]              # tabla de valores (id 0 = "")
+        self.value_ids: dict[str, int] = {"": 0}
+        self.columns = {f: array("I") for f in SIGA_FIELDS}
+        self.fecha = array("i")                    # fila -> ordinal | NO_DATE | BAD_DATE
+        self.fecha_texto = array("I")              # fila -> id del texto de la fecha (solo si BAD_DATE)
+
+    # ----- construcción -----
+
+    def _sede_id(self, sede_key: str) -> int:
+        sid = self.sede_ids.get(sede_key)
+        if sid is None:
+            sid = self.sede_ids[sys.intern(sede_key)] = len(self.sedes)
+            self.sedes.append(sede_key)
+            self.sede_rows.append(array("I"))
+        return sid
+
+    def _value_id(self, v: str) -> int:
+        vid = self.value_ids.get(v)
+        if vid is None:
+            vid = self.value_ids[v] = len(self.values)
+            self.values.append(v)
+        return vid
+
+    def _rows_of(self, ck) -> tuple:
+        rows = self.by_cod.get(ck)
+        if rows is None:
+            return ()
+        return rows if isinstance(rows, tuple) else (rows,)
+
+    def add(self, sede_key: str, cod: str, denominacion: str, marca: str, modelo: str,
+            serie: str, antiguedad: str, fecha: str = "") -> int:
+        """
+        Agrega (o pisa, como el dict original) el bien (sede_key, cod) y devuelve su fila.
+        `fecha` es el texto crudo de FECHA_ADQUISICION: queda pendiente hasta resolve_dates().
+        """
+        ids = [self._value_id(v) for v in (denominacion, marca, modelo, serie, antiguedad)]
+        return self._put(self._sede_id(sede_key), _cod_key(cod), ids, NO_DATE, self._value_id(fecha) if fecha else 0)
+
+    def _put(self, sid: int, ck, ids: list[int], fecha: int, fid: int) -> int:
+        rows = self._rows_of(ck)
+        for row in rows:
+            if self.row_sede[row] == sid:
+                for f, vid in zip(SIGA_FIELDS, ids):
+                    self.columns[f][row] = vid
+                self.fecha[row], self.fecha_texto[row] = fecha, fid
+                return row
+
+        row = len(self.row_cod)
+        self.row_cod.append(ck)
+        self.row_sede.append(sid)
+        self.sede_rows[sid].append(row)
+        for f, vid in zip(SIGA_FIELDS, ids):
+            self.columns[f].append(vid)
+        self.fecha.append(fecha)
+        self.fecha_texto.append(fid)
+        self.by_cod[ck] = rows + (row,) if rows else row
+        return row
+
+    def add_stored(self, sede_key: str, cod: str, denominacion: str, marca: str, modelo: str,
+                   serie: str, antiguedad: str, fecha: int, fecha_texto: str = "") -> int:
+        """Como add(), con la fecha ya resuelta (lo que devuelve stored_items)."""
+        ids = [self._value_id(v) for v in (denominacion, marca, modelo, serie, antiguedad)]
+        return self._put(self._sede_id(sede_key), _cod_key(cod), ids, fecha,
+                         self._value_id(fecha_texto) if fecha_texto else 0)
+
+    def remove(self, sede_key: str, cod: str) -> bool:
+        """
+        Quita el bien (sede_key, cod). La fila queda sin uso en las columnas (se
+        recupera al compactar, ver apply()).
+        """
+        sid = self.sede_ids.get(sede_key)
+        ck = _cod_key(cod)
+        rows = self._rows_of(ck)
+        for row in rows:
+            if self.row_sede[row] == sid:
+                rest = tuple(r for r in rows if r != row)
+                if not rest:
+                    del self.by_cod[ck]
+                else:
+                    self.by_cod[ck] = rest if len(rest) > 1 else rest[0]
+                self.sede_rows[sid].remove(row)
+                self.deleted += 1
+                return True
+        return False
+
+    def resolve_dates(self, parse) -> None:
+        """
+        Convierte los textos de fecha pendientes en ordinales. `parse(textos_distintos)`
+        devuelve {texto: ordinal | BAD_DATE | NO_DATE}; se llama UNA vez con los textos distintos.
+        """
+        pending = {vid for vid, d in zip(self.fecha_texto, self.fecha) if vid and d == NO_DATE}
+        parsed = parse([self.values[vid] for vid in pending]) if pending else {}
+        by_id = {vid: parsed.get(self.values[vid], BAD_DATE) for vid in pending}
+        fecha, texto = self.fecha, self.fecha_texto
+        for row, vid in enumerate(texto):
+            if vid and fecha[row] == NO_DATE:
+                d = by_id[vid]
+                fecha[row] = d
+                if d != BAD_DATE:
+                    texto[row] = 0  # el texto solo se guarda para las fechas inválidas
+
+    @classmethod
+    def from_columns(cls, sede, cod, *fields) -> "SigaIndex":
+        """
+        Arma el índice desde columnas ya normalizadas: denominacion, marca, modelo, serie,
+        antiguedad y (opcional) el texto de la fecha. Filas con sede o código vacío se omiten.
+        """
+        idx = cls()
+        add = idx.add
+        for k, c, *vals in zip(sede, cod, *fields):
+            if k and c:
+                add(k, c, *vals)
+        return idx
+
+    # ----- lectura (API de dict) -----
+
+    def _record(self, row: int, today: int | None = None) -> dict:
+        values, cols = self.values, self.columns
+        return siga_record(*(values[cols[f][row]] for f in SIGA_FIELDS),
+                           self.fecha[row], values[self.fecha_texto[row]], today)
+
+    def stored_items(self):
+        """(sede, codigo, 5 textos, fecha, texto_fecha) tal como están guardados (para shared_store)."""
+        values, cols = self.values, self.columns
+        for sede_key, rows in zip(self.sedes, self.sede_rows):
+            for row in rows:
+                yield (sede_key, _cod_str(self.row_cod[row]), *(values[cols[f][row]] for f in SIGA_FIELDS),
+                       self.fecha[row], values[self.fecha_texto[row]])
+
+    def _row(self, key):
+        try:
+            sede_key, cod = key
+        except (TypeError, ValueError):
+            return None
+        sid = self.sede_ids.get(sede_key)
+        if sid is None or not isinstance(cod, str):
+            return None
+        for row in self._rows_of(_cod_key(cod)):
+            if self.row_sede[row] == sid:
+                return row
+        return None
+
+    def __getitem__(self, key) -> dict:
+        row = self._row(key)
+        if row is None:
+            raise KeyError(key)
+        return self._record(row)
+
+    def get(self, key, default=None):
+        row = self._row(key)
+        return default if row is None else self._record(row)
+
+    def __contains__(self, key) -> bool:
+        return self._row(key) is not None
+
+    def __iter__(self):
+        for sede_key, rows in zip(self.sedes, self.sede_rows):
+            for row in rows:
+                yield (sede_key, _cod_str(self.row_cod[row]))
+
+    def __len__(self) -> int:
+        return len(self.row_cod) - self.deleted
+
+    def items(self):
+        today = date.today().toordinal()
+        for sede_key, rows in zip(self.sedes, self.sede_rows):
+            for row in rows:
+                yield (sede_key, _cod_str(self.row_cod[row])), self._record(row, today)
+
+    def active_sedes(self) -> list[str]:
+        """Sedes con al menos un bien (tras remove() puede quedar alguna vacía)."""
+        return [s for s, rows in zip(self.sedes, self.sede_rows) if rows]
+
+    # ----- por sede / por código -----
+
+    def sede_items(self, sede_key: str):
+        """(codigo, registro) de una sede, sin recorrer el resto del índice."""
+        sid = self.sede_ids.get(sede_key)
+        if sid is None:
+            return
+        today = date.today().toordinal()
+        for row in self.sede_rows[sid]:
+            yield _cod_str(self.row_cod[row]), self._record(row, today)
+
+    def code_items(self, cod: str) -> list[tuple[str, dict]]:
+        """[(sede, registro), ...] de todas las sedes que tienen ese código (O(1))."""
+        return [(self.sedes[self.row_sede[row]], self._record(row)) for row in self._rows_of(_cod_key(cod))]
+
+    def code_rows(self, cod: str) -> list[tuple[str, int]]:
+        """Como code_items, con la fila en vez del registro (para SigaJson.fields)."""
+        return [(self.sedes[self.row_sede[row]], row) for row in self._rows_of(_cod_key(cod))]
+
+
+# =========================
+# REGISTROS SIGA PRESERIALIZADOS (JSON)
+# =========================
+#
+# Un fragmento por texto de la tabla de valores (no por fila: los textos se repiten
+# muchísimo y la tabla ya está deduplicada). El registro de respuesta se arma
+# concatenando fragmentos; solo la antigüedad y la fecha (dependen del día) se
+# escriben al responder. Es un índice derivado (datasets.DERIVED): se arma con
+# cada versión del SIGA y guarda la referencia al índice del que salió. Tras un
+# delta sin compactar la tabla de valores solo crece (los ids no cambian), así que
+# basta serializar los textos agregados (ver updated()).
+
+_KEYS = {f: f'"{f}":'.encode() for f in SIGA_FIELDS}
+
+
+class SigaJson:
+    """Fragmentos JSON de los textos de un SigaIndex (no se modifica después de armarse)."""
+
+    def __init__(self, siga):
+        self.siga = siga
+        self.values = [dumps(v) for v in siga.values] if isinstance(siga, SigaIndex) else []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def updated(self, siga) -> "SigaJson | None":
+        """Fragmentos de `siga` si salió de apply_delta sobre este índice (None = hay que rearmar)."""
+        patch = getattr(siga, "patch", None)
+        if patch is None or patch[0]() is not self.siga or not self.values:
+            return None
+        out = SigaJson.__new__(SigaJson)
+        out.siga = siga
+        out.values = self.values + [dumps(v) for v in siga.values[len(self.values):]]
+        return out
+
+    def fields(self, hit, today: int | None = None) -> bytes:
+        """
+        Los campos de siga_record (sin las llaves) de una fila del índice, o de un
+        registro ya armado (SigaStore: code_rows no existe y llega el dict).
+        """
+        if not isinstance(hit, int):
+            return dumps(hit)[1:-1]
+        siga, v = self.siga, self.values
+        cols = siga.columns
+        out = b",".join(_KEYS[f] + v[cols[f][hit]] for f in SIGA_FIELDS[:4])
+        fecha = siga.fecha[hit]
+        if fecha > NO_DATE:
+            return out + b',"antiguedad":"%d","fecha_adquisicion":"%s","fecha_estado":"ok"' % (
+                _years(fecha, today), date.fromordinal(fecha).isoformat().encode())
+        antig = b',"antiguedad":' + v[cols["antiguedad"][hit]]
+        if fecha == BAD_DATE:
+            return out + antig + b',"fecha_adquisicion":' + v[siga.fecha_texto[hit]] + b',"fecha_estado":"invalida"'
+        return out + antig + b',"fecha_adquisicion":"","fecha_estado":"sin_fecha"'
+
+
+def build_siga_json(siga_index) -> SigaJson:
+    return SigaJson(siga_index)
+
+
+# =========================
+# DELTA ENTRE DOS VERSIONES DEL SIGA
+# =========================
+#
+# El SIGA llega como exportaciones completas periódicas. En vez de reemplazar el
+# índice entero, se compara la exportación nueva con el índice vigente por
+# (sede, código) y se aplican solo las altas, cambios y bajas sobre una COPIA del
+# vigente (los requests en curso siguen leyendo el anterior). La copia de los
+# contenedores es en C (arrays, dicts); el trabajo en Python es proporcional a lo
+# que cambió.
+
+
+class SigaDelta:
+    """Altas / cambios (filas como stored_items) y bajas ((sede, codigo)) entre dos índices."""
+
+    def __init__(self, inserts=(), updates=(), deletes=()):
+        self.inserts: list[tuple] = list(inserts)
+        self.updates: list[tuple] = list(updates)
+        self.deletes: list[tuple[str, str]] = list(deletes)
+
+    def __bool__(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def counts(self) -> dict:
+        return {"inserts": len(self.inserts), "updates": len(self.updates), "deletes": len(self.deletes)}
+
+
+def _stored_map(idx: SigaIndex, sedes=None) -> dict:
+    """{(sede, codigo): (5 textos, fecha, texto_fecha)} armado columna a columna (map/zip en C)."""
+    if sedes is not None:
+        return _sedes_map(idx, sedes)
+    if idx.deleted:
+        return {(row[0], row[1]): row[2:] for row in idx.stored_items()}
+    get = idx.values.__getitem__
+    keys = zip(map(idx.sedes.__getitem__, idx.row_sede), map(str, idx.row_cod))
+    cols = [map(get, idx.columns[f]) for f in SIGA_FIELDS]
+    return dict(zip(keys, zip(*cols, idx.fecha, map(get, idx.fecha_texto))))
+
+
+def _sedes_map(idx: SigaIndex, sedes) -> dict:
+    """Como _stored_map, recorriendo solo las filas de esas sedes."""
+    values, cols = idx.values, idx.columns
+    out = {}
+    for sede in sedes:
+        sid = idx.sede_ids.get(sede)
+        if sid is None:
+            continue
+        for row in idx.sede_rows[sid]:
+            out[(sede, _cod_str(idx.row_cod[row]))] = (*(values[cols[f][row]] for f in SIGA_FIELDS),
+                                                       idx.fecha[row], values[idx.fecha_texto[row]])
+    return out
+
+
+def diff(old: SigaIndex, new: SigaIndex, sedes=None) -> SigaDelta:
+    """
+    Qué cambia de `old` a `new`. Las comparaciones son operaciones de conjuntos sobre dicts.
+    `sedes`: comparar solo esas sedes (el resto de `old` no se toca).
+    """
+    before, after = _stored_map(old, sedes), _stored_map(new, sedes)
+    changed = after.items() - before.items()      # altas + cambios
+    inserts, updates = [], []
+    for key, vals in changed:
+        (updates if key in before else inserts).append(key + vals)
+    inserts.sort(key=lambda r: (r[0], r[1]))
+    updates.sort(key=lambda r: (r[0], r[1]))
+    deletes = sorted(before.keys() - after.keys())
+    return SigaDelta(inserts, updates, deletes)
+
+
+def copy_index(idx: SigaIndex) -> SigaIndex:
+    """Copia independiente (los valores de texto se comparten: son str inmutables)."""
+    out = SigaIndex()
+    out.sedes = list(idx.sedes)
+    out.sede_ids = dict(idx.sede_ids)
+    out.sede_rows = [rows[:] for rows in idx.sede_rows]
+    out.by_cod = dict(idx.by_cod)
+    out.row_cod = list(idx.row_cod)
+    out.row_sede = idx.row_sede[:]
+    out.values = list(idx.values)
+    out.value_ids = dict(idx.value_ids)
+    out.columns = {f: col[:] for f, col in idx.columns.items()}
+    out.fecha = idx.fecha[:]
+    out.fecha_texto = idx.fecha_texto[:]
+    out.deleted = idx.deleted
+    return out
+
+
+def apply_delta(idx: SigaIndex, delta: SigaDelta) -> SigaIndex:
+    """
+    Nuevo índice = `idx` + `delta` (idx no se modifica). Si las filas sin uso pasan de
+    la mitad, se compacta (se rearma desde stored_items). Si no, el índice nuevo
+    anota en `patch` qué filas tocó (para actualizar los derivados sin rearmarlos).
+    """
+    out = copy_index(idx)
+    gone = [out._row(key) for key in delta.deletes]
+    for sede, cod in delta.deletes:
+        out.remove(sede, cod)
+    changed = [out.add_stored(*row) for row in delta.updates]
+    inserted = [out.add_stored(*row) for row in delta.inserts]
+    if out.deleted * 2 > len(out.row_cod):
+        compact = SigaIndex()
+        for row in out.stored_items():
+            compact.add_stored(*row)
+        return compact
+    out.patch = (weakref.ref(idx), frozenset(r for r in gone + changed if r is not None),
+                 frozenset(changed + inserted))
+    return out
@@ -0,0 +1,183 @@
+# app/siga_search.py
+
+from array import array
+from bisect import bisect_left
+import heapq
+
+from .ipress_search import normalize_for_tokens
+from .siga_index import SigaIndex, _cod_str
+
+# =========================
+# BÚSQUEDA DE TEXTO EN EL SIGA (denominación / marca / modelo / serie)
+# =========================
+#
+# Para "todas las centrífugas OLYMPUS de este establecimiento" sin conocer los
+# códigos. Recorrer SIGA_MIN_INDEX entero por consulta no escala (cientos de miles
+# de bienes), así que al cargar el SIGA se arma un índice invertido:
+#   postings[campo][palabra] -> array('Q') de claves (sede_id << 32 | fila)
+# ordenadas por sede y fila. Cada sede es un tramo contiguo de la lista: filtrar por
+# establecimiento = dos bisect por sede, sin tocar las demás.
+#
+# Las palabras salen de la tabla de valores de SigaIndex (cada texto distinto se
+# normaliza UNA vez, con normalize_for_tokens como la búsqueda IPRESS). Consulta:
+#   - cada palabra de la consulta calza exacta o como prefijo (>= 2 letras)
+#   - todas las palabras deben calzar (AND) en alguno de los cuatro campos
+#   - puntaje = suma por palabra del mejor campo (denominación pesa más que serie),
+#     la mitad si fue por prefijo; desempate por sede y orden del Excel
+# Es un índice derivado (datasets.DERIVED): se arma con cada versión del SIGA. Tras
+# un delta sin compactar (SigaIndex.patch) solo se reescriben las listas de las
+# palabras de las filas tocadas; el resto se comparte con el índice anterior.
+
+TEXT_FIELDS = ("denominacion", "marca", "modelo", "serie")
+FIELD_WEIGHTS = {"denominacion": 3.0, "marca": 2.0, "modelo": 2.0, "serie": 1.5}
+PREFIX_FACTOR = 0.5
+MIN_PREFIX = 2          # "c" no se expande a todo el vocabulario
+MAX_EXPANSIONS = 500    # palabras del vocabulario por prefijo (las primeras en orden alfabético)
+
+
+class SigaTextIndex:
+    """Índice invertido por campo sobre un SigaIndex (no se modifica después de armarse)."""
+
+    def __init__(self, siga):
+        self.siga = siga
+        self.available = isinstance(siga, SigaIndex)   # con SHARED_STORE el SIGA vive en SQLite
+        self.postings: dict[str, dict[str, array]] = {f: {} for f in TEXT_FIELDS}
+        if self.available:
+            self._build(siga)
+        self.vocab = sorted(set().union(*self.postings.values()))
+
+    def _build(self, siga: SigaIndex) -> None:
+        values = siga.values
+        toks_of: dict[int, tuple] = {}   # id de valor -> palabras (solo durante el armado)
+        # sede por sede y, dentro de cada una, filas en orden ascendente: cada lista
+        # queda ordenada sin necesidad de sort
+        for sid, rows in enumerate(siga.sede_rows):
+            base = sid << 32
+            for f in TEXT_FIELDS:
+                col, post = siga.columns[f], self.postings[f]
+                for row in rows:
+                    vid = col[row]
+                    if not vid:
+                        continue
+                    toks = toks_of.get(vid)
+                    if toks is None:
+                        toks = toks_of[vid] = tuple(set(normalize_for_tokens(values[vid]).split()))
+                    for t in toks:
+                        a = post.get(t)
+                        if a is None:
+                            a = post[t] = array("Q")
+                        a.append(base | row)
+
+    def __len__(self) -> int:
+        return len(self.vocab)
+
+    def updated(self, siga) -> "SigaTextIndex | None":
+        """
+        Índice de `siga` si salió de apply_delta sobre este índice (None = hay que rearmar).
+        Este índice no se modifica: las listas tocadas se copian.
+        """
+        patch = getattr(siga, "patch", None)
+        if patch is None or not self.available or patch[0]() is not self.siga:
+            return None
+        _, old_rows, new_rows = patch
+        changes: dict[tuple[str, str], tuple[set, set]] = {}   # (campo, palabra) -> (salen, entran)
+
+        def collect(idx, rows, which):
+            for row in rows:
+                key = idx.row_sede[row] << 32 | row
+                for f in TEXT_FIELDS:
+                    vid = idx.columns[f][row]
+                    if vid:
+                        for t in set(normalize_for_tokens(idx.values[vid]).split()):
+                            changes.setdefault((f, t), (set(), set()))[which].add(key)
+
+        collect(self.siga, old_rows, 0)
+        collect(siga, new_rows, 1)
+
+        out = SigaTextIndex.__new__(SigaTextIndex)
+        out.siga, out.available = siga, True
+        out.postings = {f: dict(p) for f, p in self.postings.items()}
+        vocab_changed = False
+        for (f, t), (gone, added) in changes.items():
+            post = out.postings[f]
+            keys = set(post.get(t, ())).difference(gone).union(added)
+            if keys:
+                vocab_changed |= t not in post
+                post[t] = array("Q", sorted(keys))
+            elif t in post:
+                del post[t]
+                vocab_changed = True
+        out.vocab = sorted(set().union(*out.postings.values())) if vocab_changed else self.vocab
+        return out
+
+    # ----- consulta -----
+
+    def _expand(self, term: str) -> list[tuple[str, float]]:
+        """(palabra del vocabulario, factor): la exacta y las que empiezan con `term`."""
+        out = []
+        lo = bisect_left(self.vocab, term)
+        if lo < len(self.vocab) and self.vocab[lo] == term:
+            out.append((term, 1.0))
+            lo += 1
+        if len(term) >= MIN_PREFIX:
+            hi = bisect_left(self.vocab, term + "\uffff", lo)
+            out += [(w, PREFIX_FACTOR) for w in self.vocab[lo:min(hi, lo + MAX_EXPANSIONS)]]
+        return out
+
+    @staticmethod
+    def _keys(a: array, ranges):
+        if ranges is None:
+            return a
+        out = []
+        for lo, hi in ranges:
+            i = bisect_left(a, lo)
+            j = bisect_left(a, hi, i)
+            if i < j:
+                out.append(a[i:j])
+        return (k for part in out for k in part)
+
+    def search(self, q: str, sede_ids=None, offset: int = 0, limit: int = 20) -> tuple[int, list[tuple[float, int]]]:
+        """
+        (total de bienes que calzan, [(puntaje, fila)] de la página pedida).
+        `sede_ids`: limitar a esas sedes (None = todas).
+        """
+        terms = list(dict.fromkeys(normalize_for_tokens(q).split()))
+        if not terms or not self.available:
+            return 0, []
+        ranges = None
+        if sede_ids is not None:
+            ranges = [(sid << 32, (sid + 1) << 32) for sid in sorted(set(sede_ids))]
+
+        # palabra más selectiva primero: las siguientes solo suman a los que ya calzan
+        expanded = [self._expand(t) for t in terms]
+        expanded.sort(key=lambda exp: sum(len(self.postings[f].get(w, ())) for w, _ in exp for f in TEXT_FIELDS))
+
+        acc = None
+        for exp in expanded:
+            best: dict[int, float] = {}
+            for word, factor in exp:
+                for f in TEXT_FIELDS:
+                    a = self.postings[f].get(word)
+                    if a is None:
+                        continue
+                    w = FIELD_WEIGHTS[f] * factor
+                    for key in self._keys(a, ranges):
+                        if acc is not None and key not in acc:
+                            continue
+                        if best.get(key, 0.0) < w:
+                            best[key] = w
+            acc = best if acc is None else {k: acc[k] + s for k, s in best.items()}
+            if not acc:
+                return 0, []
+
+        page = heapq.nsmallest(offset + limit, acc.items(), key=lambda kv: (-kv[1], kv[0]))[offset:]
+        return len(acc), [(score, key & 0xFFFFFFFF) for key, score in page]
+
+    def result(self, row: int) -> dict:
+        siga = self.siga
+        return {"sede": siga.sedes[siga.row_sede[row]], "codigo": _cod_str(siga.row_cod[row]),
+                **siga._record(row)}
+
+
+def build_siga_text_index(siga_index) -> SigaTextIndex:
+    return SigaTextIndex(siga_index)
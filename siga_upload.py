@@ -0,0 +1,210 @@
+# app/siga_upload.py
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+
+from .excel_loader import load_siga_min
+from .sede_alias import resolve_sedes, sede_forms
+from .siga_index import SigaIndex, apply_delta, diff
+
+# =========================
+# CARGA DEL SIGA DE UNA UE (subida + integración en segundo plano)
+# =========================
+#
+# Cada UE tiene una exportación del SIGA más reciente que la central. La UE sube su
+# Excel (POST /api/siga/upload) y el request responde al instante con un id de
+# trabajo; el resto pasa en segundo plano:
+#   1. leyendo:    el Excel se lee en un PROCESO aparte (pool de SIGA_UPLOAD_WORKERS)
+#                  con load_siga_min en modo streaming (misma detección de hoja/
+#                  encabezados). openpyxl es CPU puro: en un hilo del servidor
+#                  competiría por el GIL con los demás requests. El avance (filas
+#                  leídas / total) llega por una cola. Los lectores se crean con
+#                  forkserver (spawn si no hay): el servidor ya tiene hilos (log,
+#                  watcher, requests) y un fork con un lock tomado se cuelga.
+#   2. integrando: solo se aceptan sedes de establecimientos de la UE (pool IPRESS);
+#                  cada sede se lleva a su nombre en el índice vigente con la tabla
+#                  de alias, y las filas de esas sedes reemplazan a las vigentes
+#                  (altas, cambios y bajas, ver siga_index.diff) en una versión nueva
+#                  del dataset (Datasets.merge). El resto del índice no se toca.
+# Estado: GET /api/siga/upload/<id>. Vale para el proceso que atendió la subida
+# (con varios workers, cada uno tiene su índice en memoria).
+
+JOB_STATES = ("en_cola", "leyendo", "integrando", "listo", "error")
+
+# ----- proceso lector -----
+
+_progress_queue = None   # en el proceso lector: cola hacia el proceso web
+
+
+def _init_reader(queue) -> None:
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _read_upload(job_id: str, path: str) -> SigaIndex:
+    """Corre en el proceso lector: el Excel subido -> SigaIndex, avisando el avance."""
+    def progress(done, total):
+        _progress_queue.put((job_id, done, total))
+    return load_siga_min(path, streaming=True, progress=progress)
+
+
+# ----- trabajos -----
+
+class UploadJob:
+    def __init__(self, ue_codigo: str, filename: str, path: Path):
+        self.id = uuid.uuid4().hex[:16]
+        self.ue_codigo = ue_codigo
+        self.filename = filename
+        self.path = path
+        self.state = "en_cola"
+        self.rows = 0
+        self.total = None
+        self.changes = None
+        self.sedes: list[str] = []           # sedes integradas (nombre en el índice)
+        self.rejected: list[str] = []        # sedes del Excel que no son de la UE
+        self.msg = ""
+        self.created_at = datetime.now()
+        self.finished_at = None
+
+    def as_dict(self) -> dict:
+        progress = {"listo": 1.0, "integrando": 0.99}.get(self.state, 0.0)
+        if self.state == "leyendo" and self.total:
+            progress = round(min(self.rows / self.total, 0.99), 3)
+        return {
+            "id": self.id, "state": self.state, "filename": self.filename,
+            "progress": progress, "rows": self.rows, "total": self.total,
+            "changes": self.changes, "sedes": self.sedes, "rejected": self.rejected, "msg": self.msg,
+            "created_at": self.created_at.isoformat(timespec="seconds"),
+            "finished_at": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+        }
+
+
+class SigaUploads:
+    """Trabajos de subida de una app (viven en app.extensions['siga_uploads'])."""
+
+    def __init__(self, app, keep: int = 50):
+        self.app = app
+        self.keep = keep
+        self.dir = Path(app.config["SIGA_UPLOAD_DIR"] or tempfile.gettempdir())
+        self.jobs: OrderedDict[str, UploadJob] = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = None    # hilos que esperan al lector e integran (se crean con la 1.ª subida)
+        self._readers = None    # procesos lectores
+        self._queue = None
+
+    def _start(self) -> None:
+        workers = max(1, self.app.config["SIGA_UPLOAD_WORKERS"])
+        self._threads = ThreadPoolExecutor(workers, thread_name_prefix="siga-upload")
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._queue = ctx.Queue()
+        self._readers = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_reader,
+                                            initargs=(self._queue,))
+        threading.Thread(target=self._relay_progress, name="siga-upload-progress", daemon=True).start()
+
+    def _relay_progress(self) -> None:
+        while True:
+            job_id, done, total = self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.rows, job.total = done, total
+
+    def submit(self, ue_codigo: str, ue_records: list[dict], upload) -> UploadJob:
+        """Guarda el archivo subido (werkzeug FileStorage) y encola su lectura."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        job = UploadJob(ue_codigo, upload.filename or "siga.xlsx", None)
+        job.path = self.dir / f"siga-upload-{job.id}.xlsx"
+        upload.save(job.path)
+        with self._lock:
+            if self._threads is None:
+                self._start()
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.keep:
+                self.jobs.popitem(last=False)
+        self._threads.submit(self._run, job, ue_records)
+        print(f"[UPLOAD] {job.id}: {job.filename} de la UE {ue_codigo}")
+        return job
+
+    def get(self, job_id: str) -> UploadJob | None:
+        return self.jobs.get(job_id)
+
+    def _run(self, job: UploadJob, ue_records: list[dict]) -> None:
+        try:
+            job.state = "leyendo"
+            uploaded = self._readers.submit(_read_upload, job.id, str(job.path)).result()
+            job.rows = job.total = len(uploaded)
+            job.state = "integrando"
+            self._merge(job, uploaded, ue_records)
+            job.state = "listo"
+        except Exception as e:
+            job.state, job.msg = "error", str(e) or repr(e)
+            print(f"[UPLOAD] {job.id}: error: {e!r}")
+        finally:
+            job.finished_at = datetime.now()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+
+    def _merge(self, job: UploadJob, uploaded: SigaIndex, ue_records: list[dict]) -> None:
+        datasets = self.app.extensions["datasets"]
+        aliases = datasets.derived("SIGA_SEDE_ALIASES")
+        # sedes de la UE: formas CON el tipo de establecimiento de sus nombres IPRESS
+        # (un P.S. SAN JOSE no es el C.S. SAN JOSE) y las sedes enlazadas a sus códigos IPRESS
+        allowed = {f for r in ue_records for f in sede_forms(r.get("eess_nombre", ""), strip_type=False)}
+        linked = {s for r in ue_records
+                  for s in aliases.ipress_codes.get(str(r.get("ipress_codigo", "")).strip(), ())}
+
+        def owned(sede: str) -> bool:
+            return sede in linked or not allowed.isdisjoint(sede_forms(sede, strip_type=False))
+
+        # sede del Excel -> sede del índice vigente (misma sede escrita distinto) o la misma
+        # (sede nueva); el destino tiene que ser una sede de la UE: solo se reemplazan filas suyas
+        target = {}
+        for sede in uploaded.active_sedes():
+            sedes, _ = resolve_sedes(aliases, sede)
+            options = ([sedes[0]] if len(sedes) == 1 else []) + [sede]
+            dest = next((d for d in options if owned(d)), None)
+            if dest is not None:
+                target[sede] = dest
+            else:
+                job.rejected.append(sede)
+        if not target:
+            raise ValueError("Ninguna sede del Excel corresponde a los establecimientos de la UE.")
+
+        rows = SigaIndex()
+        for sede, *rest in uploaded.stored_items():
+            if sede in target:
+                rows.add_stored(target[sede], *rest)
+        job.sedes = sorted(set(target.values()))
+
+        def merge(values):
+            live = values["SIGA_MIN_INDEX"]
+            if not isinstance(live, SigaIndex):
+                raise RuntimeError("El SIGA está en SHARED_STORE: no se puede integrar en memoria.")
+            delta = diff(live, rows, sedes=set(job.sedes))
+            counts = delta.counts()
+            job.changes = dict(counts)
+            if not delta:
+                return values, counts
+            merged = apply_delta(live, delta)
+            counts["sedes_changed"] = set(merged.active_sedes()) != set(live.active_sedes())
+            return {**values, "SIGA_MIN_INDEX": merged}, counts
+
+        datasets.merge("siga", merge, source=f"subida UE {job.ue_codigo}")
+
+
+def init_siga_uploads(app) -> SigaUploads:
+    uploads = SigaUploads(app)
+    app.extensions["siga_uploads"] = uploads
+    # el tope lo aplica Werkzeug al leer el cuerpo (413), también sin Content-Length (chunked)
+    if app.config.get("MAX_CONTENT_LENGTH") is None:
+        app.config["MAX_CONTENT_LENGTH"] = app.config["SIGA_UPLOAD_MAX_MB"] * 2**20
+    return uploads
@@ -0,0 +1,139 @@
+# app/snapshot.py
+
+from pathlib import Path
+import hashlib
+import os
+import pickle
+
+# =========================
+# SNAPSHOTS DE ÍNDICES (arranque rápido)
+# =========================
+#
+# Parsear los Excel con pandas + openpyxl tarda decenas de segundos con el SIGA
+# completo. Aquí guardamos el dict YA CONSTRUIDO en un archivo binario (pickle)
+# al lado del Excel, p.ej.:
+#
+#   data/siga DLS 4.25.xlsx  ->  data/siga DLS 4.25.xlsx.siga.snap
+#
+# El snapshot lleva una cabecera con la "huella" del Excel (ruta, tamaño, mtime y
+# sha256). Si el Excel no cambió, se usa el snapshot; si cambió, se parsea de nuevo
+# y se reescribe.
+
+# Subir este número cuando cambie la forma de los índices que devuelven los loaders.
+SNAPSHOT_FORMAT = 4
+
+SNAPSHOT_SUFFIX = ".snap"
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(xlsx_path, with_hash: bool = True) -> dict:
+    """Huella del archivo fuente: ruta absoluta, tamaño, mtime (ns) y sha256."""
+    path = Path(xlsx_path).resolve()
+    st = path.stat()
+    return {
+        "path": str(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(path) if with_hash else "",
+    }
+
+
+def snapshot_path(xlsx_path, kind: str) -> Path:
+    path = Path(xlsx_path)
+    return path.with_name(f"{path.name}.{kind}{SNAPSHOT_SUFFIX}")
+
+
+def _params_key(params: dict) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in (params or {}).items()))
+
+
+def load_snapshot(xlsx_path, kind: str, params: dict | None = None):
+    """
+    Devuelve el índice guardado si el snapshot corresponde al Excel actual, o None.
+    Primero compara tamaño y mtime (barato); si solo cambió el mtime, verifica
+    por sha256 (p.ej. el archivo se copió de nuevo sin cambios).
+    """
+    snap = snapshot_path(xlsx_path, kind)
+    if not snap.exists():
+        return None
+    try:
+        current = fingerprint(xlsx_path, with_hash=False)
+        with open(snap, "rb") as f:
+            meta = pickle.load(f)
+            if not isinstance(meta, dict):
+                return None
+            if meta.get("format") != SNAPSHOT_FORMAT or meta.get("kind") != kind:
+                return None
+            if meta.get("params") != _params_key(params):
+                return None
+            src = meta.get("source") or {}
+            if src.get("path") != current["path"] or src.get("size") != current["size"]:
+                return None
+            touched = src.get("mtime_ns") != current["mtime_ns"]
+            if touched and src.get("sha256") != file_sha256(xlsx_path):
+                return None
+            data = pickle.load(f)
+    except Exception as e:  # snapshot corrupto / versión de Python distinta / etc.
+        print(f"[SNAP] snapshot inválido {snap.name}: {e!r}")
+        return None
+    if touched:
+        # mismo contenido con otro mtime: se reescribe con el mtime nuevo para que los
+        # próximos arranques no vuelvan a calcular el sha256 de todo el Excel
+        save_snapshot(xlsx_path, kind, data, params, {**src, "mtime_ns": current["mtime_ns"]})
+    return data
+
+
+def save_snapshot(xlsx_path, kind: str, data, params: dict | None = None, source: dict | None = None) -> Path | None:
+    """Escribe el snapshot de forma atómica (tmp + os.replace). Devuelve la ruta o None si falla."""
+    snap = snapshot_path(xlsx_path, kind)
+    tmp = snap.with_name(snap.name + f".tmp{os.getpid()}")
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "kind": kind,
+        "params": _params_key(params),
+        "source": source or fingerprint(xlsx_path),
+    }
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snap)
+        return snap
+    # carpeta de solo lectura, disco lleno, etc., o un valor que no se puede picklear:
+    # el snapshot es solo para arrancar más rápido, la carga sigue sin él
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+        print(f"[SNAP] no se pudo escribir {snap.name}: {e!r}")
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return None
+
+
+def cached_load(kind: str, loader, xlsx_path: str, enabled: bool = True, **params):
+    """
+    Envuelve un loader de excel_loader:
+      - si hay snapshot válido -> lo devuelve (milisegundos)
+      - si no -> llama loader(xlsx_path, **params) y guarda el snapshot
+    """
+    if not enabled or not Path(xlsx_path).exists():
+        return loader(xlsx_path, **params)
+
+    data = load_snapshot(xlsx_path, kind, params)
+    if data is not None:
+        print(f"[SNAP] {kind}: usando snapshot de {Path(xlsx_path).name}")
+        return data
+
+    # huella ANTES de parsear: si el Excel cambia mientras se lee, el próximo arranque lo detecta
+    source = fingerprint(xlsx_path)
+    data = loader(xlsx_path, **params)
+    if save_snapshot(xlsx_path, kind, data, params, source) is not None:
+        print(f"[SNAP] {kind}: snapshot actualizado")
+    return data
@@ -0,0 +1,47 @@
+# app/tests/conftest.py
+
+from contextlib import redirect_stdout
+import io
+
+import pytest
+
+from ..bench.synth import PASSWORD, generate
+
+# =========================
+# FIXTURES: EXCEL SINTÉTICOS Y APP DE PRUEBA
+# =========================
+#
+# Los Excel reales del ministerio no están en el repo: las pruebas usan los que
+# arma bench/synth.py (misma semilla = mismos archivos), chicos para que la sesión
+# de pruebas cargue en un par de segundos.
+
+
+@pytest.fixture(scope="session")
+def synth(tmp_path_factory) -> dict:
+    return generate(tmp_path_factory.mktemp("synth"), ues=4, eess_per_ue=8, siga_rows=1500)
+
+
+def make_app(paths: dict, **overrides):
+    from .. import create_app
+    config = {
+        "USERS_FILE": paths["users"], "IPRESS_FILE": paths["ipress"], "SIGA_FILE": paths["siga"],
+        "EXCEL_SNAPSHOTS": False, "PARALLEL_LOAD": False, "DATASETS_LAZY": False,
+        "DATASET_RELOAD_SECONDS": 0, "SHARED_STORE": False, "TESTING": True,
+        **overrides,
+    }
+    with redirect_stdout(io.StringIO()):
+        return create_app(config)
+
+
+@pytest.fixture(scope="session")
+def app(synth):
+    return make_app(synth)
+
+
+@pytest.fixture
+def client(app):
+    """Cliente con la sesión de la primera UE del maestro de usuarios."""
+    c = app.test_client()
+    ue = sorted(app.config["USERS"])[0]
+    assert c.post("/login", data={"username": ue, "password": PASSWORD}).status_code in (200, 302)
+    return c
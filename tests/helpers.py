@@ -0,0 +1,14 @@
+# app/tests/helpers.py
+
+from ..siga_index import SigaIndex
+
+# fecha de adquisición fija para los bienes de prueba (ordinal de 2020-01-01)
+FECHA = 737425
+
+
+def siga_index(rows) -> SigaIndex:
+    """SigaIndex desde [(sede, codigo, denominacion[, marca])] (el resto de campos fijo)."""
+    idx = SigaIndex()
+    for sede, cod, den, *marca in rows:
+        idx.add_stored(sede, cod, den, marca[0] if marca else "ACME", "M1", "S1", "", FECHA, "")
+    return idx
@@ -0,0 +1,19 @@
+# app/tests/test_bench_synth.py
+
+from ..bench.synth import generate
+from ..excel_loader import load_ipress, load_siga_min, load_users
+
+
+def test_synthetic_workbooks_load_with_the_app_loaders(synth):
+    params = synth["params"]
+    assert len(load_users(synth["users"])) == params["ues"]
+    assert sum(len(v) for v in load_ipress(synth["ipress"]).values()) == params["eess"]
+    # códigos de 12 dígitos al azar: alguna repetición es posible, pero casi todas las filas quedan
+    assert 0.95 * params["siga_rows"] <= len(load_siga_min(synth["siga"])) <= params["siga_rows"]
+
+
+def test_same_seed_same_data(tmp_path):
+    a = generate(tmp_path / "a", ues=2, eess_per_ue=3, siga_rows=50)
+    b = generate(tmp_path / "b", ues=2, eess_per_ue=3, siga_rows=50)
+    assert sorted(load_siga_min(a["siga"]).stored_items()) == sorted(load_siga_min(b["siga"]).stored_items())
+    assert load_ipress(a["ipress"]) == load_ipress(b["ipress"])
@@ -0,0 +1,75 @@
+# app/tests/test_export.py
+
+import csv
+import io
+import sqlite3
+
+from ..export import FORMATO8_HEADERS, formato8_rows
+from ..sede_alias import SedeAliases, lookup
+from ..shared_store import SigaStore, fill_siga
+from .helpers import siga_index
+
+SIGA = siga_index([
+    ("centro de salud san jose", "000111", "MONITOR"),
+    ("centro de salud san jose", "000112", "CAMA"),
+    ("hospital santa rosa", "000333", "BALANZA"),      # sede de otra UE
+])
+EESS = [
+    {"ipress_codigo": "123", "eess_nombre": "C.S. SAN JOSE", "eess_categoria": "I-3"},
+    {"ipress_codigo": "124", "eess_nombre": "P.S. LOS OLIVOS", "eess_categoria": "I-1"},
+]
+ALIASES = SedeAliases(SIGA.active_sedes(), EESS)
+
+
+def _rows(siga):
+    return [(r[2], r[5], r[8]) for r in formato8_rows("P", "UE", EESS, siga, ALIASES)]
+
+
+def test_export_finds_the_assets_the_lookup_finds():
+    sede, rec, how, _ = lookup(SIGA, ALIASES, "C.S. SAN JOSE", "000111")
+    assert (sede, how) == ("centro de salud san jose", "alias")
+    assert _rows(SIGA) == [("123", "000111", "MONITOR"), ("123", "000112", "CAMA"), ("124", "", "")]
+
+
+def test_export_walks_only_the_ue_sedes():
+    class Spy:
+        def __init__(self, idx):
+            self.idx, self.walked = idx, []
+
+        def sede_items(self, sede):
+            self.walked.append(sede)
+            return self.idx.sede_items(sede)
+
+    spy = Spy(SIGA)
+    assert len(_rows(spy)) == 3
+    assert spy.walked == ["centro de salud san jose"]
+
+
+def test_export_from_shared_store_matches(tmp_path):
+    db = tmp_path / "siga.db"
+    con = sqlite3.connect(db)
+    fill_siga(con, SIGA)
+    con.commit()
+    con.close()
+    assert _rows(SigaStore(db)) == _rows(SIGA)
+
+
+def test_sede_of_two_eess_goes_to_the_stricter_match():
+    eess = [{"ipress_codigo": "1", "eess_nombre": "SAN JOSE"},           # sin tipo: nivel laxo
+            {"ipress_codigo": "2", "eess_nombre": "CENTRO DE SALUD SAN JOSE"}]  # exacta
+    rows = [(r[2], r[5]) for r in formato8_rows("P", "UE", eess, SIGA, SedeAliases(SIGA.active_sedes()))]
+    assert rows == [("1", ""), ("2", "000111"), ("2", "000112")]
+
+
+def test_csv_export_endpoint(client, app):
+    r = client.get("/export/formato8.csv")
+    assert r.status_code == 200
+    rows = list(csv.reader(io.StringIO(r.data.decode("utf-8-sig"))))
+    assert rows[0] == FORMATO8_HEADERS
+    assert any(row[5] for row in rows[1:])
+    # cada bien del export es el que devuelve el lookup para esa EESS
+    for row in rows[1:]:
+        if row[5]:
+            found = client.get("/api/siga/lookup", query_string={
+                "codigo": row[5], "establecimiento": row[3], "ipress_codigo": row[2]}).get_json()
+            assert found["ok"] and found["denominacion"] == row[8]
@@ -0,0 +1,95 @@
+# app/tests/test_ipress_search.py
+
+import random
+import re
+import unicodedata
+
+import pytest
+
+from ..excel_loader import load_ipress
+from ..ipress_search import GLOBAL_POOL, build_ipress_pools
+
+
+def _baseline_search(pool: list[dict], q: str, limit: int = 10) -> list[dict]:
+    """La búsqueda original de /api/ipress/search (recorre el pool entero), como referencia."""
+    q = q.strip()
+    if not q:
+        return []
+
+    def normalize_for_tokens(s):
+        s = "".join(c for c in unicodedata.normalize("NFKD", str(s)) if not unicodedata.combining(c)).lower()
+        s = re.sub(r"[^a-z0-9 ]+", " ", s)
+        return re.sub(r"\s+", " ", s).strip()
+
+    q_tokens_str = normalize_for_tokens(q)
+    tokens = q_tokens_str.split()
+    q_compact = q_tokens_str.replace(" ", "")
+
+    def views(r):
+        tok = normalize_for_tokens(r.get("eess_nombre", ""))
+        return tok, tok.replace(" ", "")
+
+    def matches(r):
+        raw_name_lower = " ".join(str(r.get("eess_nombre", "")).lower().split())
+        raw_q_lower = " ".join(q.lower().split())
+        name_tok, name_cmp = views(r)
+        return bool((tokens and all(t in name_tok for t in tokens))
+                    or (q_compact and name_cmp.startswith(q_compact))
+                    or (raw_q_lower and raw_q_lower in raw_name_lower)
+                    or q in str(r.get("ipress_codigo", "")))
+
+    def score(r):
+        name_tok, name_cmp = views(r)
+        code = str(r.get("ipress_codigo", ""))
+        if name_cmp.startswith(q_compact): return (0, len(name_cmp))
+        if tokens and all(t in name_tok for t in tokens): return (1, len(name_tok))
+        if q in code: return (2, len(code))
+        return (9, 9999)
+
+    hits = [r for r in pool if matches(r)]
+    hits.sort(key=score)
+    return hits[:limit]
+
+
+def _queries(records, rng, n=150) -> list[str]:
+    qs = ["a", "san", "SAN JOSÉ", "c.s.", "cs san", "  centro   de ", "0000", "1", "zzqx", "-", "ii", "jose galvez"]
+    for _ in range(n):
+        r = rng.choice(records)
+        name, code = r["eess_nombre"], r["ipress_codigo"]
+        words = name.split()
+        kind = rng.randrange(5)
+        if kind == 0:
+            qs.append(name[:rng.randint(1, len(name))])                    # prefijo
+        elif kind == 1:
+            qs.append(" ".join(rng.sample(words, min(2, len(words)))))     # palabras en otro orden
+        elif kind == 2:
+            w = rng.choice(words)
+            qs.append(w[1:max(2, len(w) - 1)].lower())                       # trozo de palabra
+        elif kind == 3:
+            qs.append(code[-rng.randint(1, len(code)):])                    # parte del código
+        else:
+            qs.append(name.lower().replace(" ", ""))                          # compacto
+    return qs
+
+
+@pytest.fixture(scope="module")
+def ipress(synth):
+    return load_ipress(synth["ipress"])
+
+
+def test_ranking_matches_the_baseline(ipress):
+    pools = build_ipress_pools(ipress)
+    rng = random.Random(4)
+    world = [r for items in ipress.values() for r in items]
+    for key in [*rng.sample(sorted(k for k in pools if k != GLOBAL_POOL), 2), GLOBAL_POOL]:
+        records = ipress.get(key, world)
+        for q in _queries(records, rng):
+            assert pools[key].search(q) == _baseline_search(records, q), (key, q)
+
+
+def test_endpoint_returns_the_baseline_results_for_the_ue(client, app):
+    with client.session_transaction() as s:
+        records = app.config["IPRESS_BY_UE"][s["ipress_pool"]]
+    for q in _queries(records, random.Random(5), n=30):
+        if q.strip():
+            assert client.get("/api/ipress/search", query_string={"q": q}).get_json() == _baseline_search(records, q), q
@@ -0,0 +1,59 @@
+# app/tests/test_json_body.py
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from ..json_body import dumps, init_json_responses
+
+
+@pytest.fixture(scope="module")
+def small_app():
+    app = Flask(__name__)
+    app.config["GZIP_MIN_BYTES"] = 1024
+    init_json_responses(app)
+
+    @app.get("/obj/<int:n>")
+    def obj(n):
+        return jsonify({"zona": "Áncash", "a": 1, "items": ["x" * 10] * n})
+
+    return app
+
+
+def test_jsonify_keeps_flask_key_order_and_writes_utf8(small_app):
+    body = small_app.test_client().get("/obj/0").data
+    assert body == '{"a":1,"items":[],"zona":"Áncash"}\n'.encode("utf-8")
+    assert json.loads(body) == {"zona": "Áncash", "a": 1, "items": []}
+    # los fragmentos preserializados conservan el orden del dict
+    assert dumps({"b": 1, "a": 2}) == b'{"b":1,"a":2}'
+
+
+@pytest.mark.parametrize("accept, gz", [
+    ("gzip", True), ("gzip, deflate, br", True), ("*", True),
+    ("", False), ("identity", False), ("br, gzip;q=0", False),
+])
+def test_gzip_is_negotiated(small_app, accept, gz):
+    r = small_app.test_client().get("/obj/200", headers={"Accept-Encoding": accept})
+    assert (r.headers.get("Content-Encoding") == "gzip") == gz
+    assert "Accept-Encoding" in r.headers["Vary"]
+    body = gzip.decompress(r.data) if gz else r.data
+    assert len(json.loads(body)["items"]) == 200
+
+
+def test_small_responses_are_not_compressed(small_app):
+    r = small_app.test_client().get("/obj/1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers
+
+
+def test_cached_search_response_in_gzip(client):
+    url = "/api/siga/search?q=centrifuga&per_page=100"
+    r = client.get(url, headers={"Accept-Encoding": "gzip"})
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert r.headers["Content-Encoding"] == "gzip" and r.headers["ETag"].endswith('-gz"')
+    assert "Content-Encoding" not in plain.headers
+    assert gzip.decompress(r.data) == plain.data
+    # el ETag de una codificación también sirve para revalidar la otra
+    revalidate = {"If-None-Match": plain.headers["ETag"], "Accept-Encoding": "gzip"}
+    assert client.get(url, headers=revalidate).status_code == 304
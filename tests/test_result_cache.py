@@ -0,0 +1,69 @@
+# app/tests/test_result_cache.py
+
+import time
+
+from ..bench.synth import PASSWORD
+from ..result_cache import ResultCache
+
+
+def test_lru_ttl_and_version_tag():
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.put("v1", "a", 1)
+    cache.put("v1", "b", 2)
+    assert cache.get("v1", "a") == 1          # "a" pasa a ser la más usada
+    cache.put("v1", "c", 3)                   # sale "b"
+    assert cache.get("v1", "b") is None and cache.evictions == 1
+    assert cache.get("v2", "a") is None       # otra versión del maestro: se vacía
+    assert cache.invalidations == 1 and len(cache) == 0
+
+    short = ResultCache(maxsize=2, ttl=0.01)
+    short.put("v1", "a", 1)
+    time.sleep(0.02)
+    assert short.get("v1", "a") is None and short.expired == 1
+
+
+def _login(app, ue):
+    c = app.test_client()
+    c.post("/login", data={"username": ue, "password": PASSWORD})
+    return c
+
+
+def test_etag_revalidation_returns_304(client, app):
+    r = client.get("/api/ipress/search", query_string={"q": "salud"})
+    assert r.status_code == 200 and r.headers["Cache-Control"] == "private, no-cache"
+    etag = r.headers["ETag"]
+    before = client.get("/api/cache").get_json()["ipress_search"]["not_modified"]
+
+    r = client.get("/api/ipress/search", query_string={"q": "  SALUD "}, headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.data == b""
+    assert client.get("/api/cache").get_json()["ipress_search"]["not_modified"] == before + 1
+
+    r = client.get("/api/ipress/search", query_string={"q": "otra cosa"}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+
+
+def test_cache_key_is_per_ue(app):
+    pools = app.config["IPRESS_SEARCH"]
+    clients = {}
+    for ue in sorted(app.config["USERS"])[:2]:
+        c = _login(app, ue)
+        with c.session_transaction() as s:
+            clients[ue] = (c, pools[s["ipress_pool"]].records)
+    # una palabra que está en los nombres de las dos UEs
+    words = [{w for rec in recs for w in rec["eess_nombre"].lower().split() if len(w) > 3}
+             for _, recs in clients.values()]
+    q = sorted(words[0] & words[1])[0]
+    bodies = {}
+    for ue, (c, recs) in clients.items():
+        r = c.get("/api/ipress/search", query_string={"q": q})
+        own = {rec["ipress_codigo"] for rec in recs}
+        results = r.get_json()
+        assert results and {rec["ipress_codigo"] for rec in results} <= own
+        bodies[ue] = (r.headers["ETag"], r.data)
+    (etag_a, body_a), (etag_b, body_b) = bodies.values()
+    assert etag_a != etag_b and body_a != body_b
+
+
+def test_cache_stats_need_a_session(app, client):
+    assert app.test_client().get("/api/cache").status_code == 401
+    assert client.get("/api/cache").status_code == 200
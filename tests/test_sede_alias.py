@@ -0,0 +1,56 @@
+# app/tests/test_sede_alias.py
+
+from ..sede_alias import SedeAliases, lookup
+from .helpers import siga_index
+
+SIGA = siga_index([
+    ("centro de salud san jose", "111", "MONITOR"),
+    ("puesto de salud san jose", "222", "CAMA"),
+    ("hospital santa rosa", "111", "CENTRIFUGA"),
+    ("hospital santa rosa", "333", "BALANZA"),
+])
+IPRESS = [{"eess_nombre": "C.S. SAN JOSE", "ipress_codigo": "00001234"}]
+ALIASES = SedeAliases(SIGA.active_sedes(), IPRESS)
+
+
+def test_resolve_stops_at_the_first_level():
+    assert ALIASES.resolve("centro de salud san josé") == (("centro de salud san jose",), "exacta")
+    assert ALIASES.resolve("P.S. SAN JOSE") == (("puesto de salud san jose",), "alias")
+    assert ALIASES.resolve("otro nombre", "00001234") == (("centro de salud san jose",), "ipress")
+    assert ALIASES.resolve("SAN JOSE") == (("centro de salud san jose", "puesto de salud san jose"), "alias")
+    assert ALIASES.resolve("XXX") == ((), "sin_sede")
+
+
+def test_type_prefix_is_not_dropped_when_the_strict_form_matches():
+    # el código está en el C.S. y en otra sede: pedirlo para el P.S. no cae en el C.S.
+    sede, rec, how, where = lookup(SIGA, ALIASES, "P.S. SAN JOSE", "111")
+    assert (sede, rec, how) == ("", None, "sede_distinta")
+    assert sorted(where) == ["centro de salud san jose", "hospital santa rosa"]
+
+
+def test_lookup_found_ambiguous_and_unique():
+    sede, rec, how, _ = lookup(SIGA, ALIASES, "C.S. SAN JOSE", "111")
+    assert (sede, how, rec["denominacion"]) == ("centro de salud san jose", "alias", "MONITOR")
+    assert lookup(SIGA, ALIASES, "XXX", "111")[2] == "ambigua"
+    assert lookup(SIGA, ALIASES, "XXX", "333")[:3:2] == ("hospital santa rosa", "codigo_unico")
+    assert lookup(SIGA, ALIASES, "C.S. SAN JOSE", "999")[2] == "sin_codigo"
+
+
+def test_lookup_with_resolved_sedes_matches():
+    resolved = ALIASES.resolve("hospital santa rosa")
+    assert lookup(SIGA, None, "", "111", resolved=resolved)[:3:2] == ("hospital santa rosa", "exacta")
+
+
+def test_exact_sede_wins_over_other_sedes_of_the_same_level():
+    # "c.s. san jose" y "centro de salud san jose" son la misma forma canónica y ambas tienen el código
+    siga = siga_index([
+        ("c.s. san jose", "000111", "MONITOR"),
+        ("centro de salud san jose", "000111", "CAMA"),
+    ])
+    aliases = SedeAliases(siga.active_sedes())
+    sede, rec, how, _ = lookup(siga, aliases, "C.S. SAN JOSE", "000111")
+    assert (sede, how, rec["denominacion"]) == ("c.s. san jose", "exacta", "MONITOR")
+    sede, rec, how, _ = lookup(siga, aliases, "Centro de Salud San José", "000111")
+    assert (sede, how, rec["denominacion"]) == ("centro de salud san jose", "exacta", "CAMA")
+    # sin la sede exacta entre las que lo tienen, sigue siendo ambiguo
+    assert lookup(siga, aliases, "CS SAN JOSE", "000111")[2] == "ambigua"
@@ -0,0 +1,41 @@
+# app/tests/test_siga_batch.py
+
+import pytest
+
+
+def _sample(app, n=20):
+    """[(sede, codigo)] del SIGA sintético (las sedes tal como están en el índice)."""
+    return list(app.config["SIGA_MIN_INDEX"])[:n]
+
+
+def test_batch_matches_single_lookups(client, app):
+    pairs = _sample(app) + [("sede que no existe", "000000000000"), ("", "")]
+    r = client.post("/api/siga/lookup/batch", json={"items": [list(p) for p in pairs]})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["total"] == len(pairs) and body["found"] + body["missing"] == len(pairs)
+    for (est, cod), item in zip(pairs, body["results"]):
+        single = client.get("/api/siga/lookup", query_string={"codigo": cod, "establecimiento": est}).get_json()
+        assert item["found"] == single["ok"]
+        assert item["sede_match"] == single["sede_match"] or (not cod and item["sede_match"] == "sin_codigo")
+        if single["ok"]:
+            assert {k: item[k] for k in single if k != "ok"} == {k: v for k, v in single.items() if k != "ok"}
+
+
+def test_batch_codigos_with_one_establecimiento(client, app):
+    sede, cod = _sample(app, 1)[0]
+    body = client.post("/api/siga/lookup/batch", json={"establecimiento": sede, "codigos": [cod, cod]}).get_json()
+    assert body["found"] == 2 and body["results"][0]["sede"] == sede
+
+
+@pytest.mark.parametrize("payload", [[1, 2], "texto", 3, None, {"otra": 1}, {"items": [5]}])
+def test_batch_rejects_malformed_bodies(client, payload):
+    r = client.post("/api/siga/lookup/batch", json=payload)
+    assert r.status_code == 400
+    assert r.get_json()["ok"] is False
+
+
+def test_batch_limit(client, app):
+    n = app.config["SIGA_BATCH_MAX"] + 1
+    r = client.post("/api/siga/lookup/batch", json={"establecimiento": "x", "codigos": ["1"] * n})
+    assert r.status_code == 400
@@ -0,0 +1,90 @@
+# app/tests/test_siga_dates.py
+
+from datetime import date, datetime
+import json
+
+from openpyxl import Workbook
+import pytest
+
+from ..excel_loader import load_siga_min
+from ..siga_index import BAD_DATE, NO_DATE, SigaIndex, SigaJson, siga_record
+
+ADQ = date(2020, 8, 3)
+
+
+# =========================
+# siga_record: antigüedad al responder
+# =========================
+
+@pytest.mark.parametrize("today, years", [
+    (date(2020, 8, 3), "0"),
+    (date(2021, 8, 2), "0"),
+    (date(2021, 8, 4), "1"),
+    (date(2030, 8, 4), "10"),
+    (date(2019, 1, 1), "0"),    # fecha futura: mínimo 0
+])
+def test_age_is_computed_from_today(today, years):
+    rec = siga_record("D", "M", "MO", "S", "99", ADQ.toordinal(), today=today.toordinal())
+    assert rec["antiguedad"] == years
+    assert rec["fecha_adquisicion"] == "2020-08-03"
+    assert rec["fecha_estado"] == "ok"
+
+
+def test_without_date_the_age_column_is_kept():
+    rec = siga_record("D", "M", "MO", "S", "7", NO_DATE)
+    assert (rec["antiguedad"], rec["fecha_adquisicion"], rec["fecha_estado"]) == ("7", "", "sin_fecha")
+
+
+def test_invalid_date_keeps_the_original_text():
+    rec = siga_record("D", "M", "MO", "S", "5", BAD_DATE, "SIN FECHA")
+    assert (rec["antiguedad"], rec["fecha_adquisicion"], rec["fecha_estado"]) == ("5", "SIN FECHA", "invalida")
+
+
+@pytest.mark.parametrize("fecha, texto", [(ADQ.toordinal(), ""), (NO_DATE, ""), (BAD_DATE, "00/00/0000")])
+def test_json_fragments_match_siga_record(fecha, texto):
+    idx = SigaIndex()
+    row = idx.add_stored("c.s. uno", "112233", "D", "M", "MO", "S", "3", fecha, texto)
+    today = date(2026, 1, 1).toordinal()
+    frag = SigaJson(idx).fields(row, today)
+    assert json.loads(b"{" + frag + b"}") == idx._record(row, today)
+
+
+# =========================
+# Loaders: FECHA_ADQUISICION -> fecha_estado
+# =========================
+
+ROWS = [
+    ("C.S. Uno", "1001", "03/08/2020", "1", "ok"),
+    ("C.S. Uno", "1002", "2020-08-03 00:00:00", "1", "ok"),
+    ("C.S. Uno", "1003", datetime(2020, 8, 3), "1", "ok"),
+    ("C.S. Uno", "1004", None, "7", "sin_fecha"),
+    ("C.S. Uno", "1005", "SIN FECHA", "5", "invalida"),
+]
+
+
+@pytest.fixture(scope="module")
+def dates_xlsx(tmp_path_factory):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["NOMBRE SEDE", "CODIGO PATRIMONIAL", "DENOMINACION", "MARCA", "MODELO", "SERIE",
+               "ANTIGUEDAD", "FECHA ADQUISICION"])
+    for sede, cod, fecha, anti, _ in ROWS:
+        ws.append([sede, cod, "CENTRIFUGA", "ACME", "M1", "S1", anti, fecha])
+    path = tmp_path_factory.mktemp("siga") / "siga_fechas.xlsx"
+    wb.save(path)
+    return path
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_loader_sets_fecha_estado(dates_xlsx, streaming):
+    idx = load_siga_min(dates_xlsx, streaming=streaming)
+    years = siga_record("", "", "", "", "", ADQ.toordinal())["antiguedad"]
+    for _, cod, fecha, anti, estado in ROWS:
+        rec = idx[("c.s. uno", cod)]
+        assert rec["fecha_estado"] == estado
+        if estado == "ok":
+            assert (rec["fecha_adquisicion"], rec["antiguedad"]) == ("2020-08-03", years)
+        elif estado == "invalida":
+            assert (rec["fecha_adquisicion"], rec["antiguedad"]) == (fecha, anti)
+        else:
+            assert (rec["fecha_adquisicion"], rec["antiguedad"]) == ("", anti)
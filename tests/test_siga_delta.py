@@ -0,0 +1,72 @@
+# app/tests/test_siga_delta.py
+
+from ..siga_index import apply_delta, build_siga_json, diff
+from ..siga_search import build_siga_text_index
+from .helpers import siga_index
+
+OLD = [
+    ("centro de salud san jose", "111", "MONITOR"),
+    ("centro de salud san jose", "112", "CAMA"),
+    ("hospital santa rosa", "111", "CENTRIFUGA"),
+    ("hospital santa rosa", "113", "BALANZA"),
+]
+NEW = [
+    ("centro de salud san jose", "111", "MONITOR"),
+    ("centro de salud san jose", "112", "CAMA CLINICA"),   # cambio
+    ("hospital santa rosa", "113", "BALANZA"),
+    ("hospital santa rosa", "114", "ECOGRAFO", "OLYMPUS"),  # alta
+]                                                          # baja: (hospital santa rosa, 111)
+
+
+def _content(idx):
+    return sorted(idx.stored_items())
+
+
+def test_diff_counts_inserts_updates_deletes():
+    delta = diff(siga_index(OLD), siga_index(NEW))
+    assert delta.counts() == {"inserts": 1, "updates": 1, "deletes": 1}
+    assert delta.deletes == [("hospital santa rosa", "111")]
+    assert [r[:3] for r in delta.updates] == [("centro de salud san jose", "112", "CAMA CLINICA")]
+    assert not diff(siga_index(OLD), siga_index(OLD))
+
+
+def test_apply_delta_matches_new_export_and_keeps_old():
+    old, new = siga_index(OLD), siga_index(NEW)
+    before = _content(old)
+    merged = apply_delta(old, diff(old, new))
+    assert _content(merged) == _content(new)
+    assert _content(old) == before
+    assert merged.code_items("111")[0][0] == "centro de salud san jose"
+    assert len(merged.code_items("111")) == 1
+
+
+def test_diff_limited_to_sedes_leaves_the_rest():
+    old = siga_index(OLD)
+    upload = siga_index([("hospital santa rosa", "113", "BALANZA")])
+    delta = diff(old, upload, sedes={"hospital santa rosa"})
+    assert delta.deletes == [("hospital santa rosa", "111")]
+    merged = apply_delta(old, delta)
+    assert ("centro de salud san jose", "112") in merged
+    assert ("hospital santa rosa", "111") not in merged
+
+
+def test_compacted_index_has_no_patch():
+    old = siga_index(OLD)
+    merged = apply_delta(old, diff(old, siga_index(OLD[:1])))
+    assert merged.patch is None
+    assert _content(merged) == _content(siga_index(OLD[:1]))
+
+
+def test_derived_indexes_updated_like_a_rebuild():
+    old, new = siga_index(OLD), siga_index(NEW)
+    frags, text = build_siga_json(old), build_siga_text_index(old)
+    merged = apply_delta(old, diff(old, new))
+
+    assert frags.updated(merged).values == build_siga_json(merged).values
+    updated, rebuilt = text.updated(merged), build_siga_text_index(merged)
+    assert updated.vocab == rebuilt.vocab
+    assert updated.postings == rebuilt.postings
+    for q in ("centrifuga", "cama clinica", "olympus", "bal"):
+        assert updated.search(q) == rebuilt.search(q)
+    assert text.search("olympus") == (0, [])          # el índice anterior no cambia
+    assert build_siga_text_index(new).updated(merged) is None   # no salió de ese índice
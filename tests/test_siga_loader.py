@@ -0,0 +1,112 @@
+# app/tests/test_siga_loader.py
+
+from datetime import datetime
+import re
+import unicodedata
+
+import pandas as pd
+import pytest
+
+from ..excel_loader import load_siga_min
+from ..siga_index import SIGA_FIELDS
+
+# =========================
+# LOADER SIGA CONTRA EL ORIGINAL (iterrows)
+# =========================
+#
+# _baseline_siga es el load_siga_min original (una fila por vez con iterrows, la
+# antigüedad calculada al cargar): el índice de los loaders actuales tiene que dar
+# los mismos cinco campos para las mismas claves.
+
+_C_SEDE = {"nombresede", "sede", "establecimiento", "eess", "ipress", "nombreipress", "nombr e sede"}
+_C_CODPAT = {"codigopatrimonial", "codpatrimonial", "codpat", "codigopatrim", "patrimonial", "cp", "codpatrimo"}
+_C_DEN = {"denominaciondelequipamientoexistente", "denominaciondelbien", "descripciondelbien",
+          "descripcionbien", "descripcion", "denominacion", "bienes", "bien"}
+_C_SERIE = {"serie", "nserie", "numeroserie", "ser ie", "serieplacaderodaje", "placa", "serieplaca"}
+_C_ANTI = {"antiguedad", "antiguedad(anios)", "antiguedadanos", "antiguedadyears"}
+_C_FECHA = {"fechaadquisicion", "fecha adquisicion", "fechadeadquisicion", "fecadq", "fechaadq", "fec_adq"}
+
+
+def _strip_accents(s) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", str(s)) if not unicodedata.combining(c))
+
+
+def _n(s) -> str:
+    return re.sub(r"[^a-z0-9]", "", _strip_accents(s).lower())
+
+
+def _parse_date(val):
+    if val is None or str(val).strip() == "":
+        return pd.NaT
+    if isinstance(val, (pd.Timestamp, datetime)):
+        return pd.to_datetime(val, errors="coerce")
+    s = str(val).strip()
+    if re.match(r"^\d{4}-\d{2}-\d{2}", s):
+        return pd.to_datetime(s, dayfirst=False, errors="coerce")
+    if re.match(r"^\d{1,2}[/-]\d{1,2}[/-]\d{4}", s):
+        return pd.to_datetime(s, dayfirst=True, errors="coerce")
+    return pd.to_datetime(s, errors="coerce")
+
+
+def _years_from(val) -> str:
+    try:
+        ts = _parse_date(val)
+        if pd.isna(ts):
+            return ""
+        return str(max(int((pd.Timestamp.today().normalize() - ts.normalize()).days // 365.25), 0))
+    except Exception:
+        return ""
+
+
+def _baseline_siga(path) -> dict:
+    def pick(colmap, cset):
+        for c in cset:
+            if c in colmap:
+                return colmap[c]
+        for key_norm, real in colmap.items():
+            if any(c in key_norm for c in cset):
+                return real
+        return None
+
+    for df in pd.read_excel(path, sheet_name=None, dtype=str, engine="openpyxl").values():
+        colmap = {_n(c): c for c in df.columns}
+        if df.empty or not (pick(colmap, _C_SEDE) and pick(colmap, _C_CODPAT)):
+            continue
+        df = df.fillna("")
+        cols = [pick(colmap, c) for c in (_C_SEDE, _C_CODPAT, _C_DEN, {"marca"}, {"modelo"}, _C_SERIE, _C_ANTI, _C_FECHA)]
+        sede_col, cod_col, den_col, marca_col, modelo_col, serie_col, anti_col, fecha_col = cols
+        idx = {}
+        for _, r in df.iterrows():
+            sede = re.sub(r"\s+", " ", _strip_accents(r.get(sede_col, "")).lower().strip())
+            cod = re.sub(r"\s+", "", str(r.get(cod_col, "")))
+            if not sede or not cod:
+                continue
+            antig = _years_from(r.get(fecha_col, "")) if fecha_col else ""
+            if not antig and anti_col:
+                antig = str(r.get(anti_col, ""))[:255]
+            idx[(sede, cod)] = {
+                "denominacion": str(r.get(den_col, ""))[:255] if den_col else "",
+                "marca": str(r.get(marca_col, ""))[:255] if marca_col else "",
+                "modelo": str(r.get(modelo_col, ""))[:255] if modelo_col else "",
+                "serie": str(r.get(serie_col, ""))[:255] if serie_col else "",
+                "antiguedad": antig,
+            }
+        return idx
+    raise ValueError("sin hoja SIGA")
+
+
+@pytest.fixture(scope="module")
+def baseline(synth):
+    return _baseline_siga(synth["siga"])
+
+
+def _fields(idx) -> dict:
+    return {key: {f: rec[f] for f in SIGA_FIELDS} for key, rec in idx.items()}
+
+
+def test_streaming_loader_matches_the_baseline(synth, baseline):
+    assert _fields(load_siga_min(synth["siga"], streaming=True)) == baseline
+
+
+def test_vectorized_loader_matches_the_baseline(synth, baseline):
+    assert _fields(load_siga_min(synth["siga"])) == baseline
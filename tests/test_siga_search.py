@@ -0,0 +1,37 @@
+# app/tests/test_siga_search.py
+
+from ..bench.synth import PASSWORD
+from ..ipress_search import normalize_for_tokens
+from .conftest import make_app
+
+
+def _words(result) -> set:
+    return set(normalize_for_tokens(" ".join(result[f] for f in ("denominacion", "marca", "modelo", "serie"))).split())
+
+
+def test_all_words_must_match(client):
+    body = client.get("/api/siga/search", query_string={"q": "centrifuga olympus", "per_page": 100}).get_json()
+    assert body["ok"] and body["total"] > 0
+    for r in body["results"]:
+        words = _words(r)
+        assert "centrifuga" in words and "olympus" in words
+    scores = [r["score"] for r in body["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_prefix_and_establecimiento_filter(client, app):
+    sede = next(iter(app.config["SIGA_MIN_INDEX"]))[0]
+    body = client.get("/api/siga/search", query_string={"q": "microsc", "establecimiento": sede}).get_json()
+    assert body["sede_match"] == "exacta"
+    assert all(r["sede"] == sede and any(w.startswith("microsc") for w in _words(r)) for r in body["results"])
+    empty = client.get("/api/siga/search", query_string={"q": "centrifuga", "establecimiento": "no existe"}).get_json()
+    assert (empty["sede_match"], empty["total"]) == ("sin_sede", 0)
+    assert client.get("/api/siga/search").status_code == 400
+
+
+def test_not_available_with_shared_store(synth, tmp_path):
+    app = make_app(synth, SHARED_STORE=True, SHARED_STORE_DIR=str(tmp_path))
+    c = app.test_client()
+    c.post("/login", data={"username": sorted(app.config["USERS"])[0], "password": PASSWORD})
+    r = c.get("/api/siga/search", query_string={"q": "centrifuga"})
+    assert r.status_code == 503 and "SHARED_STORE" in r.get_json()["msg"]
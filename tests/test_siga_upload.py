@@ -0,0 +1,98 @@
+# app/tests/test_siga_upload.py
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from ..sede_alias import SedeAliases
+from ..bench.synth import PASSWORD
+from ..siga_upload import SigaUploads, UploadJob
+from .conftest import make_app
+from .helpers import siga_index
+
+LIVE = [
+    ("centro de salud san jose", "111", "MONITOR"),
+    ("centro de salud san jose", "112", "CAMA"),
+    ("puesto de salud san jose", "222", "CAMA"),
+    ("hospital santa rosa", "333", "BALANZA"),
+]
+# la UE solo tiene el C.S. SAN JOSE
+UE_RECORDS = [{"eess_nombre": "C.S. SAN JOSE", "ipress_codigo": "00001234"}]
+
+
+class _Datasets:
+    """Lo que SigaUploads._merge usa de datasets.Datasets: derived() y merge()."""
+
+    def __init__(self, rows):
+        self.values = {"SIGA_MIN_INDEX": siga_index(rows)}
+        self.aliases = SedeAliases(self.values["SIGA_MIN_INDEX"].active_sedes(),
+                                   [*UE_RECORDS, {"eess_nombre": "HOSPITAL SANTA ROSA", "ipress_codigo": "9"}])
+
+    def derived(self, key):
+        return self.aliases
+
+    def merge(self, name, merge, source):
+        self.values, self.counts = merge(self.values)
+
+
+def _merge(rows):
+    datasets = _Datasets(LIVE)
+    uploads = SigaUploads.__new__(SigaUploads)
+    uploads.app = SimpleNamespace(extensions={"datasets": datasets})
+    job = UploadJob("001-721", "siga.xlsx", None)
+    uploads._merge(job, siga_index(rows), UE_RECORDS)
+    return job, datasets.values["SIGA_MIN_INDEX"]
+
+
+def test_upload_replaces_only_the_ue_sede():
+    job, merged = _merge([
+        ("c.s. san jose", "111", "MONITOR"),        # misma sede escrita distinto
+        ("c.s. san jose", "113", "ECOGRAFO"),       # alta; la 112 es baja
+        ("hospital santa rosa", "333", "OTRA"),     # sede de otra UE
+    ])
+    assert job.sedes == ["centro de salud san jose"]
+    assert job.rejected == ["hospital santa rosa"]
+    assert job.changes == {"inserts": 1, "updates": 0, "deletes": 1}
+    assert ("centro de salud san jose", "113") in merged
+    assert ("centro de salud san jose", "112") not in merged
+    assert merged[("hospital santa rosa", "333")]["denominacion"] == "BALANZA"
+
+
+def test_upload_rejects_same_name_with_other_type():
+    job, merged = _merge([
+        ("c.s. san jose", "111", "MONITOR"),
+        ("p.s. san jose", "222", "CAMBIADO"),       # el P.S. no es de la UE
+    ])
+    assert job.rejected == ["p.s. san jose"]
+    assert merged[("puesto de salud san jose", "222")]["denominacion"] == "CAMA"
+
+
+def test_upload_without_own_sedes_fails():
+    with pytest.raises(ValueError, match="Ninguna sede"):
+        _merge([("hospital santa rosa", "333", "OTRA")])
+
+
+@pytest.fixture(scope="module")
+def small_limit_client(synth):
+    app = make_app(synth, SIGA_UPLOAD_MAX_MB=1)
+    c = app.test_client()
+    c.post("/login", data={"username": sorted(app.config["USERS"])[0], "password": PASSWORD})
+    return c
+
+
+def _multipart(size: int) -> bytes:
+    return (b'--x\r\nContent-Disposition: form-data; name="file"; filename="siga.xlsx"\r\n\r\n'
+            + b"0" * size + b"\r\n--x--\r\n")
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_upload_over_the_limit_is_413(small_limit_client, chunked):
+    body = _multipart(2 * 2**20)
+    kwargs = {"data": body}
+    if chunked:   # sin Content-Length: el tope lo aplica Werkzeug al leer
+        kwargs = {"input_stream": io.BytesIO(body), "environ_overrides": {"wsgi.input_terminated": True},
+                  "headers": {"Transfer-Encoding": "chunked"}}
+    r = small_limit_client.post("/api/siga/upload", content_type="multipart/form-data; boundary=x", **kwargs)
+    assert r.status_code == 413
+    assert r.get_json() == {"ok": False, "msg": "El archivo supera 1 MB."}
@@ -0,0 +1,79 @@
+# app/tests/test_snapshot.py
+
+import os
+import threading
+
+import pytest
+
+from .. import snapshot
+from ..snapshot import cached_load, load_snapshot, save_snapshot, snapshot_path
+
+
+@pytest.fixture
+def xlsx(tmp_path):
+    path = tmp_path / "maestro.xlsx"
+    path.write_bytes(b"contenido v1")
+    return path
+
+
+def _loader(calls):
+    def load(path, **params):
+        calls.append(params)
+        return {"data": open(path, "rb").read(), **params}
+    return load
+
+
+def test_snapshot_reused_while_the_file_is_the_same(xlsx):
+    calls = []
+    first = cached_load("kind", _loader(calls), str(xlsx), sep="x")
+    assert cached_load("kind", _loader(calls), str(xlsx), sep="x") == first
+    assert len(calls) == 1 and snapshot_path(xlsx, "kind").exists()
+
+
+def test_content_change_invalidates(xlsx):
+    calls = []
+    cached_load("kind", _loader(calls), str(xlsx))
+    xlsx.write_bytes(b"contenido v2 (otro largo)")
+    assert cached_load("kind", _loader(calls), str(xlsx))["data"] == b"contenido v2 (otro largo)"
+    # mismo tamaño, otro contenido y otro mtime: lo detecta el sha256
+    st = xlsx.stat()
+    xlsx.write_bytes(b"contenido v3 (otro largo)")
+    os.utime(xlsx, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cached_load("kind", _loader(calls), str(xlsx))["data"] == b"contenido v3 (otro largo)"
+    assert len(calls) == 3
+
+
+def test_params_change_invalidates(xlsx):
+    calls = []
+    cached_load("kind", _loader(calls), str(xlsx), streaming=False)
+    assert cached_load("kind", _loader(calls), str(xlsx), streaming=True)["streaming"] is True
+    assert len(calls) == 2
+    assert load_snapshot(xlsx, "otro") is None
+
+
+def test_touched_file_with_same_content_rewrites_the_mtime(xlsx, monkeypatch):
+    calls = []
+    cached_load("kind", _loader(calls), str(xlsx))
+    st = xlsx.stat()
+    os.utime(xlsx, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_snapshot(xlsx, "kind") is not None     # mismo sha256: sigue valiendo
+    hashed = []
+    monkeypatch.setattr(snapshot, "file_sha256", lambda p, *a: hashed.append(p) or "")
+    assert load_snapshot(xlsx, "kind") is not None     # huella reescrita: ya no hace falta el sha256
+    assert hashed == [] and len(calls) == 1
+
+
+def test_corrupt_snapshot_is_ignored(xlsx):
+    calls = []
+    cached_load("kind", _loader(calls), str(xlsx))
+    snapshot_path(xlsx, "kind").write_bytes(b"no es un pickle")
+    assert cached_load("kind", _loader(calls), str(xlsx))["data"] == b"contenido v1"
+    assert len(calls) == 2
+
+
+def test_unpicklable_data_does_not_fail_the_load(xlsx):
+    data = {"lock": threading.Lock()}
+    assert save_snapshot(xlsx, "kind", data) is None
+    assert cached_load("kind", lambda path: data, str(xlsx)) is data
+    assert not snapshot_path(xlsx, "kind").exists()
+    assert not list(xlsx.parent.glob("*.tmp*"))
@@ -0,0 +1,21 @@
+# app/tests/test_ue_pools.py
+
+from ..ipress_search import GLOBAL_POOL, UePools, ue_pool_key
+
+
+def test_ue_pools_report_unresolved_and_ambiguous():
+    pools = {"1721": None, "11685": None, "21685": None, GLOBAL_POOL: None}
+    table = UePools(["001-721", "145-1685", "999-9999"], pools)
+    assert table.keys == {"001-721": "1721", "145-1685": "11685", "999-9999": GLOBAL_POOL}
+    assert table.report() == {"ues": 3, "unresolved": ["999-9999"],
+                              "ambiguous": {"145-1685": ["11685", "21685"]}}
+    assert ue_pool_key(table, pools, "145-1685") == "11685"
+    assert ue_pool_key(None, pools, "001-721") == "1721"     # sin tabla: se resuelve al vuelo
+
+
+def test_datasets_status_includes_the_ue_pools_report(client, app):
+    body = client.get("/api/datasets").get_json()
+    report = body["users"]["ue_pools"]
+    assert report["ues"] == len(app.config["USERS"])
+    assert report["unresolved"] == [] and report["ambiguous"] == {}
+    assert app.test_client().get("/api/datasets").status_code == 401
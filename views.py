@@ -1,8 +1,18 @@
 # app/views.py
-from flask import Blueprint, render_template, session, redirect, url_for, current_app, request, jsonify
+from flask import Blueprint, render_template, session, redirect, url_for, current_app, request, jsonify, Response, stream_with_context, g
+from collections import Counter
+from werkzeug.exceptions import RequestEntityTooLarge
+from datetime import date
 import re
 import unicodedata
-from .excel_loader import _site_key
+from .ipress_search import GLOBAL_POOL, IpressPool, ue_pool_key
+from .sede_alias import lookup as siga_find_item, resolve_sedes, sede_forms
+from .result_cache import CACHE_NAMES, cached_json, dataset_tag, get_cache
+from .json_body import RawJson, dumps, json_array, raw_response
+from .request_log import log_event
+from .datasets import get_index
+from .export import FORMATO8_HEADERS, formato8_rows, stream_csv
+from .xlsx_stream import stream_xlsx
 
 views_bp = Blueprint("views", __name__)
 
@@ -45,145 +55,191 @@ def _norm_txt(s: str) -> str:
     s = ''.join(c for c in unicodedata.normalize('NFKD', str(s)) if not unicodedata.combining(c))
     return re.sub(r'[^a-z0-9]', '', s.lower())
 
-@views_bp.post("/api/ipress/search")
+def _session_pool(pools) -> tuple[str, IpressPool | None]:
+    """
+    (clave, pool) de la UE en sesión. La clave la guarda el login (resuelta al cargar);
+    si falta o el maestro recargado ya no la tiene, se toma de la tabla UE -> pool.
+    GLOBAL_POOL = la UE no tiene pool propio.
+    """
+    key = session.get("ipress_pool")
+    if key is None or key not in pools:
+        key = ue_pool_key(get_index("UE_IPRESS_POOLS"), pools, session.get("ue_codigo", ""))
+        session["ipress_pool"] = key
+    return key, pools.get(key)
+
+@views_bp.route("/api/ipress/search", methods=["GET", "POST"])
 def api_ipress_search():
-    data = request.get_json(silent=True) or {}
+    # GET ?q=... (revalidable por el navegador con ETag) o POST {"q": ...} como antes
+    data = request.args if request.method == "GET" else (request.get_json(silent=True) or {})
     q = (data.get("q") or "").strip()
     if not q:
         return jsonify([])
 
-    ipress_by_ue = current_app.config.get("IPRESS_BY_UE", {})
-    ue_raw = session.get("ue_codigo", "")
-
-    # UE normalizada: últimos 4 dígitos
-    ue_digits = re.sub(r"\D", "", ue_raw or "")
-    ue_key = ue_digits[-4:] if len(ue_digits) >= 4 else ue_digits
-
-    # 1) pool por UE (lo correcto)
-    pool = ipress_by_ue.get(ue_key, [])
-
-    # 2) fallback por sufijo de clave si no trajo
-    if not pool and ue_key:
-        for k, items in ipress_by_ue.items():
-            if k.endswith(ue_key):
-                pool = items
-                break
-
-    # 3) último recurso: global
-    if not pool:
-        for items in ipress_by_ue.values():
-            pool.extend(items)
-
-    print("[SEARCH] UE:", ue_raw, "ue_key:", ue_key, "| pool size:", len(pool), "| q:", q)
-
-    def remove_accents_lower(s: str) -> str:
-        s = ''.join(c for c in unicodedata.normalize('NFKD', str(s)) if not unicodedata.combining(c))
-        return s.lower()
-
-    def normalize_for_tokens(s: str) -> str:
-        s = remove_accents_lower(s)
-        s = re.sub(r'[^a-z0-9 ]+', ' ', s)
-        s = re.sub(r'\s+', ' ', s).strip()
-        return s
-
-    q_tokens_str = normalize_for_tokens(q)
-    tokens = q_tokens_str.split()
-    q_compact = q_tokens_str.replace(" ", "")
-
-    def name_views(r):
-        name_raw = r.get("eess_nombre", "")
-        name_tok = normalize_for_tokens(name_raw)
-        name_cmp = name_tok.replace(" ", "")
-        return name_tok, name_cmp
-
-    def matches(r):
-        raw_name = str(r.get("eess_nombre", ""))
-        raw_name_lower = " ".join(raw_name.lower().split())
-        raw_q_lower = " ".join(q.lower().split())
-
-        name_tok, name_cmp = name_views(r)
-        code = str(r.get("ipress_codigo", ""))
-
-        if tokens and all(t in name_tok for t in tokens):
-            return True
-        if q_compact and name_cmp.startswith(q_compact):
-            return True
-        if raw_q_lower and raw_q_lower in raw_name_lower:
-            return True
-        if q and q in code:
-            return True
-        return False
-
-    hits = [r for r in pool if matches(r)]
-
-    def score(r):
-        name_tok, name_cmp = name_views(r)
-        code = str(r.get("ipress_codigo", ""))
-        if name_cmp.startswith(q_compact): return (0, len(name_cmp))
-        if tokens and all(t in name_tok for t in tokens): return (1, len(name_tok))
-        if q in code: return (2, len(code))
-        return (9, 9999)
-
-    hits.sort(key=score)
-    return jsonify(hits[:10])
+    # pool de la UE (o el global, prearmado al cargar, si la UE no tiene uno propio)
+    pools = get_index("IPRESS_SEARCH", {})
+    ue_key, pool = _session_pool(pools)
+    if pool is None:
+        pool = IpressPool([])
+
+    # misma consulta con otros espacios/mayúsculas -> mismo resultado (los códigos IPRESS son numéricos)
+    q_key = " ".join(q.split()).lower()
+    log_event("ipress.search", ue_key=ue_key, pool_size=len(pool), q=q)
+    g.metrics_ue, g.metrics_pool_size = ue_key, len(pool)
+
+    # formas normalizadas, índice invertido y JSON de cada registro ya calculados al cargar
+    # (ipress_search.py); la respuesta final queda en caché por (ue_key, consulta) hasta que
+    # cambie el maestro
+    return cached_json("ipress_search", dataset_tag("ipress"), (ue_key, q_key),
+                       lambda: RawJson(*pool.search_json(q_key, limit=10)))
+
+# Pool IPRESS de la UE para buscar en el navegador (mientras escribe, sin ir al server).
+# Pools más grandes que IPRESS_CLIENT_POOL_MAX (o sin pool propio: todo el país) responden
+# {"mode": "server"} y el script sigue usando /api/ipress/search.
+@views_bp.get("/api/ipress/pool")
+def api_ipress_pool():
+    if not is_logged_in():
+        return jsonify({"ok": False, "msg": "Sesión expirada."}), 401
+    pools = get_index("IPRESS_SEARCH", {})
+    ue_key, pool = _session_pool(pools)
+    size = len(pool) if pool is not None else 0
+    if pool is None or ue_key == GLOBAL_POOL or size > current_app.config["IPRESS_CLIENT_POOL_MAX"]:
+        return jsonify({"mode": "server", "size": size})
+
+    # armado y comprimido una vez por versión del maestro; luego 304 por ETag
+    return cached_json("ipress_pool", dataset_tag("ipress"), (ue_key,),
+                       lambda: {"mode": "local", "ue": ue_key, "size": size, **pool.client_payload()})
 
 # ---------------------------
-# API para buscar en SIGA por (Establecimiento + Código Patrimonial)
-# SOLO devuelve: denominación, marca, modelo, serie, antigüedad
+# Exportar Formato 8 de toda la UE (XLSX / CSV en streaming)
 # ---------------------------
 
-def _only_name_from_establecimiento(s: str) -> str:
-    # Si llega "CMI MANUEL BARRETO — 6104" → "CMI MANUEL BARRETO"
-    return str(s).split(" — ", 1)[0].strip()
+@views_bp.get("/export/formato8.<fmt>")
+def export_formato8(fmt):
+    if not is_logged_in():
+        return redirect(url_for("auth.login"))
+    if fmt not in ("xlsx", "csv"):
+        return jsonify({"ok": False, "msg": "Formato no soportado (xlsx o csv)."}), 404
+
+    pliego_texto = f"{session.get('pliego_codigo','')} - {session.get('pliego_nombre','')}".strip()
+    ue_texto     = f"{session.get('ue_codigo','')} - {session.get('ue_nombre','')}".strip()
 
-def _norm_sede(s: str) -> str:
-    txt = unicodedata.normalize('NFKD', str(s))
-    txt = ''.join(c for c in txt if not unicodedata.combining(c))
-    txt = txt.lower().strip()
-    txt = re.sub(r'\s+', ' ', txt)
-    return txt
+    # se toman las referencias UNA vez: si hay recarga a mitad de la descarga, se sigue con estas
+    # (sin pool propio no se exporta todo el país)
+    ue_key, pool = _session_pool(get_index("IPRESS_SEARCH", {}))
+    establecimientos = list(pool.records) if pool is not None and ue_key != GLOBAL_POOL else []
+    siga = get_index("SIGA_MIN_INDEX", {})
+
+    rows = formato8_rows(pliego_texto, ue_texto, establecimientos, siga, get_index("SIGA_SEDE_ALIASES"))
+    header_and_rows = (r for part in ([FORMATO8_HEADERS], rows) for r in part)
+    log_event("export.formato8", ue_key=ue_key, eess=len(establecimientos), fmt=fmt)
+
+    filename = f"formato8_{ue_key if ue_key != GLOBAL_POOL else 'ue'}.{fmt}"
+    if fmt == "xlsx":
+        body = stream_xlsx(header_and_rows, sheet_name="Formato 8")
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = stream_csv(header_and_rows)
+        mimetype = "text/csv; charset=utf-8"
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
-@views_bp.post("/api/siga/find")
+# ---------------------------
+# API para buscar en SIGA por (Establecimiento + Código Patrimonial)
+# SOLO devuelve: denominación, marca, modelo, serie, antigüedad
+# ---------------------------
+
+@views_bp.route("/api/siga/find", methods=["GET", "POST"])
 def api_siga_find():
-    data = request.get_json(silent=True) or {}
-    establecimiento = _only_name_from_establecimiento(data.get("establecimiento", ""))
+    data = request.args if request.method == "GET" else (request.get_json(silent=True) or {})
+    establecimiento = data.get("establecimiento", "")  # "CMI MANUEL BARRETO — 6104" también sirve
     codigo = (data.get("codigo_patrimonial") or "").strip()
+    ipress_codigo = (data.get("ipress_codigo") or "").strip()
 
     if not codigo:
         return jsonify({"ok": False, "error": "codigo_patrimonial requerido"}), 400
 
-    sede_key = _norm_sede(establecimiento)
     cod_key  = re.sub(r"\s+", "", codigo)
 
-    index = current_app.config.get("SIGA_MIN_INDEX", {}) or {}
-    hit = index.get((sede_key, cod_key))
+    def build():
+        frags = get_index("SIGA_JSON")
+        sede, hit, how, _ = siga_find_item(frags.siga, get_index("SIGA_SEDE_ALIASES"), establecimiento, cod_key,
+                                           ipress_codigo, rows=True)
 
-    print("[SIGA][QUERY]", (sede_key, cod_key), "→", "HIT" if hit else "MISS")
+        log_event("siga.find", sede=sede, codigo=cod_key, hit=hit is not None, match=how)
 
-    if not hit:
-        return jsonify({"ok": True, "found": False})
+        if hit is None:
+            return RawJson(dumps({"ok": True, "found": False, "sede_match": how}), ("miss", how))
 
-    return jsonify({
-        "ok": True,
-        "found": True,
-        "data": {
-            "denominacion": hit.get("denominacion", ""),
-            "marca":        hit.get("marca", ""),
-            "modelo":       hit.get("modelo", ""),
-            "serie":        hit.get("serie", ""),
-            "antiguedad":   hit.get("FECHA_ADQUISICION", ""),
-        }
-    })
-
-#esto es opcional temporal pora ver el UE 
-@views_bp.get("/debug/ipress")
-def debug_ipress():
-    ipress_by_ue = current_app.config.get("IPRESS_BY_UE", {})
-    ue_raw = session.get("ue_codigo","")
-    print("UE en sesión:", ue_raw, "claves disponibles:", len(ipress_by_ue))
-    # muestra 5 claves ejemplo
-    sample_keys = list(ipress_by_ue.keys())[:5]
-    return {"ue": ue_raw, "keys": sample_keys, "count": len(ipress_by_ue)}
+        # registro armado con los fragmentos JSON precalculados (siga_index.SigaJson)
+        return RawJson(b'{"ok":true,"found":true,"sede":' + dumps(sede) + b',"sede_match":' + dumps(how)
+                       + b',"data":{' + frags.fields(hit) + b'}}', ("hit", how))
+
+    key = ("find", _sede_cache_key(establecimiento), ipress_codigo, cod_key)
+    return cached_json("siga_lookup", _siga_tag(), key, build)
+
+def _siga_tag() -> str:
+    # la antigüedad se calcula con la fecha de hoy: las respuestas cacheadas vencen al cambiar el día
+    return f"{dataset_tag('siga', 'ipress')}-{date.today().toordinal()}"
+
+def _sede_cache_key(establecimiento) -> str:
+    # nombres que solo difieren en tildes/mayúsculas/espacios o el "— código" final comparten entrada
+    forms = sede_forms(establecimiento)
+    return forms[0] if forms else ""
+
+# ---------------------------
+# Estado de los maestros (versión y hora de carga de cada uno)
+# ---------------------------
+
+@views_bp.get("/api/datasets")
+def api_datasets():
+    if not is_logged_in():
+        return jsonify({"ok": False, "msg": "Sesión expirada."}), 401
+    datasets = current_app.extensions.get("datasets")
+    status = datasets.status() if datasets else {}
+    if status.get("users", {}).get("ready") and status.get("ipress", {}).get("ready"):
+        # UEs sin pool IPRESS propio (buscan en todo el país) y de sufijo ambiguo
+        status["users"]["ue_pools"] = datasets.derived("UE_IPRESS_POOLS").report()
+    return jsonify(status)
+
+# Últimas cargas de un maestro (con altas/cambios/bajas si se aplicó como delta)
+@views_bp.get("/api/datasets/<name>/history")
+def api_dataset_history(name):
+    if not is_logged_in():
+        return jsonify({"ok": False, "msg": "Sesión expirada."}), 401
+    datasets = current_app.extensions.get("datasets")
+    if datasets is None or name not in datasets.status():
+        return jsonify({"ok": False, "msg": "Maestro desconocido."}), 404
+    return jsonify({"ok": True, "name": name, "history": datasets.history(name)})
+
+# ---------------------------
+# Salud / disponibilidad (para el balanceador)
+# ---------------------------
+
+@views_bp.get("/healthz")
+def healthz():
+    # el proceso responde (no depende de los Excel)
+    return jsonify({"ok": True})
+
+@views_bp.get("/readyz")
+def readyz():
+    """
+    200 si los índices pedidos ya están en memoria, 503 si no.
+    ?need=ipress,siga  para preguntar solo por algunos (por defecto, todos).
+    """
+    datasets = current_app.extensions.get("datasets")
+    status = datasets.status() if datasets else {}
+    need = [n.strip() for n in (request.args.get("need") or "").split(",") if n.strip()] or list(status)
+    ready = all(status.get(n, {}).get("ready") for n in need)
+    body = {"ready": ready, "datasets": {n: status.get(n, {"ready": False}) for n in need}}
+    return jsonify(body), (200 if ready else 503)
+
+# Contadores de la caché de respuestas (aciertos, fallos, desalojos, 304); con sesión,
+# como /api/datasets
+@views_bp.get("/api/cache")
+def api_cache():
+    if not is_logged_in():
+        return jsonify({"ok": False, "msg": "Sesión expirada."}), 401
+    return jsonify({name: get_cache(name).stats() for name in CACHE_NAMES})
 
 # --- SIGA: lookup por código patrimonial (12 dígitos) -------------------------
 def _norm_text_basic(s: str) -> str:
@@ -195,27 +251,188 @@ def _norm_text_basic(s: str) -> str:
     return t
 
 # devuelve los datos
-@views_bp.post("/api/siga/lookup")
+@views_bp.route("/api/siga/lookup", methods=["GET", "POST"])
 def siga_lookup():
-    data = request.get_json(silent=True) or {}
+    data = request.args if request.method == "GET" else (request.get_json(silent=True) or {})
     codigo = (data.get("codigo") or "").strip().replace(" ", "")
     establecimiento = data.get("establecimiento", "")
+    ipress_codigo = (data.get("ipress_codigo") or "").strip()
+
+    def build():
+        frags = get_index("SIGA_JSON")
+        # índice por código + tabla de alias de sede: da igual qué forma del nombre llegue
+        sede, hit, how, where = siga_find_item(frags.siga, get_index("SIGA_SEDE_ALIASES"), establecimiento, codigo,
+                                               ipress_codigo, rows=True)
+        log_event("siga.lookup", sede=sede, codigo=codigo, hit=hit is not None, match=how)
+
+        if hit is None:
+          msg = "No se encontró en SIGA ese código patrimonial."
+          if how == "sede_distinta":
+            msg = "El código patrimonial está registrado en SIGA en otro establecimiento."
+          elif how == "ambigua":
+            msg = "El código patrimonial está en varios establecimientos; verifica el establecimiento."
+          return RawJson(dumps({"ok": False, "msg": msg, "sede_match": how, "sedes": where}), ("miss", how))
+
+        # registro armado con los fragmentos JSON precalculados (siga_index.SigaJson)
+        return RawJson(b'{"ok":true,"sede":' + dumps(sede) + b',"sede_match":' + dumps(how)
+                       + b',' + frags.fields(hit) + b'}', ("hit", how))
+
+    key = ("lookup", _sede_cache_key(establecimiento), ipress_codigo, codigo)
+    return cached_json("siga_lookup", _siga_tag(), key, build)
+
+
+# --- SIGA: lookup en lote (muchos códigos patrimoniales en un solo request) ---
+#
+# Formas aceptadas:
+#   {"establecimiento": "CMI ...", "codigos": ["112233445566", ...]}
+#   {"items": [{"establecimiento": "...", "codigo": "..."}, ...]}   (o pares ["est", "cod"])
+# Cada código se resuelve igual que en /api/siga/lookup (código + alias de sede).
+
+@views_bp.post("/api/siga/lookup/batch")
+def siga_lookup_batch():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"ok": False, "msg": "El cuerpo debe ser un objeto JSON con 'codigos' o 'items'."}), 400
+    max_items = current_app.config.get("SIGA_BATCH_MAX", 2000)
+
+    pairs = []
+    if isinstance(data.get("items"), list):
+        for it in data["items"]:
+            if isinstance(it, dict):
+                pairs.append((it.get("establecimiento", ""), it.get("codigo", "")))
+            elif isinstance(it, (list, tuple)) and len(it) == 2:
+                pairs.append((it[0], it[1]))
+            else:
+                return jsonify({"ok": False, "msg": "Cada item debe ser {establecimiento, codigo} o [establecimiento, codigo]."}), 400
+    elif isinstance(data.get("codigos"), list):
+        est = data.get("establecimiento", "")
+        pairs = [(est, c) for c in data["codigos"]]
+    else:
+        return jsonify({"ok": False, "msg": "Envía 'codigos' (con 'establecimiento') o 'items'."}), 400
+
+    if len(pairs) > max_items:
+        return jsonify({"ok": False, "msg": f"Máximo {max_items} códigos por request."}), 400
+
+    frags = get_index("SIGA_JSON")
+    aliases = get_index("SIGA_SEDE_ALIASES")
+    outcomes = g.metrics_siga_batch = Counter()
+    resolved = {}   # establecimiento -> (sedes, cómo): la sede se resuelve una vez por lote
+    items = []
+    found = 0
+    for establecimiento, codigo in pairs:
+        establecimiento = str(establecimiento or "")
+        codigo = str(codigo or "").strip().replace(" ", "")
+
+        if codigo:
+            res = resolved.get(establecimiento)
+            if res is None:
+                res = resolved[establecimiento] = resolve_sedes(aliases, establecimiento)
+            sede, hit, how, _ = siga_find_item(frags.siga, aliases, establecimiento, codigo, rows=True, resolved=res)
+        else:
+            sede, hit, how = "", None, "sin_codigo"
+        outcomes[("hit" if hit is not None else "miss", how)] += 1
+        item = b'{"establecimiento":' + dumps(establecimiento) + b',"codigo":' + dumps(codigo)
+        if hit is not None:
+            found += 1
+            item += b',"found":true,"sede_match":' + dumps(how) + b',"sede":' + dumps(sede) + b',' + frags.fields(hit)
+        else:
+            item += b',"found":false,"sede_match":' + dumps(how)
+        items.append(item + b"}")
+
+    # respuesta armada con los fragmentos JSON precalculados (siga_index.SigaJson)
+    log_event("siga.lookup_batch", codigos=len(pairs), hits=found)
+    return raw_response(b'{"ok":true,"total":%d,"found":%d,"missing":%d,"results":%s}'
+                        % (len(items), found, len(items) - found, json_array(items)))
+
+
+# --- SIGA: búsqueda por texto (denominación / marca / modelo / serie) ---
+#
+# GET /api/siga/search?q=centrifuga olympus&establecimiento=...&page=1&per_page=20
+# Sin establecimiento busca en todas las sedes. Índice invertido por sede armado al
+# cargar el SIGA (siga_search.py); devuelve el total y la página pedida, mejor puntaje primero.
+
+SIGA_SEARCH_MAX_PAGE = 100
+SIGA_SEARCH_MAX_PER_PAGE = 100
+
+@views_bp.get("/api/siga/search")
+def siga_search():
+    q = " ".join((request.args.get("q") or "").split())
+    establecimiento = (request.args.get("establecimiento") or "").strip()
+    ipress_codigo = (request.args.get("ipress_codigo") or "").strip()
+    try:
+        page = min(max(int(request.args.get("page", 1)), 1), SIGA_SEARCH_MAX_PAGE)
+        per_page = min(max(int(request.args.get("per_page", 20)), 1), SIGA_SEARCH_MAX_PER_PAGE)
+    except ValueError:
+        return jsonify({"ok": False, "msg": "page y per_page deben ser números."}), 400
+    if not q:
+        return jsonify({"ok": False, "msg": "Falta el texto a buscar (q)."}), 400
+
+    text = get_index("SIGA_TEXT_INDEX")
+    if text is None or not text.available:
+        return jsonify({"ok": False, "msg": "Búsqueda por texto no disponible (SIGA en SHARED_STORE)."}), 503
+
+    def build():
+        sede_ids, how = None, "todas"
+        if establecimiento or ipress_codigo:
+            sedes, how = resolve_sedes(get_index("SIGA_SEDE_ALIASES"), establecimiento, ipress_codigo)
+            sede_ids = [text.siga.sede_ids[s] for s in sedes if s in text.siga.sede_ids]
+            if not sede_ids:
+                how = "sin_sede"
+        total, hits = 0, []
+        if sede_ids is None or sede_ids:
+            total, hits = text.search(q, sede_ids, offset=(page - 1) * per_page, limit=per_page)
+        log_event("siga.search", q=q, sedes=how, total=total)
+        return {
+            "ok": True, "q": q, "sede_match": how,
+            "total": total, "page": page, "per_page": per_page,
+            "results": [{**text.result(row), "score": score} for score, row in hits],
+        }
+
+    key = ("search", q.lower(), _sede_cache_key(establecimiento), ipress_codigo, page, per_page)
+    return cached_json("siga_search", _siga_tag(), key, build)
 
-    idx = current_app.config.get("SIGA_MIN_INDEX", {})
-    sede_key = _site_key(establecimiento)  # ← misma clave que al indexar
 
-    rec = idx.get((sede_key, codigo))
-    print("[SIGA] lookup:", {"sede_key": sede_key, "codigo": codigo, "hit": bool(rec)})
 
-    if not rec:
-      return jsonify({"ok": False, "msg": "No se encontró en SIGA ese código patrimonial."})
+# --- SIGA: subida del Excel de una UE ---
+#
+# POST /api/siga/upload (multipart, campo "file") responde 202 con el id del trabajo; la
+# lectura y la integración al índice vigente corren en segundo plano (siga_upload.py).
+# GET /api/siga/upload/<id> -> estado y avance (solo la UE que lo subió).
 
-    return jsonify({
-      "ok": True,
-      "denominacion": rec.get("denominacion", ""),
-      "marca": rec.get("marca", ""),
-      "modelo": rec.get("modelo", ""),
-      "serie": rec.get("serie", ""),
-      "antiguedad": rec.get("antiguedad", ""),
-    })
+SIGA_UPLOAD_EXTENSIONS = (".xlsx", ".xlsm")
 
+@views_bp.post("/api/siga/upload")
+def siga_upload():
+    if not is_logged_in():
+        return jsonify({"ok": False, "msg": "Sesión expirada."}), 401
+    if current_app.config["SHARED_STORE"]:
+        return jsonify({"ok": False, "msg": "Subida no disponible (SIGA en SHARED_STORE)."}), 503
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"ok": False, "msg": "Falta el archivo (campo file)."}), 400
+    if not upload.filename.lower().endswith(SIGA_UPLOAD_EXTENSIONS):
+        return jsonify({"ok": False, "msg": "El archivo debe ser .xlsx."}), 400
+
+    ue_key, pool = _session_pool(get_index("IPRESS_SEARCH", {}))
+    if pool is None or ue_key == GLOBAL_POOL:
+        return jsonify({"ok": False, "msg": "La UE no tiene establecimientos IPRESS asignados."}), 403
+
+    job = current_app.extensions["siga_uploads"].submit(session.get("ue_codigo", ""), list(pool.records), upload)
+    return jsonify({"ok": True, "job": job.as_dict(),
+                    "status_url": url_for("views.siga_upload_status", job_id=job.id)}), 202
+
+@views_bp.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    # MAX_CONTENT_LENGTH (= SIGA_UPLOAD_MAX_MB, ver siga_upload.init_siga_uploads)
+    max_mb = current_app.config["MAX_CONTENT_LENGTH"] / 2**20
+    what = "El archivo" if request.endpoint == "views.siga_upload" else "El request"
+    return jsonify({"ok": False, "msg": f"{what} supera {max_mb:g} MB."}), 413
+
+@views_bp.get("/api/siga/upload/<job_id>")
+def siga_upload_status(job_id):
+    if not is_logged_in():
+        return jsonify({"ok": False, "msg": "Sesión expirada."}), 401
+    job = current_app.extensions["siga_uploads"].get(job_id)
+    if job is None or job.ue_codigo != session.get("ue_codigo", ""):
+        return jsonify({"ok": False, "msg": "Trabajo no encontrado."}), 404
+    return jsonify({"ok": True, "job": job.as_dict()})
@@ -0,0 +1,117 @@
+# app/xlsx_stream.py
+
+from xml.sax.saxutils import escape
+import re
+import zipfile
+
+# =========================
+# XLSX EN STREAMING (sin armar el libro en memoria)
+# =========================
+#
+# openpyxl (incluso en write_only) necesita terminar el archivo antes de poder
+# enviarlo. Aquí se escribe el .xlsx mínimo (una hoja, celdas inlineStr) directo
+# a un ZIP sobre un "sumidero" que el generador va vaciando: el navegador empieza
+# a recibir bytes con la primera fila y la memoria no depende del número de filas.
+
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+
+class _Sink:
+    """Archivo de solo escritura (no seekable) que acumula bytes hasta que se los lleva el generador."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, b) -> int:
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def _col_letter(i: int) -> str:
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def _row_xml(r: int, values, letters: list[str]) -> str:
+    cells = []
+    for c, v in enumerate(values):
+        if v is None or v == "":
+            continue
+        while c >= len(letters):
+            letters.append(_col_letter(len(letters)))
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            cells.append(f'<c r="{letters[c]}{r}"><v>{v}</v></c>')
+        else:
+            txt = escape(_ILLEGAL_XML.sub("", str(v)))
+            cells.append(f'<c r="{letters[c]}{r}" t="inlineStr"><is><t xml:space="preserve">{txt}</t></is></c>')
+    return f'<row r="{r}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(rows, sheet_name: str = "Hoja1", flush_every: int = 200):
+    """
+    Generador de bytes de un .xlsx con una hoja. `rows` es un iterable de filas
+    (listas de str/int/float); la primera suele ser el encabezado.
+    """
+    sink = _Sink()
+    letters: list[str] = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name[:31], {'"': "&quot;"})))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield sink.drain()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD.encode())
+            buf = []
+            for r, values in enumerate(rows, start=1):
+                buf.append(_row_xml(r, values, letters))
+                if len(buf) >= flush_every:
+                    sheet.write("".join(buf).encode())
+                    buf.clear()
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            if buf:
+                sheet.write("".join(buf).encode())
+            sheet.write(_SHEET_TAIL.encode())
+    yield sink.drain()